@@ -7,6 +7,8 @@ import json
 from typing import AsyncGenerator, Optional
 from datetime import datetime, timezone
 from warehouse.warehouse_service import _cache
+from services.caching.shared_cache import load_cache_entries, publish_cache_entries
+from coverage_gap.precache_jobs import finish_job, job_stage, precache_job, record_error, record_retry
 
 # Cache key for AI analysis precache
 AI_ANALYSIS_PRECACHE_KEY = "coverage_gap:ai_analysis:precached"
@@ -17,6 +19,8 @@ LAST_AI_ANALYSIS_PRECACHE_TIMESTAMP_KEY = "coverage_gap:ai_analysis:precache:las
 MAX_RETRIES = 3
 # Base delay for exponential backoff (in seconds)
 RETRY_BASE_DELAY = 5
+# Shared-cache snapshot of the precached analysis, for workers that did not compute it
+SHARED_AI_ANALYSIS_NAME = "coverage_gap:ai_analysis"
 
 def save_last_ai_analysis_precache_timestamp() -> str:
     """
@@ -36,34 +40,39 @@ def get_last_ai_analysis_precache_timestamp() -> Optional[str]:
     """
     return _cache.get(LAST_AI_ANALYSIS_PRECACHE_TIMESTAMP_KEY)
 
-async def precache_ai_analysis() -> bool:
+async def precache_ai_analysis(trigger: str = "scheduled") -> bool:
     """
     Pre-cache AI analysis for no filters (most common case).
     Includes automatic retry mechanism for failures with exponential backoff.
+    The run is registered in the precache job registry under the given trigger.
     Returns True if successful, False otherwise.
     """
-    # Initial attempt
-    success = await _precache_ai_analysis_once()
-    
-    # Retry mechanism if initial attempt failed
-    retry_attempt = 0
-    while not success and retry_attempt < MAX_RETRIES:
-        retry_attempt += 1
-        # Exponential backoff: 5s, 10s, 20s
-        retry_delay = RETRY_BASE_DELAY * (2 ** (retry_attempt - 1))
+    with precache_job("ai_analysis", trigger) as job:
+        # Initial attempt
+        success = await _precache_ai_analysis_once()
+        
+        # Retry mechanism if initial attempt failed
+        retry_attempt = 0
+        while not success and retry_attempt < MAX_RETRIES:
+            retry_attempt += 1
+            record_retry(retry_attempt)
+            # Exponential backoff: 5s, 10s, 20s
+            retry_delay = RETRY_BASE_DELAY * (2 ** (retry_attempt - 1))
+            
+            print(f"[AI_ANALYSIS_PRECACHE] Retry attempt {retry_attempt}/{MAX_RETRIES}")
+            print(f"[AI_ANALYSIS_PRECACHE] Waiting {retry_delay} seconds before retry...")
+            with job_stage("retry_wait"):
+                await asyncio.sleep(retry_delay)
+            
+            success = await _precache_ai_analysis_once()
         
-        print(f"[AI_ANALYSIS_PRECACHE] Retry attempt {retry_attempt}/{MAX_RETRIES}")
-        print(f"[AI_ANALYSIS_PRECACHE] Waiting {retry_delay} seconds before retry...")
-        await asyncio.sleep(retry_delay)
+        if success:
+            print(f"[AI_ANALYSIS_PRECACHE] Completed successfully" + (f" after {retry_attempt} retry attempt(s)" if retry_attempt > 0 else ""))
+        else:
+            print(f"[AI_ANALYSIS_PRECACHE] Failed after {MAX_RETRIES} retry attempts")
         
-        success = await _precache_ai_analysis_once()
-    
-    if success:
-        print(f"[AI_ANALYSIS_PRECACHE] Completed successfully" + (f" after {retry_attempt} retry attempt(s)" if retry_attempt > 0 else ""))
-    else:
-        print(f"[AI_ANALYSIS_PRECACHE] Failed after {MAX_RETRIES} retry attempts")
-    
-    return success
+        finish_job(job, success)
+        return success
 
 async def _precache_ai_analysis_once() -> bool:
     """
@@ -78,21 +87,50 @@ async def _precache_ai_analysis_once() -> bool:
         
         # Run analysis with no filters (most common case)
         # Pass skip_cache=True to force fresh analysis
-        result = await get_ai_analysis_only(filters=None, skip_cache=True)
+        with job_stage("ai_analysis"):
+            result = await get_ai_analysis_only(filters=None, skip_cache=True)
         
         # Note: The result is already cached by get_ai_analysis_only when filters=None
         # But we still save the timestamp here to track when precache ran
         
         # Save timestamp after successful cache
         save_last_ai_analysis_precache_timestamp()
+        with job_stage("publish"):
+            await publish_precached_ai_analysis()
         
         print("[AI_ANALYSIS_PRECACHE] ✓ Successfully cached AI analysis")
         return True
         
     except Exception as e:
+        record_error(str(e))
         print(f"[AI_ANALYSIS_PRECACHE] ✗ Error caching AI analysis: {str(e)}")
         return False
 
+async def publish_precached_ai_analysis() -> bool:
+    """
+    Publish the precached AI analysis and its timestamp to the shared cache for the other workers.
+    Returns True if published.
+    """
+    try:
+        return await publish_cache_entries(SHARED_AI_ANALYSIS_NAME, {
+            AI_ANALYSIS_PRECACHE_KEY: 90000,  # 25 hours
+            LAST_AI_ANALYSIS_PRECACHE_TIMESTAMP_KEY: 2592000  # 30 days
+        })
+    except Exception as e:
+        print(f"[AI_ANALYSIS_PRECACHE] ✗ Error publishing AI analysis: {str(e)}")
+        return False
+
+async def load_precached_ai_analysis() -> bool:
+    """
+    Load the AI analysis published by another worker, if newer than the one held here.
+    Returns True if it was loaded.
+    """
+    try:
+        return await load_cache_entries(SHARED_AI_ANALYSIS_NAME)
+    except Exception as e:
+        print(f"[AI_ANALYSIS_PRECACHE] ✗ Error loading shared AI analysis: {str(e)}")
+        return False
+
 async def precache_ai_analysis_stream() -> AsyncGenerator[str, None]:
     """
     Pre-cache AI analysis with streaming progress updates via SSE.
@@ -114,48 +152,55 @@ async def precache_ai_analysis_stream() -> AsyncGenerator[str, None]:
         """Helper to format error message"""
         return f"data: {json.dumps({'type': 'error', 'message': error})}\n\n"
     
-    try:
-        yield format_log("Starting AI analysis pre-cache job", 0)
-        print("[AI_ANALYSIS_PRECACHE] ===== Starting AI analysis pre-cache job =====")
-        
-        # Initial attempt
-        yield format_log("Fetching fresh AI analysis data...", 25)
-        success = await _precache_ai_analysis_once()
-        
-        # Retry mechanism if initial attempt failed
-        retry_attempt = 0
-        while not success and retry_attempt < MAX_RETRIES:
-            retry_attempt += 1
-            # Exponential backoff: 5s, 10s, 20s
-            retry_delay = RETRY_BASE_DELAY * (2 ** (retry_attempt - 1))
+    with precache_job("ai_analysis", "manual") as job:
+        try:
+            yield format_log("Starting AI analysis pre-cache job", 0)
+            print("[AI_ANALYSIS_PRECACHE] ===== Starting AI analysis pre-cache job =====")
             
-            yield format_log(f"AI analysis pre-cache failed. Retrying (attempt {retry_attempt}/{MAX_RETRIES})...", 50)
-            print(f"[AI_ANALYSIS_PRECACHE] Retry attempt {retry_attempt}/{MAX_RETRIES}")
+            # Initial attempt
+            yield format_log("Fetching fresh AI analysis data...", 25)
+            success = await _precache_ai_analysis_once()
             
-            yield format_log(f"Waiting {retry_delay} seconds before retry...", 60)
-            await asyncio.sleep(retry_delay)
+            # Retry mechanism if initial attempt failed
+            retry_attempt = 0
+            while not success and retry_attempt < MAX_RETRIES:
+                retry_attempt += 1
+                record_retry(retry_attempt)
+                # Exponential backoff: 5s, 10s, 20s
+                retry_delay = RETRY_BASE_DELAY * (2 ** (retry_attempt - 1))
+                
+                yield format_log(f"AI analysis pre-cache failed. Retrying (attempt {retry_attempt}/{MAX_RETRIES})...", 50)
+                print(f"[AI_ANALYSIS_PRECACHE] Retry attempt {retry_attempt}/{MAX_RETRIES}")
+                
+                yield format_log(f"Waiting {retry_delay} seconds before retry...", 60)
+                with job_stage("retry_wait"):
+                    await asyncio.sleep(retry_delay)
+                
+                yield format_log(f"Retrying AI analysis pre-cache...", 70)
+                success = await _precache_ai_analysis_once()
             
-            yield format_log(f"Retrying AI analysis pre-cache...", 70)
-            success = await _precache_ai_analysis_once()
-        
-        if success:
-            timestamp = get_last_ai_analysis_precache_timestamp()
-            yield format_log("AI analysis pre-cache completed successfully", 100)
-            print("[AI_ANALYSIS_PRECACHE] ===== AI analysis pre-cache job completed =====")
+            if success:
+                timestamp = get_last_ai_analysis_precache_timestamp()
+                yield format_log("AI analysis pre-cache completed successfully", 100)
+                print("[AI_ANALYSIS_PRECACHE] ===== AI analysis pre-cache job completed =====")
+                
+                final_data = {
+                    "message": "AI analysis pre-cache job completed",
+                    "status": "success",
+                    "retriesUsed": retry_attempt,
+                    "lastPrecacheTimestamp": timestamp,
+                    "jobId": job.id
+                }
+                finish_job(job, True)
+                yield format_data(final_data)
+            else:
+                finish_job(job, False)
+                yield format_log(f"AI analysis pre-cache failed after {MAX_RETRIES} retries", 100)
+                yield format_error(f"AI analysis pre-cache failed after {MAX_RETRIES} retry attempts")
             
-            final_data = {
-                "message": "AI analysis pre-cache job completed",
-                "status": "success",
-                "retriesUsed": retry_attempt,
-                "lastPrecacheTimestamp": timestamp
-            }
-            yield format_data(final_data)
-        else:
-            yield format_log(f"AI analysis pre-cache failed after {MAX_RETRIES} retries", 100)
-            yield format_error(f"AI analysis pre-cache failed after {MAX_RETRIES} retry attempts")
-        
-    except Exception as e:
-        error_msg = str(e)
-        print(f"[AI_ANALYSIS_PRECACHE] Error in AI analysis pre-cache job: {error_msg}")
-        yield format_error(f"AI analysis pre-cache failed: {error_msg}")
-
+        except Exception as e:
+            error_msg = str(e)
+            print(f"[AI_ANALYSIS_PRECACHE] Error in AI analysis pre-cache job: {error_msg}")
+            record_error(error_msg)
+            finish_job(job, False)
+            yield format_error(f"AI analysis pre-cache failed: {error_msg}")
@@ -0,0 +1,806 @@
+"""
+Coverage engine for coverage gap analysis.
+Computes every city-to-warehouse distance once, up to the largest radius, and answers each
+smaller radius by thresholding those distances instead of recomputing them.
+"""
+
+import asyncio
+import copy
+import dataclasses
+import hashlib
+import json
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from warehouse.warehouse_service import _cache
+from warehouse.models import (
+    CoverageAnalysis,
+    CoverageAnalysisResponse,
+    CoverageGapFilters,
+    MockWarehouse,
+    StaticWarehouseData
+)
+from services.airtable.requests_aggregate import get_requests_aggregate
+from services.geolocation.geolocation_service import haversine
+from services.gemini_services.coverage_gap_analysis import get_request_counts_by_city
+from coverage_gap.spatial_index import WeightedGridIndex, build_demand_index, build_warehouse_grid, haversine_matrix, haversine_pairs
+from coverage_gap.coverage_gap_precache import PRECACHED_RADII, get_last_precache_timestamp
+from coverage_gap.precache_jobs import job_stage, record_inputs
+from coverage_gap.coverage_view import CoverageScope
+from coverage_gap.us_cities_store import USCitiesStore
+
+# Cache key for the shared coverage engine (distance table plus the inputs it was built from)
+COVERAGE_ENGINE_KEY = "coverage_gap:engine"
+
+# Same freshness bound as the on-demand analyses it serves (30 minutes), so new warehouses
+# and Requests show up as soon as they did before the engine was shared
+COVERAGE_ENGINE_TTL = 1800
+
+# The shared engine's table covers every pre-cached radius; any radius up to this is a threshold filter
+MAX_ENGINE_RADIUS = max(PRECACHED_RADII)
+
+# Distances this close to a radius are re-checked with haversine() so thresholding the
+# vectorized table includes exactly the warehouses a per-pair scan would
+BOUNDARY_TOLERANCE_MILES = 1e-6
+
+# Cities per block when filling the distance table (bounds the size of each distance matrix)
+DISTANCE_BLOCK_SIZE = 1024
+
+# Warehouses listed per city; each reports its average distance to the rest of the city's group
+NEARBY_WAREHOUSE_COUNT = 3
+
+# Warehouse pairs per block when averaging intra-group distances (bounds temporary arrays)
+PAIR_BLOCK_SIZE = 1 << 21
+
+# Tier histogram columns ("Potential Gold" counts as Gold; missing or other tiers are untiered)
+TIER_GOLD, TIER_SILVER, TIER_BRONZE, TIER_UNTIERED = range(4)
+TIER_COLUMNS = 4
+TIER_CODES = {"Gold": TIER_GOLD, "Potential Gold": TIER_GOLD, "Silver": TIER_SILVER, "Bronze": TIER_BRONZE}
+
+
+@dataclass
+class CoverageInputs:
+    """Everything a coverage analysis reads, fetched once and shared by every radius."""
+    warehouses: List[StaticWarehouseData]  # All warehouses, unfiltered, in Airtable order
+    us_cities: Dict[str, Dict]
+    city_request_counts: Dict[str, int]
+    total_requests: int
+    average_monthly_requests: int
+    # Cities whose requests count toward aggregated demand when us_cities is only part of the country
+    demand_cities: Optional[Dict[str, Dict]] = None
+    # Snapshot version of the Requests scan the request statistics come from
+    requests_snapshot_version: str = ""
+
+
+async def load_coverage_inputs() -> CoverageInputs:
+    """Fetch warehouses, request statistics and US cities for a coverage analysis."""
+    # Lazy import to avoid circular dependency
+    from coverage_gap.coverage_gap_service import (
+        fetch_warehouses_from_airtable,
+        get_average_monthly_requests,
+        get_total_requests_count,
+        get_warehouse_request_counts,
+        load_us_cities,
+        transform_warehouse_to_static_data
+    )
+
+    # The request statistics all come from one shared Requests scan, so fetch them alongside warehouses
+    warehouses_data, total_requests, warehouse_request_counts, average_monthly_requests, city_request_counts, requests_snapshot_version = await asyncio.gather(
+        fetch_warehouses_from_airtable(),
+        get_total_requests_count(),
+        get_warehouse_request_counts(),
+        get_average_monthly_requests(),
+        get_request_counts_by_city(),
+        get_requests_snapshot_version()
+    )
+
+    warehouses = [
+        transform_warehouse_to_static_data(record, warehouse_request_counts.get(record.get("id", ""), 0))
+        for record in warehouses_data
+    ]
+
+    return CoverageInputs(
+        warehouses=warehouses,
+        us_cities=load_us_cities(),
+        city_request_counts=city_request_counts,
+        total_requests=total_requests,
+        average_monthly_requests=average_monthly_requests,
+        requests_snapshot_version=requests_snapshot_version
+    )
+
+
+async def get_requests_snapshot_version() -> str:
+    """Snapshot version of the Requests scan behind the request statistics ("" if unavailable)."""
+    try:
+        aggregate = await get_requests_aggregate()
+        return aggregate.snapshot_version
+    except Exception as e:
+        print(f"[COVERAGE_ENGINE] Error reading Requests snapshot version: {str(e)}")
+        return ""
+
+
+def warehouse_set_digest(warehouses: List[StaticWarehouseData]) -> str:
+    """Order-independent digest of a warehouse set, identifying the warehouse data an engine was built from."""
+    digest = hashlib.sha1()
+    for fingerprint in sorted(json.dumps(wh.model_dump(mode="json"), sort_keys=True) for wh in warehouses):
+        digest.update(fingerprint.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def group_warehouses_by_city(warehouses: List[StaticWarehouseData]) -> Dict[str, List[StaticWarehouseData]]:
+    """Warehouses keyed by their own "city,state", in input order. Warehouses without a city or state are skipped."""
+    groups: Dict[str, List[StaticWarehouseData]] = {}
+    for warehouse in warehouses:
+        city = warehouse.city.strip() if warehouse.city else ""
+        state = warehouse.state.strip() if warehouse.state else ""
+        if not city or not state:
+            continue
+        groups.setdefault(f"{city},{state}", []).append(warehouse)
+    return groups
+
+
+def city_location_columns(us_cities: Dict[str, Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Latitude, longitude (0 when missing) and upper-case state per city, in us_cities order."""
+    if isinstance(us_cities, USCitiesStore):
+        return us_cities.location_columns()
+    cities = list(us_cities.values())
+    return (
+        np.array([city_info.get('latitude') or 0.0 for city_info in cities], dtype=np.float64),
+        np.array([city_info.get('longitude') or 0.0 for city_info in cities], dtype=np.float64),
+        np.array([city_info["state"].upper() for city_info in cities], dtype=object)
+    )
+
+
+def warehouse_location_columns(warehouses: List[StaticWarehouseData]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Latitude, longitude and upper-case state per warehouse, in list order."""
+    return (
+        np.array([wh.lat for wh in warehouses], dtype=np.float64),
+        np.array([wh.lng for wh in warehouses], dtype=np.float64),
+        np.array([wh.state.upper() for wh in warehouses], dtype=object)
+    )
+
+
+def scope_inputs(inputs: CoverageInputs, radius_miles: Optional[float], scope: CoverageScope) -> CoverageInputs:
+    """Inputs for analyzing only the cities in scope at radius_miles.
+
+    Keeps the cities in scope and the warehouses an analysis of them can list or return:
+    those located in scope, those belonging to a city in scope, and those within radius_miles
+    of a city centre in scope. Demand is still aggregated over every city.
+    """
+    city_keys = list(inputs.us_cities)
+    in_scope = np.flatnonzero(scope.contains(*city_location_columns(inputs.us_cities))).tolist()
+    us_cities = {city_keys[number]: inputs.us_cities[city_keys[number]] for number in in_scope}
+
+    warehouses = inputs.warehouses
+    lats, lngs, states = warehouse_location_columns(warehouses)
+    keep = scope.contains(lats, lngs, states)
+    has_coords = (lats != 0) & (lngs != 0)
+    centres = [
+        (city_info["latitude"], city_info["longitude"], 0.0)
+        for city_info in us_cities.values() if city_info.get('latitude') and city_info.get('longitude')
+    ]
+    centred_groups: Dict[str, List[int]] = {}
+    for position, wh in enumerate(warehouses):
+        city = wh.city.strip() if wh.city else ""
+        state = wh.state.strip() if wh.state else ""
+        city_key = f"{city},{state}"
+        city_info = us_cities.get(city_key)
+        if city_info is None:
+            continue
+        keep[position] = True
+        if has_coords[position] and not (city_info.get('latitude') and city_info.get('longitude')):
+            centred_groups.setdefault(city_key, []).append(position)
+    # Cities without coordinates are centred on the average position of some of their own
+    # warehouses, which lies within their bounding box; reach that far beyond each of them
+    for group in centred_groups.values():
+        spread = 2 * haversine(lats[group].min(), lngs[group].min(), lats[group].max(), lngs[group].max())
+        centres.extend((lats[position], lngs[position], spread) for position in group)
+
+    if radius_miles and radius_miles > 0 and centres:
+        candidates = np.flatnonzero(has_coords & ~keep)
+        centre_lats, centre_lngs, spreads = (np.array(column, dtype=np.float64) for column in zip(*centres))
+        for start in range(0, len(centres), DISTANCE_BLOCK_SIZE):
+            if not len(candidates):
+                break
+            block = slice(start, start + DISTANCE_BLOCK_SIZE)
+            distances = haversine_matrix(centre_lats[block], centre_lngs[block], lats[candidates], lngs[candidates])
+            limits = radius_miles + BOUNDARY_TOLERANCE_MILES + spreads[block]
+            near = (distances <= limits[:, None]).any(axis=0)
+            keep[candidates[near]] = True
+            candidates = candidates[~near]
+
+    return dataclasses.replace(
+        inputs,
+        warehouses=[wh for wh, kept in zip(warehouses, keep.tolist()) if kept],
+        us_cities=us_cities,
+        demand_cities=inputs.us_cities if inputs.demand_cities is None else inputs.demand_cities
+    )
+
+
+def city_statistics(
+    member_city: np.ndarray,
+    member_pos: np.ndarray,
+    city_count: int,
+    warehouse_tiers: np.ndarray,
+    warehouse_id_codes: np.ndarray,
+    warehouse_lats: np.ndarray,
+    warehouse_lngs: np.ndarray,
+    warehouse_has_coords: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """Per-city warehouse statistics for every city at once.
+
+    Members are in CSR order: city i owns member_pos[offsets[i]:offsets[i+1]] (positions in
+    the warehouse columns), grouped by city in member_city. Returns the offsets, warehouse
+    counts, tier histogram (columns TIER_GOLD..TIER_UNTIERED) and, for the first
+    NEARBY_WAREHOUSE_COUNT members of each city, the average distance to the rest of its group.
+    """
+    counts = np.bincount(member_city, minlength=city_count)
+    offsets = np.zeros(city_count + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    tier_counts = np.bincount(
+        member_city * TIER_COLUMNS + warehouse_tiers[member_pos],
+        minlength=city_count * TIER_COLUMNS
+    ).reshape(city_count, TIER_COLUMNS)
+
+    # Pair each city's leading members with every member of the same city, a block at a time
+    rank = np.arange(len(member_city)) - offsets[member_city]
+    leading = np.flatnonzero((rank < NEARBY_WAREHOUSE_COUNT) & (counts[member_city] > 1))
+    pair_lengths = counts[member_city[leading]]
+    pair_ends = np.cumsum(pair_lengths)
+    distance_sums = np.zeros(len(member_city), dtype=np.float64)
+    distance_counts = np.zeros(len(member_city), dtype=np.int64)
+    start = 0
+    while start < len(leading):
+        done = pair_ends[start - 1] if start else 0
+        end = max(int(np.searchsorted(pair_ends, done + PAIR_BLOCK_SIZE, side='right')), start + 1)
+        block = leading[start:end]
+        lengths = pair_lengths[start:end]
+        first = np.repeat(block, lengths)
+        within = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        second = np.repeat(offsets[member_city[block]], lengths) + within
+        a = member_pos[first]
+        b = member_pos[second]
+        # Other warehouses only (by ID), and only pairs where both have coordinates
+        valid = (warehouse_id_codes[a] != warehouse_id_codes[b]) & warehouse_has_coords[a] & warehouse_has_coords[b]
+        first, a, b = first[valid], a[valid], b[valid]
+        distances = haversine_pairs(warehouse_lats[a], warehouse_lngs[a], warehouse_lats[b], warehouse_lngs[b])
+        distance_sums += np.bincount(first, weights=distances, minlength=len(member_city))
+        distance_counts += np.bincount(first, minlength=len(member_city))
+        start = end
+    average_distances = np.divide(
+        distance_sums, distance_counts,
+        out=np.zeros(len(member_city), dtype=np.float64),
+        where=distance_counts > 0
+    )
+
+    return {
+        "offsets": offsets,
+        "counts": counts,
+        "tier_counts": tier_counts,
+        "average_distances": average_distances
+    }
+
+
+def classify_cities(counts: np.ndarray, request_counts: np.ndarray) -> Dict[str, np.ndarray]:
+    """Expansion opportunity, coverage gap flag and density for every city at once."""
+    average_requests = np.divide(
+        request_counts, counts,
+        out=np.zeros(len(counts), dtype=np.float64),
+        where=counts > 0
+    )
+    expansion_opportunity = np.select(
+        [
+            average_requests > 25,
+            (counts == 1) & (request_counts > 10),
+            (counts == 1) & (request_counts > 3),
+            (counts < 3) & (request_counts > 15),
+            average_requests > 15
+        ],
+        ["High", "High", "Moderate", "Moderate", "Moderate"],
+        default="None"
+    )
+    # Warehouses per 100 sq miles over an estimated city area
+    estimated_city_area_sq_miles = np.maximum(counts * 25, 50)
+    return {
+        "expansion_opportunity": expansion_opportunity,
+        "has_coverage_gap": (counts < 2) | (average_requests > 20),
+        "warehouses_per_100_sq_miles": (counts / estimated_city_area_sq_miles) * 100
+    }
+
+
+class CoverageEngine:
+    """City-to-warehouse distance table for one set of inputs, up to max_radius.
+
+    For every US city with coordinates, the table holds the warehouses within max_radius
+    (CSR layout: row offsets into flat index/distance arrays), each row sorted by distance.
+    A radius at or below max_radius selects a prefix of each row.
+    """
+
+    def __init__(self, inputs: CoverageInputs, max_radius: float):
+        # Identifies this table across processes (workers keep engines loaded by version)
+        self.version = uuid.uuid4().hex
+        self.inputs = inputs
+        self.max_radius = max_radius
+        self.valid_warehouses = [wh for wh in inputs.warehouses if wh.lat != 0 and wh.lng != 0]
+        self.city_groups = group_warehouses_by_city(inputs.warehouses)
+        # Only used for cities centred on their own warehouses (no coordinates in us_cities)
+        self.warehouse_grid = build_warehouse_grid(self.valid_warehouses, max_radius)
+        self._demand_indexes: Dict[float, WeightedGridIndex] = {}
+        self._city_locations: Optional[tuple] = None
+
+        self.city_rows: Dict[str, int] = {}
+        city_lats = []
+        city_lngs = []
+        for city_key, city_info in inputs.us_cities.items():
+            if city_info.get('latitude') and city_info.get('longitude'):
+                self.city_rows[city_key] = len(city_lats)
+                city_lats.append(city_info['latitude'])
+                city_lngs.append(city_info['longitude'])
+        self.city_lats = np.array(city_lats, dtype=np.float64)
+        self.city_lngs = np.array(city_lngs, dtype=np.float64)
+
+        self._build_warehouse_columns()
+        self._build_distance_table()
+
+    def __getstate__(self) -> Dict:
+        # Per-radius demand indexes are rebuilt on demand rather than shipped between processes
+        state = self.__dict__.copy()
+        state["_demand_indexes"] = {}
+        return state
+
+    def _build_warehouse_columns(self) -> None:
+        """Per-warehouse arrays (positions in inputs.warehouses) and each city's own warehouses."""
+        warehouses = self.inputs.warehouses
+        positions = {id(wh): position for position, wh in enumerate(warehouses)}
+        self.valid_positions = np.array([positions[id(wh)] for wh in self.valid_warehouses], dtype=np.int64)
+        id_codes: Dict[str, int] = {}
+        self.warehouse_id_codes = np.array([id_codes.setdefault(wh.id, len(id_codes)) for wh in warehouses], dtype=np.int64)
+        self.warehouse_tiers = np.array([TIER_CODES.get(wh.tier, TIER_UNTIERED) for wh in warehouses], dtype=np.int64)
+        self.warehouse_lats = np.array([wh.lat for wh in warehouses], dtype=np.float64)
+        self.warehouse_lngs = np.array([wh.lng for wh in warehouses], dtype=np.float64)
+        self.warehouse_has_coords = (self.warehouse_lats != 0) & (self.warehouse_lngs != 0)
+
+        # Cities are numbered in us_cities order; table rows map back to those numbers
+        self.city_keys = list(self.inputs.us_cities)
+        self.city_numbers = {city_key: number for number, city_key in enumerate(self.city_keys)}
+        city_numbers = self.city_numbers
+        self.table_cities = np.zeros(len(self.city_rows), dtype=np.int64)
+        for city_key, row in self.city_rows.items():
+            self.table_cities[row] = city_numbers[city_key]
+        self.city_in_table = np.zeros(len(self.city_keys), dtype=bool)
+        self.city_in_table[self.table_cities] = True
+
+        # Own warehouses grouped by city number, each group in warehouse order
+        own_cities: List[int] = []
+        own_positions: List[int] = []
+        for city_key, group in self.city_groups.items():
+            number = city_numbers.get(city_key)
+            if number is None:
+                continue
+            own_cities.extend([number] * len(group))
+            own_positions.extend(positions[id(wh)] for wh in group)
+        own_cities = np.array(own_cities, dtype=np.int64)
+        order = np.argsort(own_cities, kind='stable')
+        self.own_cities = own_cities[order]
+        self.own_positions = np.array(own_positions, dtype=np.int64)[order]
+
+    def _build_distance_table(self) -> None:
+        self._set_distance_table(*self._distance_entries(np.arange(len(self.city_lats))))
+
+    def _distance_entries(self, rows: np.ndarray) -> tuple:
+        """Table entries (row, valid warehouse index, distance) for ascending city rows, each row sorted by distance."""
+        warehouse_lats = np.array([wh.lat for wh in self.valid_warehouses], dtype=np.float64)
+        warehouse_lngs = np.array([wh.lng for wh in self.valid_warehouses], dtype=np.float64)
+        limit = self.max_radius + BOUNDARY_TOLERANCE_MILES
+
+        row_blocks = [np.zeros(0, dtype=np.int64)]
+        index_blocks = [np.zeros(0, dtype=np.int32)]
+        distance_blocks = [np.zeros(0, dtype=np.float64)]
+        for start in range(0, len(rows), DISTANCE_BLOCK_SIZE):
+            block = rows[start:start + DISTANCE_BLOCK_SIZE]
+            distances = haversine_matrix(self.city_lats[block], self.city_lngs[block], warehouse_lats, warehouse_lngs)
+            block_rows, cols = np.nonzero(distances <= limit)
+            row_distances = distances[block_rows, cols]
+            # Order each row by distance (rows stay grouped since lexsort's last key is primary)
+            order = np.lexsort((cols, row_distances, block_rows))
+            row_blocks.append(block[block_rows[order]])
+            index_blocks.append(cols[order].astype(np.int32))
+            distance_blocks.append(row_distances[order])
+        return np.concatenate(row_blocks), np.concatenate(index_blocks), np.concatenate(distance_blocks)
+
+    def _set_distance_table(self, rows: np.ndarray, indices: np.ndarray, distances: np.ndarray) -> None:
+        self.offsets = np.zeros(len(self.city_lats) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(self.city_lats)), out=self.offsets[1:])
+        self.warehouse_idx = indices
+        self.distances = distances
+
+    def _rows_near(self, warehouses: List[Optional[StaticWarehouseData]], radius_miles: float) -> np.ndarray:
+        """Mask of table rows whose city lies within radius_miles of any of the warehouses."""
+        near = np.zeros(len(self.city_lats), dtype=bool)
+        for warehouse in warehouses:
+            if warehouse is not None and warehouse.lat != 0 and warehouse.lng != 0:
+                near |= haversine_pairs(self.city_lats, self.city_lngs, warehouse.lat, warehouse.lng) <= radius_miles
+        return near
+
+    def with_warehouse(self, warehouse: StaticWarehouseData) -> "CoverageEngine":
+        """A copy of this engine with one warehouse added, or replaced if its ID is already present.
+
+        The distance table is patched rather than rebuilt: the warehouse's old entries are
+        dropped and its entries at the new position inserted into the rows within max_radius.
+        """
+        warehouses = list(self.inputs.warehouses)
+        position = next((position for position, wh in enumerate(warehouses) if wh.id == warehouse.id), None)
+        if position is None:
+            warehouses.append(warehouse)
+        else:
+            warehouses[position] = warehouse
+
+        engine = copy.copy(self)
+        engine.version = uuid.uuid4().hex
+        engine.inputs = dataclasses.replace(self.inputs, warehouses=warehouses)
+        engine.valid_warehouses = [wh for wh in warehouses if wh.lat != 0 and wh.lng != 0]
+        engine.city_groups = group_warehouses_by_city(warehouses)
+        engine.warehouse_grid = build_warehouse_grid(engine.valid_warehouses, self.max_radius)
+        # Request counts are unchanged, so the demand indexes still apply
+        engine._demand_indexes = dict(self._demand_indexes)
+        engine._build_warehouse_columns()
+
+        # Every other warehouse keeps its entries, under its new valid index
+        new_indexes = {id(wh): index for index, wh in enumerate(engine.valid_warehouses)}
+        renumber = np.array([new_indexes.get(id(wh), -1) for wh in self.valid_warehouses], dtype=np.int32)
+        rows = np.repeat(np.arange(len(self.city_lats)), np.diff(self.offsets))
+        indices = renumber[self.warehouse_idx]
+        kept = indices >= 0
+        rows, indices, distances = rows[kept], indices[kept], self.distances[kept]
+
+        # The warehouse's entries at its new position; only the rows gaining one need re-sorting
+        gained = np.zeros(len(self.city_lats), dtype=bool)
+        if id(warehouse) in new_indexes:
+            new_distances = haversine_matrix(self.city_lats, self.city_lngs, [warehouse.lat], [warehouse.lng])[:, 0]
+            gained = new_distances <= self.max_radius + BOUNDARY_TOLERANCE_MILES
+            near_rows = np.flatnonzero(gained)
+            rows = np.concatenate([rows, near_rows])
+            indices = np.concatenate([indices, np.full(len(near_rows), new_indexes[id(warehouse)], dtype=np.int32)])
+            distances = np.concatenate([distances, new_distances[near_rows]])
+        resort = np.flatnonzero(gained[rows])
+        resort = resort[np.lexsort((indices[resort], distances[resort], rows[resort]))]
+        order = np.concatenate([np.flatnonzero(~gained[rows]), resort])
+        order = order[np.argsort(rows[order], kind='stable')]
+        engine._set_distance_table(rows[order], indices[order], distances[order])
+        return engine
+
+    def cities_affected_by(self, warehouses: List[Optional[StaticWarehouseData]], radius_miles: float) -> np.ndarray:
+        """City numbers whose analysis at radius_miles can change when these warehouses change.
+
+        That is the cities within the radius of them, the cities they belong to, and every city
+        centred on its own warehouses (no coordinates in us_cities).
+        """
+        affected = np.zeros(len(self.city_keys), dtype=bool)
+        affected[self.table_cities[self._rows_near(warehouses, radius_miles + BOUNDARY_TOLERANCE_MILES)]] = True
+        affected[self.own_cities[~self.city_in_table[self.own_cities]]] = True
+        for warehouse in warehouses:
+            if warehouse is None:
+                continue
+            city = warehouse.city.strip() if warehouse.city else ""
+            state = warehouse.state.strip() if warehouse.state else ""
+            number = self.city_numbers.get(f"{city},{state}")
+            if number is not None:
+                affected[number] = True
+        return np.flatnonzero(affected)
+
+    def _nearby_members(self, radius_miles: float, included: Optional[np.ndarray], scope: Optional[np.ndarray]) -> tuple:
+        """(city number, warehouse position) of every warehouse within radius_miles of each city centre.
+
+        Cities with coordinates threshold the distance table; cities known only by their own
+        warehouses are centred on the average position of those (matching) warehouses.
+        """
+        entry_rows, warehouse_idx, distances = self._table_entries(scope)
+        candidate = distances <= radius_miles + BOUNDARY_TOLERANCE_MILES
+        keep = candidate & (distances <= radius_miles - BOUNDARY_TOLERANCE_MILES)
+        borderline = np.flatnonzero(candidate & (distances > radius_miles - BOUNDARY_TOLERANCE_MILES))
+        for entry in borderline.tolist():
+            row = entry_rows[entry]
+            warehouse = self.valid_warehouses[warehouse_idx[entry]]
+            keep[entry] = haversine(self.city_lats[row], self.city_lngs[row], warehouse.lat, warehouse.lng) <= radius_miles
+        cities = [self.table_cities[entry_rows[keep]]]
+        positions = [self.valid_positions[warehouse_idx[keep]]]
+
+        own_cities, own_positions = self._own_members(included, scope)
+        centred = ~self.city_in_table[own_cities]
+        for city in np.unique(own_cities[centred]).tolist():
+            group = own_positions[own_cities == city]
+            group = group[self.warehouse_has_coords[group]]
+            if not len(group):
+                continue
+            # Centroid of the (matching) own warehouses, so it is recomputed for every filter
+            center_lat = sum(self.warehouse_lats[group].tolist()) / len(group)
+            center_lng = sum(self.warehouse_lngs[group].tolist()) / len(group)
+            indices = [index for index, _ in self.warehouse_grid.within_radius(center_lat, center_lng, radius_miles)]
+            cities.append(np.full(len(indices), city, dtype=np.int64))
+            positions.append(self.valid_positions[np.array(indices, dtype=np.int64)])
+
+        cities = np.concatenate(cities)
+        positions = np.concatenate(positions)
+        if included is not None:
+            matching = included[positions]
+            cities, positions = cities[matching], positions[matching]
+        # Warehouses in list order within each city, as a full scan would visit them
+        order = np.lexsort((positions, cities))
+        return cities[order], positions[order]
+
+    def _table_entries(self, scope: Optional[np.ndarray]) -> tuple:
+        """(row, valid warehouse index, distance) of the distance table entries of the cities in scope."""
+        if scope is None:
+            return np.repeat(np.arange(len(self.city_lats)), np.diff(self.offsets)), self.warehouse_idx, self.distances
+        # Gather just the scoped rows' slices, so a small scope does not scan the whole table
+        rows = np.flatnonzero(scope[self.table_cities])
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        entries = np.arange(int(lengths.sum()), dtype=np.int64) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return np.repeat(rows, lengths), self.warehouse_idx[entries], self.distances[entries]
+
+    def scope_cities(self, scope: CoverageScope) -> np.ndarray:
+        """Mask of the city numbers in scope."""
+        return scope.contains(*self.city_locations())
+
+    def _own_members(self, included: Optional[np.ndarray], scope: Optional[np.ndarray]) -> tuple:
+        matching = np.ones(len(self.own_cities), dtype=bool)
+        if included is not None:
+            matching &= included[self.own_positions]
+        if scope is not None:
+            matching &= scope[self.own_cities]
+        return self.own_cities[matching], self.own_positions[matching]
+
+    def city_members(
+        self,
+        radius_miles: Optional[float],
+        included: Optional[np.ndarray] = None,
+        scope: Optional[np.ndarray] = None
+    ) -> tuple:
+        """Warehouses covering each city, as (city number, warehouse position) pairs grouped by city.
+
+        Each city lists its own warehouses first, then the others within radius_miles of its
+        centre. included masks warehouse positions for filtered analyses; scope masks city
+        numbers when only some cities are needed.
+        """
+        own_cities, own_positions = self._own_members(included, scope)
+        if not radius_miles or radius_miles <= 0:
+            return own_cities, own_positions
+
+        near_cities, near_positions = self._nearby_members(radius_miles, included, scope)
+        # Drop nearby warehouses that are already among the city's own (by ID)
+        code_count = int(self.warehouse_id_codes.max()) + 1 if len(self.warehouse_id_codes) else 1
+        own_keys = own_cities * code_count + self.warehouse_id_codes[own_positions]
+        near_keys = near_cities * code_count + self.warehouse_id_codes[near_positions]
+        new = ~np.isin(near_keys, own_keys)
+        near_cities, near_positions = near_cities[new], near_positions[new]
+
+        cities = np.concatenate([own_cities, near_cities])
+        positions = np.concatenate([own_positions, near_positions])
+        # Stable sort by city keeps own warehouses ahead of nearby ones
+        order = np.argsort(cities, kind='stable')
+        return cities[order], positions[order]
+
+    def aggregated_request_count(self, city_key: str, city_info: Dict, radius_miles: float) -> int:
+        """Requests from every city within radius_miles, or the city's own count without coordinates."""
+        city_lat = city_info.get('latitude', 0.0)
+        city_lng = city_info.get('longitude', 0.0)
+        if not (city_lat and city_lng):
+            return self.inputs.city_request_counts.get(city_key, 0)
+
+        demand_index = self._demand_indexes.get(radius_miles)
+        if demand_index is None:
+            demand_cities = self.inputs.us_cities if self.inputs.demand_cities is None else self.inputs.demand_cities
+            demand_index = build_demand_index(demand_cities, self.inputs.city_request_counts, radius_miles)
+            self._demand_indexes[radius_miles] = demand_index
+        return demand_index.radius_sum(city_lat, city_lng, radius_miles)
+
+    def analyze(
+        self,
+        radius_miles: Optional[float] = None,
+        filters: Optional[CoverageGapFilters] = None,
+        scope: Optional[CoverageScope] = None
+    ) -> CoverageAnalysisResponse:
+        """Coverage analysis for one radius (at most max_radius), optionally restricted to matching warehouses.
+
+        Filters only remove warehouses, so a filtered analysis masks the unfiltered distance
+        table and recounts; request counts do not depend on filters. With filters, cities
+        without matching warehouses are left out.
+
+        With a scope only the cities in it are analyzed, and only the (matching) warehouses
+        located in it or listed as nearby for one of its cities are returned; totals still
+        describe the whole country.
+        """
+        if radius_miles and radius_miles > self.max_radius:
+            raise ValueError(f"Radius {radius_miles} exceeds the engine's maximum radius {self.max_radius}")
+
+        warehouses, included = self.matching_warehouses(filters)
+        scope_mask = self.scope_cities(scope) if scope else None
+        coverage_analysis = self._city_analyses(radius_miles, included, skip_empty=bool(filters), scope=scope_mask)
+        total_warehouses = len(warehouses)
+        if scope:
+            referenced = {wh.id for city in coverage_analysis for wh in city.nearbyWarehouses}
+            located = scope.contains(*warehouse_location_columns(warehouses)).tolist()
+            warehouses = [wh for wh, in_scope in zip(warehouses, located) if in_scope or wh.id in referenced]
+
+        return CoverageAnalysisResponse(
+            warehouses=warehouses,
+            coverageAnalysis=coverage_analysis,
+            average_number_of_requests=self.inputs.average_monthly_requests,
+            totalWarehouses=total_warehouses,
+            totalRequests=self.inputs.total_requests,
+            analysisRadius=radius_miles if radius_miles else 50,  # Use provided radius or default to 50
+            lastPrecacheTimestamp=get_last_precache_timestamp()
+        )
+
+    def matching_warehouses(self, filters: Optional[CoverageGapFilters]) -> tuple:
+        """(warehouses matching filters, mask of their positions), or (all warehouses, None) without filters."""
+        if not filters:
+            return self.inputs.warehouses, None
+        # Lazy import to avoid circular dependency
+        from coverage_gap.coverage_gap_service import apply_warehouse_filters
+        
+        print(f"Applying filters: {filters}")
+        warehouses = apply_warehouse_filters(self.inputs.warehouses, filters)
+        print(f"After filtering: {len(warehouses)} warehouses")
+        included_ids = {wh.id for wh in warehouses}
+        included = np.array([wh.id in included_ids for wh in self.inputs.warehouses], dtype=bool)
+        return warehouses, included
+
+    def city_locations(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Latitude, longitude (0 when missing) and upper-case state per city number, computed once."""
+        if self._city_locations is None:
+            self._city_locations = city_location_columns(self.inputs.us_cities)
+        return self._city_locations
+
+    def analyze_cities(self, radius_miles: Optional[float], cities: np.ndarray) -> List[CoverageAnalysis]:
+        """Unfiltered analyses of just the given cities (numbers in us_cities order), in that order."""
+        scope = np.zeros(len(self.city_keys), dtype=bool)
+        scope[cities] = True
+        analyses = dict(zip(np.flatnonzero(scope).tolist(), self._city_analyses(radius_miles, None, scope=scope)))
+        return [analyses[number] for number in np.asarray(cities).tolist()]
+
+    def _city_analyses(
+        self,
+        radius_miles: Optional[float],
+        included: Optional[np.ndarray],
+        skip_empty: bool = False,
+        scope: Optional[np.ndarray] = None
+    ) -> List[CoverageAnalysis]:
+        """Per-city analyses in us_cities order, for the cities in scope (all by default).
+
+        Statistics are computed for all cities in bulk; only the output objects are built per
+        city. skip_empty leaves out cities without (matching) warehouses.
+        """
+        city_count = len(self.city_keys)
+        member_cities, member_positions = self.city_members(radius_miles, included, scope)
+        stats = city_statistics(
+            member_cities, member_positions, city_count, self.warehouse_tiers, self.warehouse_id_codes,
+            self.warehouse_lats, self.warehouse_lngs, self.warehouse_has_coords
+        )
+        counts = stats["counts"]
+        selected = np.ones(city_count, dtype=bool) if scope is None else scope.copy()
+        if skip_empty:
+            selected &= counts > 0
+        selected_list = selected.tolist()
+
+        if scope is None:
+            selected_cities = [
+                (number, city_key, city_info)
+                for number, (city_key, city_info) in enumerate(self.inputs.us_cities.items())
+                if selected_list[number]
+            ]
+        else:
+            # Look up just the selected cities rather than walking all of them
+            selected_cities = [
+                (number, self.city_keys[number], self.inputs.us_cities[self.city_keys[number]])
+                for number in np.flatnonzero(selected).tolist()
+            ]
+
+        expanded = bool(radius_miles and radius_miles > 0)
+        request_counts = np.zeros(city_count, dtype=np.int64)
+        for number, city_key, city_info in selected_cities:
+            if expanded:
+                request_counts[number] = self.aggregated_request_count(city_key, city_info, radius_miles)
+            else:
+                request_counts[number] = self.inputs.city_request_counts.get(city_key, 0)
+        classes = classify_cities(counts, request_counts)
+
+        offsets = stats["offsets"].tolist()
+        counts_list = counts.tolist()
+        tier_counts = stats["tier_counts"].tolist()
+        average_distances = stats["average_distances"]
+        expansion_opportunity = classes["expansion_opportunity"].tolist()
+        has_coverage_gap = classes["has_coverage_gap"].tolist()
+        warehouses_per_100_sq_miles = classes["warehouses_per_100_sq_miles"].tolist()
+        request_counts_list = request_counts.tolist()
+        all_warehouses = self.inputs.warehouses
+
+        coverage_analysis = []
+        for number, _, city_info in selected_cities:
+            warehouse_count = counts_list[number]
+            first = offsets[number]
+            leading = min(warehouse_count, NEARBY_WAREHOUSE_COUNT)
+            nearby_warehouses = []
+            for member, position in zip(range(first, first + leading), member_positions[first:first + leading].tolist()):
+                wh = all_warehouses[position]
+                nearby_warehouses.append(MockWarehouse(
+                    id=wh.id,
+                    name=wh.name,
+                    tier=wh.tier,
+                    distance=float(average_distances[member])
+                ))
+            gold_count, silver_count, bronze_count, un_tiered_count = tier_counts[number]
+            coverage_analysis.append(CoverageAnalysis(
+                city=city_info["city"],
+                state=city_info["state"],
+                latitude=city_info["latitude"],
+                longitude=city_info["longitude"],
+                zipcodes=city_info["zipcodes"],
+                nearbyWarehouses=nearby_warehouses,
+                warehouseCount=warehouse_count,
+                hasCoverageGap=has_coverage_gap[number],
+                expansionOpportunity=expansion_opportunity[number],
+                goldWarehouseCount=gold_count,
+                silverWarehouseCount=silver_count,
+                bronzeWarehouseCount=bronze_count,
+                unTieredWarehouseCount=un_tiered_count,
+                warehousesPer100SqMiles=warehouses_per_100_sq_miles[number],
+                reqCount=request_counts_list[number]
+            ))
+
+        return coverage_analysis
+
+
+async def build_coverage_engine(max_radius: float, inputs: Optional[CoverageInputs] = None) -> CoverageEngine:
+    """Load inputs (unless given) and build the distance table up to max_radius."""
+    if inputs is None:
+        with job_stage("load_inputs"):
+            inputs = await load_coverage_inputs()
+    # Lazy import to avoid circular dependency
+    from coverage_gap.coverage_workers import build_engine_in_worker
+    
+    print(f"[COVERAGE_ENGINE] Building distance table: {len(inputs.us_cities)} cities x {len(inputs.warehouses)} warehouses up to {max_radius} miles")
+    with job_stage("build_distance_table"):
+        engine = await build_engine_in_worker(inputs, max_radius)
+    print(f"[COVERAGE_ENGINE] Distance table holds {len(engine.warehouse_idx)} city-warehouse pairs")
+    record_inputs(
+        requestsSnapshotVersion=inputs.requests_snapshot_version,
+        warehousesDigest=warehouse_set_digest(inputs.warehouses),
+        warehouses=len(inputs.warehouses),
+        cities=len(inputs.us_cities),
+        totalRequests=inputs.total_requests,
+        distancePairs=len(engine.warehouse_idx)
+    )
+    return engine
+
+
+# Concurrent callers share one engine build
+_engine_lock = asyncio.Lock()
+
+
+async def get_coverage_engine(force_refresh: bool = False) -> CoverageEngine:
+    """Shared coverage engine built at MAX_ENGINE_RADIUS, served from cache unless force_refresh."""
+    if not force_refresh:
+        cached = _cache.get(COVERAGE_ENGINE_KEY)
+        if cached is not None:
+            return cached
+
+    async with _engine_lock:
+        if not force_refresh:
+            cached = _cache.get(COVERAGE_ENGINE_KEY)
+            if cached is not None:
+                return cached
+
+        engine = await build_coverage_engine(MAX_ENGINE_RADIUS)
+        _cache.set(COVERAGE_ENGINE_KEY, engine, ttl=COVERAGE_ENGINE_TTL)
+        return engine
+
+
+def invalidate_coverage_engine() -> None:
+    """Drop the shared engine, so the next analysis rebuilds it from fresh warehouses and Requests."""
+    _cache.delete(COVERAGE_ENGINE_KEY)
+    print("[COVERAGE_ENGINE] Shared coverage engine invalidated")
@@ -4,9 +4,18 @@ Automatically caches results for common radius values every 24 hours.
 """
 import asyncio
 import json
+import time
 from datetime import datetime, timezone
-from typing import List, Dict, AsyncGenerator, Optional
+from typing import List, Dict, AsyncGenerator, Optional, Tuple
 from warehouse.warehouse_service import _cache
+from services.caching.shared_cache import load_cache_entries, publish_cache_entries
+from coverage_gap.coverage_usage import (
+    POPULAR_PRECACHE_BUDGET_SECONDS,
+    POPULAR_PRECACHE_COUNT,
+    decay_usage,
+    popular_combinations
+)
+from coverage_gap.precache_jobs import finish_job, job_stage, precache_job, record_error, record_radius, record_retry, record_stage
 
 # Pre-cached radius values (as floats to match query parameter types)
 PRECACHED_RADII = [25.0, 50.0, 100.0, 250.0, 500.0]
@@ -20,10 +29,24 @@ MAX_RETRIES = 3
 # Base delay for exponential backoff (in seconds)
 RETRY_BASE_DELAY = 5
 
+# Shared-cache snapshot of the precached results, for workers that did not compute them
+SHARED_PRECACHE_NAME = "coverage_gap:precache"
+SHARED_POPULAR_NAME = "coverage_gap:popular"
+
+# Filter and radius combinations precached for popularity, kept for refreshing after warehouse changes
+POPULAR_PRECACHED_KEY = "coverage_gap:popular:precached"
+
+# Engine the precached radii were computed from, kept as long as they are so warehouse changes can be patched in
+PRECACHE_ENGINE_KEY = "coverage_gap:precache:engine"
+
 def get_precache_key(radius: float) -> str:
     """Generate cache key for pre-cached results."""
     return f"coverage_gap:precached:radius_{radius}"
 
+def get_precache_engine_key(radius: float) -> str:
+    """Cache key for the version of the engine a pre-cached result was computed from."""
+    return f"coverage_gap:precached:radius_{radius}:engine"
+
 def save_last_precache_timestamp() -> str:
     """
     Save the current timestamp as the last precache completion time.
@@ -42,126 +65,230 @@ def get_last_precache_timestamp() -> Optional[str]:
     """
     return _cache.get(LAST_PRECACHE_TIMESTAMP_KEY)
 
-async def precache_coverage_gap_analysis(radius: float) -> bool:
+async def precache_radius_from_engine(engine, radius: float) -> bool:
     """
-    Pre-cache coverage gap analysis for a specific radius.
+    Pre-cache coverage gap analysis for one radius from an already built coverage engine.
     Returns True if successful, False otherwise.
     """
+    started = time.monotonic()
     try:
         # Lazy import to avoid circular dependency
-        from coverage_gap.coverage_gap_service import get_coverage_gap_analysis
-        
-        print(f"[PRECACHE] Starting pre-cache for radius: {radius} miles")
-        
-        # Generate cache key
-        cache_key = get_precache_key(radius)
+        from coverage_gap.coverage_workers import analyze_in_worker
         
-        # Run analysis with no filters (most common case)
-        # Use skip_precache=True to force fresh analysis and bypass existing cache
-        result = await get_coverage_gap_analysis(filters=None, radius_miles=radius, skip_precache=True)
+        result = await analyze_in_worker(engine, radius)
         
         # Cache with 25 hour TTL (slightly longer than 24h to ensure overlap)
-        _cache.set(cache_key, result, ttl=90000)  # 25 hours in seconds
+        _cache.set(get_precache_key(radius), result, ttl=90000)  # 25 hours in seconds
+        _cache.set(get_precache_engine_key(radius), engine.version, ttl=90000)
         
+        record_radius(radius, True, time.monotonic() - started)
         print(f"[PRECACHE] ✓ Successfully cached radius {radius} miles")
         return True
         
     except Exception as e:
+        record_radius(radius, False, time.monotonic() - started)
+        record_error(f"Radius {radius}: {str(e)}")
         print(f"[PRECACHE] ✗ Error caching radius {radius}: {str(e)}")
         return False
 
-async def precache_all_radii() -> Dict[float, str]:
+async def precache_radii_from_engine(engine, radii: List[float]) -> AsyncGenerator[Tuple[float, bool], None]:
     """
-    Pre-cache all configured radius values.
-    Includes automatic retry mechanism for failed radii with exponential backoff.
-    Returns status for each radius.
+    Pre-cache several radii from one coverage engine concurrently, each in its own worker process.
+    Every radius is published to the cache the moment it finishes; yields (radius, success) in completion order.
     """
-    print("[PRECACHE] ===== Starting pre-cache job =====")
-    results = {}
+    started = finished = time.monotonic()
     
-    # Initial attempt for all radii
-    for radius in PRECACHED_RADII:
-        success = await precache_coverage_gap_analysis(radius)
-        results[radius] = "success" if success else "failed"
+    async def cache_radius(radius: float) -> Tuple[float, bool]:
+        nonlocal finished
+        success = await precache_radius_from_engine(engine, radius)
+        finished = time.monotonic()
+        return radius, success
     
-    # Retry mechanism for failed radii
-    retry_attempt = 0
-    while retry_attempt < MAX_RETRIES:
-        # Get list of failed radii
-        failed_radii = [radius for radius, status in results.items() if status == "failed"]
-        
-        if not failed_radii:
-            # All radii succeeded, break out of retry loop
-            break
-        
-        retry_attempt += 1
-        # Exponential backoff: 5s, 10s, 20s
-        retry_delay = RETRY_BASE_DELAY * (2 ** (retry_attempt - 1))
-        
-        print(f"[PRECACHE] ===== Retry attempt {retry_attempt}/{MAX_RETRIES} for {len(failed_radii)} failed radii =====")
-        print(f"[PRECACHE] Waiting {retry_delay} seconds before retry...")
-        await asyncio.sleep(retry_delay)
+    _cache.set(PRECACHE_ENGINE_KEY, engine, ttl=90000)
+    try:
+        for outcome in asyncio.as_completed([cache_radius(radius) for radius in radii]):
+            yield await outcome
+    finally:
+        # From the first analysis starting to the last one finishing, not counting time the caller spends between yields
+        record_stage("analyze_radii", finished - started)
+
+async def precache_radii(radii: List[float]) -> Dict[float, bool]:
+    """
+    Pre-cache several radii in one pass: inputs are fetched and city-warehouse distances
+    computed once, up to the largest supported radius, then the radii are emitted in parallel by thresholding.
+    The rebuilt engine also replaces the shared one used for on-demand radii.
+    Returns success per radius.
+    """
+    try:
+        # Lazy import to avoid circular dependency
+        from coverage_gap.coverage_engine import get_coverage_engine
         
-        # Retry each failed radius
-        for failed_radius in failed_radii:
-            print(f"[PRECACHE] Retrying pre-cache for radius: {failed_radius} miles")
-            success = await precache_coverage_gap_analysis(failed_radius)
-            results[failed_radius] = "success" if success else "failed"
-            
-            status_msg = "✓ Retry successful" if success else "✗ Retry failed"
-            print(f"[PRECACHE] {status_msg} for radius {failed_radius} miles")
+        print(f"[PRECACHE] Building coverage engine for radii: {radii}")
+        engine = await get_coverage_engine(force_refresh=True)
+    except Exception as e:
+        record_error(f"Coverage engine: {str(e)}")
+        print(f"[PRECACHE] ✗ Error building coverage engine: {str(e)}")
+        return {radius: False for radius in radii}
     
-    # Save timestamp after completion (even if some failed, we still record the run)
-    save_last_precache_timestamp()
+    outcomes = {radius: success async for radius, success in precache_radii_from_engine(engine, radii)}
+    return {radius: outcomes[radius] for radius in radii}
+
+async def precache_payloads(radii: List[float]) -> int:
+    """
+    Serialize and compress the response bodies of precached radii, in every wire format.
+    Run after the precache timestamp is saved, since the bodies embed it.
+    Returns the number of bodies built.
+    """
+    # Lazy import to avoid circular dependency
+    from coverage_gap.coverage_payloads import RESPONSE_FORMATS, PrecachedPayload, encode_precached_bodies, get_precached_payload_key
+    from coverage_gap.coverage_workers import run_in_worker
     
-    print(f"[PRECACHE] ===== Pre-cache job completed =====")
-    print(f"[PRECACHE] Results: {results}")
-    if retry_attempt > 0:
-        print(f"[PRECACHE] Used {retry_attempt} retry attempt(s)")
+    timestamp = get_last_precache_timestamp()
+    built = 0
+    with job_stage("serialize_payloads"):
+        for radius in radii:
+            result = _cache.get(get_precache_key(radius))
+            if not result:
+                continue
+            result.lastPrecacheTimestamp = timestamp
+            try:
+                # Dumping and JSON-encoding every city holds the GIL for seconds, so it runs in a worker process
+                bodies = await run_in_worker(encode_precached_bodies, result, RESPONSE_FORMATS)
+            except Exception as e:
+                print(f"[PRECACHE] ✗ Error serializing radius {radius}: {str(e)}")
+                continue
+            for response_format, body in bodies.items():
+                payload = PrecachedPayload(source=result, timestamp=timestamp, **body)
+                _cache.set(get_precached_payload_key(radius, response_format), payload, ttl=90000)
+                built += 1
     
-    return results
+    print(f"[PRECACHE] Serialized {built} pre-cached response bodies")
+    return built
 
-async def precache_all_radii_stream() -> AsyncGenerator[str, None]:
+async def publish_precached_results(radii: List[float]) -> bool:
     """
-    Pre-cache all configured radius values with streaming progress updates via SSE.
-    Includes automatic retry mechanism for failed radii with exponential backoff.
-    Yields progress messages and final results.
+    Publish the precached results, the engine versions they came from, their serialized bodies
+    and the precache timestamp to the shared cache, so the other workers serve them without recomputing.
+    Returns True if published.
     """
-    def format_log(message: str, progress: Optional[float] = None) -> str:
-        """Helper to format SSE log messages"""
-        log_data = {"type": "log", "message": message}
-        if progress is not None:
-            log_data["progress"] = progress
-        return f"data: {json.dumps(log_data)}\n\n"
+    # Lazy import to avoid circular dependency
+    from coverage_gap.coverage_payloads import RESPONSE_FORMATS, get_precached_payload_key
     
-    def format_data(data: Dict) -> str:
-        """Helper to format final result"""
-        return f"data: {json.dumps({'type': 'data', 'data': data})}\n\n"
+    key_ttls = {LAST_PRECACHE_TIMESTAMP_KEY: 2592000}
+    for radius in radii:
+        key_ttls[get_precache_key(radius)] = 90000
+        key_ttls[get_precache_engine_key(radius)] = 90000
+        for response_format in RESPONSE_FORMATS:
+            key_ttls[get_precached_payload_key(radius, response_format)] = 90000
+    try:
+        with job_stage("publish"):
+            return await publish_cache_entries(SHARED_PRECACHE_NAME, key_ttls)
+    except Exception as e:
+        record_error(f"Publish: {str(e)}")
+        print(f"[PRECACHE] ✗ Error publishing pre-cached results: {str(e)}")
+        return False
+
+async def load_precached_results() -> bool:
+    """
+    Load precached radii and popular combinations published by another worker, if newer than the ones held here.
+    Returns True if results were loaded.
+    """
+    loaded = False
+    for name in (SHARED_PRECACHE_NAME, SHARED_POPULAR_NAME):
+        try:
+            loaded = await load_cache_entries(name) or loaded
+        except Exception as e:
+            print(f"[PRECACHE] ✗ Error loading shared pre-cached results ({name}): {str(e)}")
+    return loaded
+
+async def precache_combinations(engine, combinations: List) -> Dict[str, str]:
+    """
+    Pre-cache filter and radius combinations from an already built coverage engine, in the order
+    given, under their regular analysis cache keys. Combinations still waiting once
+    POPULAR_PRECACHE_BUDGET_SECONDS have been spent are skipped.
+    Returns status per cache key.
+    """
+    # Lazy import to avoid circular dependency
+    from coverage_gap.coverage_workers import analyze_in_worker
     
-    def format_error(error: str) -> str:
-        """Helper to format error message"""
-        return f"data: {json.dumps({'type': 'error', 'message': error})}\n\n"
+    started = time.monotonic()
+    results = {}
+    for cache_key, filters, radius in combinations:
+        if time.monotonic() - started > POPULAR_PRECACHE_BUDGET_SECONDS:
+            results[cache_key] = "skipped"
+            continue
+        try:
+            result = await analyze_in_worker(engine, radius, filters)
+            _cache.set(cache_key, result, ttl=90000)  # 25 hours in seconds
+            results[cache_key] = "success"
+        except Exception as e:
+            record_error(f"{cache_key}: {str(e)}")
+            print(f"[PRECACHE] ✗ Error caching {cache_key}: {str(e)}")
+            results[cache_key] = "failed"
     
+    cached = [(cache_key, filters, radius) for cache_key, filters, radius in combinations if results[cache_key] == "success"]
+    _cache.set(POPULAR_PRECACHED_KEY, cached, ttl=90000)
     try:
-        yield format_log("Starting pre-cache job for all radii", 0)
-        print("[PRECACHE] ===== Starting pre-cache job =====")
+        await publish_cache_entries(SHARED_POPULAR_NAME, {cache_key: 90000 for cache_key, _, _ in cached})
+    except Exception as e:
+        print(f"[PRECACHE] ✗ Error publishing popular combinations: {str(e)}")
+    return results
+
+async def precache_popular_combinations() -> Dict[str, str]:
+    """
+    Pre-cache the POPULAR_PRECACHE_COUNT most-used filter and radius combinations (within the
+    compute budget), then age the usage counts.
+    Returns status per cache key.
+    """
+    combinations = await popular_combinations(POPULAR_PRECACHE_COUNT)
+    if not combinations:
+        return {}
+    
+    try:
+        # Lazy import to avoid circular dependency
+        from coverage_gap.coverage_engine import get_coverage_engine
         
+        print(f"[PRECACHE] Pre-caching {len(combinations)} popular combinations: {[cache_key for cache_key, _, _ in combinations]}")
+        with job_stage("popular_combinations"):
+            engine = await get_coverage_engine()
+            results = await precache_combinations(engine, combinations)
+    except Exception as e:
+        record_error(f"Popular combinations: {str(e)}")
+        print(f"[PRECACHE] ✗ Error pre-caching popular combinations: {str(e)}")
+        results = {cache_key: "failed" for cache_key, _, _ in combinations}
+    
+    await decay_usage()
+    print(f"[PRECACHE] Popular combinations: {results}")
+    return results
+
+def get_popular_precached_combinations() -> List:
+    """(cache key, filters, radius) of the popular combinations precached by the last run."""
+    return _cache.get(POPULAR_PRECACHED_KEY) or []
+
+async def precache_coverage_gap_analysis(radius: float) -> bool:
+    """
+    Pre-cache coverage gap analysis for a specific radius.
+    Returns True if successful, False otherwise.
+    """
+    print(f"[PRECACHE] Starting pre-cache for radius: {radius} miles")
+    outcomes = await precache_radii([radius])
+    return outcomes[radius]
+
+async def precache_all_radii(trigger: str = "scheduled") -> Dict[float, str]:
+    """
+    Pre-cache all configured radius values.
+    Includes automatic retry mechanism for failed radii with exponential backoff.
+    The run is registered in the precache job registry under the given trigger.
+    Returns status for each radius.
+    """
+    with precache_job("coverage_gap", trigger) as job:
+        print("[PRECACHE] ===== Starting pre-cache job =====")
         results = {}
-        total_radii = len(PRECACHED_RADII)
         
-        # Initial attempt for all radii
-        for index, radius in enumerate(PRECACHED_RADII):
-            # Calculate progress percentage
-            progress = (index / total_radii) * 100
-            
-            yield format_log(f"Pre-caching radius {radius} miles ({index + 1}/{total_radii})...", progress)
-            print(f"[PRECACHE] Starting pre-cache for radius: {radius} miles")
-            
-            success = await precache_coverage_gap_analysis(radius)
-            results[radius] = "success" if success else "failed"
-            
-            status_msg = "✓ Successfully cached" if success else "✗ Failed to cache"
-            yield format_log(f"{status_msg} radius {radius} miles", progress)
+        # Initial attempt for all radii, sharing one engine pass
+        outcomes = await precache_radii(PRECACHED_RADII)
+        for radius in PRECACHED_RADII:
+            results[radius] = "success" if outcomes[radius] else "failed"
         
         # Retry mechanism for failed radii
         retry_attempt = 0
@@ -174,56 +301,172 @@ async def precache_all_radii_stream() -> AsyncGenerator[str, None]:
                 break
             
             retry_attempt += 1
+            record_retry(retry_attempt)
             # Exponential backoff: 5s, 10s, 20s
             retry_delay = RETRY_BASE_DELAY * (2 ** (retry_attempt - 1))
             
-            yield format_log(f"Retrying {len(failed_radii)} failed radii (attempt {retry_attempt}/{MAX_RETRIES})...", 90)
             print(f"[PRECACHE] ===== Retry attempt {retry_attempt}/{MAX_RETRIES} for {len(failed_radii)} failed radii =====")
+            print(f"[PRECACHE] Waiting {retry_delay} seconds before retry...")
+            with job_stage("retry_wait"):
+                await asyncio.sleep(retry_delay)
             
-            # Wait before retry with exponential backoff
-            yield format_log(f"Waiting {retry_delay} seconds before retry...", 90)
-            await asyncio.sleep(retry_delay)
-            
-            # Retry each failed radius
+            # Retry the failed radii together
+            print(f"[PRECACHE] Retrying pre-cache for radii: {failed_radii}")
+            outcomes = await precache_radii(failed_radii)
             for failed_radius in failed_radii:
-                yield format_log(f"Retrying radius {failed_radius} miles...", 92)
-                print(f"[PRECACHE] Retrying pre-cache for radius: {failed_radius} miles")
-                
-                success = await precache_coverage_gap_analysis(failed_radius)
+                success = outcomes[failed_radius]
                 results[failed_radius] = "success" if success else "failed"
                 
                 status_msg = "✓ Retry successful" if success else "✗ Retry failed"
-                yield format_log(f"{status_msg} for radius {failed_radius} miles", 92)
+                print(f"[PRECACHE] {status_msg} for radius {failed_radius} miles")
         
         # Save timestamp after completion (even if some failed, we still record the run)
-        timestamp = save_last_precache_timestamp()
+        save_last_precache_timestamp()
+        await precache_payloads(PRECACHED_RADII)
+        await publish_precached_results(PRECACHED_RADII)
+        popular_results = await precache_popular_combinations()
         
-        # Final result
-        yield format_log("Pre-cache job completed", 100)
         print(f"[PRECACHE] ===== Pre-cache job completed =====")
         print(f"[PRECACHE] Results: {results}")
+        if popular_results:
+            print(f"[PRECACHE] Popular combinations: {sum(1 for status in popular_results.values() if status == 'success')}/{len(popular_results)} cached")
+        if retry_attempt > 0:
+            print(f"[PRECACHE] Used {retry_attempt} retry attempt(s)")
         
-        # Count successes and failures
-        success_count = sum(1 for status in results.values() if status == "success")
-        failed_count = len(results) - success_count
+        finish_job(job, all(status == "success" for status in results.values()))
         
-        final_data = {
-            "message": "Pre-cache job completed",
-            "results": results,
-            "summary": {
-                "total": len(results),
-                "successful": success_count,
-                "failed": failed_count,
-                "radii": list(results.keys()),
-                "retriesUsed": retry_attempt if failed_count > 0 else 0
-            },
-            "lastPrecacheTimestamp": timestamp
-        }
-        
-        yield format_data(final_data)
-        
-    except Exception as e:
-        error_msg = str(e)
-        print(f"[PRECACHE] Error in pre-cache job: {error_msg}")
-        yield format_error(f"Pre-cache failed: {error_msg}")
+        return results
 
+async def precache_all_radii_stream() -> AsyncGenerator[str, None]:
+    """
+    Pre-cache all configured radius values with streaming progress updates via SSE.
+    Includes automatic retry mechanism for failed radii with exponential backoff.
+    Yields progress messages and final results.
+    """
+    def format_log(message: str, progress: Optional[float] = None) -> str:
+        """Helper to format SSE log messages"""
+        log_data = {"type": "log", "message": message}
+        if progress is not None:
+            log_data["progress"] = progress
+        return f"data: {json.dumps(log_data)}\n\n"
+    
+    def format_data(data: Dict) -> str:
+        """Helper to format final result"""
+        return f"data: {json.dumps({'type': 'data', 'data': data})}\n\n"
+    
+    def format_error(error: str) -> str:
+        """Helper to format error message"""
+        return f"data: {json.dumps({'type': 'error', 'message': error})}\n\n"
+    
+    with precache_job("coverage_gap", "manual") as job:
+        try:
+            yield format_log("Starting pre-cache job for all radii", 0)
+            print("[PRECACHE] ===== Starting pre-cache job =====")
+            
+            # Lazy import to avoid circular dependency
+            from coverage_gap.coverage_engine import get_coverage_engine
+            
+            total_radii = len(PRECACHED_RADII)
+            
+            # Fetch inputs and compute city-warehouse distances once, up to the largest radius
+            yield format_log(f"Computing city-warehouse distances up to {max(PRECACHED_RADII)} miles...", 0)
+            try:
+                engine = await get_coverage_engine(force_refresh=True)
+            except Exception as e:
+                record_error(f"Coverage engine: {str(e)}")
+                print(f"[PRECACHE] ✗ Error building coverage engine: {str(e)}")
+                yield format_log(f"✗ Failed to compute distances: {str(e)}", 0)
+                engine = None
+            
+            # Initial attempt for all radii, in parallel; each is cached as soon as it finishes
+            results = {radius: "failed" for radius in PRECACHED_RADII}
+            if engine:
+                yield format_log(f"Pre-caching {total_radii} radii in parallel...", 0)
+                print(f"[PRECACHE] Starting pre-cache for radii: {PRECACHED_RADII}")
+                finished = 0
+                async for radius, success in precache_radii_from_engine(engine, PRECACHED_RADII):
+                    finished += 1
+                    progress = (finished / total_radii) * 90
+                    results[radius] = "success" if success else "failed"
+                    
+                    status_msg = "✓ Successfully cached" if success else "✗ Failed to cache"
+                    yield format_log(f"{status_msg} radius {radius} miles ({finished}/{total_radii})", progress)
+            
+            # Retry mechanism for failed radii
+            retry_attempt = 0
+            while retry_attempt < MAX_RETRIES:
+                # Get list of failed radii
+                failed_radii = [radius for radius, status in results.items() if status == "failed"]
+                
+                if not failed_radii:
+                    # All radii succeeded, break out of retry loop
+                    break
+                
+                retry_attempt += 1
+                record_retry(retry_attempt)
+                # Exponential backoff: 5s, 10s, 20s
+                retry_delay = RETRY_BASE_DELAY * (2 ** (retry_attempt - 1))
+                
+                yield format_log(f"Retrying {len(failed_radii)} failed radii (attempt {retry_attempt}/{MAX_RETRIES})...", 90)
+                print(f"[PRECACHE] ===== Retry attempt {retry_attempt}/{MAX_RETRIES} for {len(failed_radii)} failed radii =====")
+                
+                # Wait before retry with exponential backoff
+                yield format_log(f"Waiting {retry_delay} seconds before retry...", 90)
+                with job_stage("retry_wait"):
+                    await asyncio.sleep(retry_delay)
+                
+                # Retry the failed radii together
+                yield format_log(f"Retrying radii {', '.join(str(radius) for radius in failed_radii)} miles...", 92)
+                print(f"[PRECACHE] Retrying pre-cache for radii: {failed_radii}")
+                outcomes = await precache_radii(failed_radii)
+                
+                for failed_radius in failed_radii:
+                    success = outcomes[failed_radius]
+                    results[failed_radius] = "success" if success else "failed"
+                    
+                    status_msg = "✓ Retry successful" if success else "✗ Retry failed"
+                    yield format_log(f"{status_msg} for radius {failed_radius} miles", 92)
+            
+            # Save timestamp after completion (even if some failed, we still record the run)
+            timestamp = save_last_precache_timestamp()
+            
+            yield format_log("Serializing pre-cached responses...", 98)
+            await precache_payloads(PRECACHED_RADII)
+            await publish_precached_results(PRECACHED_RADII)
+            
+            yield format_log("Pre-caching popular filter combinations...", 99)
+            popular_results = await precache_popular_combinations()
+            
+            # Final result
+            yield format_log("Pre-cache job completed", 100)
+            print(f"[PRECACHE] ===== Pre-cache job completed =====")
+            print(f"[PRECACHE] Results: {results}")
+            
+            # Count successes and failures
+            success_count = sum(1 for status in results.values() if status == "success")
+            failed_count = len(results) - success_count
+            
+            final_data = {
+                "message": "Pre-cache job completed",
+                "results": results,
+                "summary": {
+                    "total": len(results),
+                    "successful": success_count,
+                    "failed": failed_count,
+                    "radii": list(results.keys()),
+                    "retriesUsed": retry_attempt if failed_count > 0 else 0
+                },
+                "popularCombinations": popular_results,
+                "lastPrecacheTimestamp": timestamp,
+                "jobId": job.id
+            }
+            
+            finish_job(job, failed_count == 0)
+            yield format_data(final_data)
+            
+        except Exception as e:
+            error_msg = str(e)
+            print(f"[PRECACHE] Error in pre-cache job: {error_msg}")
+            record_error(error_msg)
+            finish_job(job, False)
+            yield format_error(f"Pre-cache failed: {error_msg}")
@@ -1,21 +1,94 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from typing import Literal, Optional
 
-from warehouse.models import ResponseModel, CoverageGapRequest, CoverageAnalysisResponse, AIAnalysisData
-from coverage_gap.coverage_gap_service import get_coverage_gap_analysis, get_coverage_gap_analysis_stream, get_ai_analysis_only
-from coverage_gap.coverage_gap_precache import precache_all_radii, precache_all_radii_stream
-from coverage_gap.ai_analysis_precache import precache_ai_analysis_stream
+from warehouse.models import ResponseModel, CoverageGapRequest, CoverageAnalysisResponse, AIAnalysisData, CoverageGapFilters, CoverageGridResponse
+from coverage_gap.coverage_gap_service import get_coverage_gap_analysis, get_coverage_gap_analysis_stream, get_ai_analysis_only, get_precached_payload
+from coverage_gap.coverage_gap_precache import get_last_precache_timestamp, precache_all_radii, precache_all_radii_stream
+from coverage_gap.ai_analysis_precache import get_last_ai_analysis_precache_timestamp, precache_ai_analysis_stream
+from coverage_gap.precache_jobs import get_precache_jobs
+from coverage_gap.coverage_view import CoverageView, parse_bbox
+from coverage_gap.coverage_grid import DEFAULT_GRID_RESOLUTION, get_coverage_grid
+from services.caching.leader_election import get_leader_election
+from services.caching.conditional_requests import COVERAGE_CACHE_MAX_AGE, cache_control, etag_matches, make_etag, not_modified
 
 coverage_gap_router = APIRouter(
         tags=["coverage_gap"] 
 )
 
 
+def build_coverage_response(
+    http_request: Request,
+    filters: Optional[CoverageGapFilters],
+    radius: Optional[float],
+    format: str,
+    bbox: Optional[str],
+    state: Optional[str],
+    offset: int,
+    limit: Optional[int]
+) -> Response:
+    """Coverage gap response shared by the GET and POST endpoints."""
+    view = None
+    if bbox or state or offset or limit:
+        try:
+            view = CoverageView(bbox=parse_bbox(bbox) if bbox else None, state=state, offset=offset, limit=limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid bbox: {str(e)}")
+    
+    try:
+        stream_headers = {
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"  # Disable nginx buffering
+        }
+        
+        # Precached radii are served as finished (and pre-compressed) response bodies,
+        # validated by ETags that change whenever the precache run replaces them
+        payload = get_precached_payload(filters, radius, format)
+        if payload:
+            if_none_match = http_request.headers.get("if-none-match")
+            if view is None:
+                # Each content coding has its own validator; a 304 carries the one the 200 would have sent
+                body, encoding = payload.encoded(http_request.headers.get("accept-encoding", ""))
+                etag = payload.etag_for(encoding)
+                if etag_matches(if_none_match, [etag]):
+                    return not_modified(etag, COVERAGE_CACHE_MAX_AGE, vary="Accept-Encoding")
+                print("=== COVERAGE GAP ANALYSIS (PRECACHED PAYLOAD) ===")
+                headers = {
+                    "Cache-Control": cache_control(COVERAGE_CACHE_MAX_AGE),
+                    "ETag": etag,
+                    "Vary": "Accept-Encoding"
+                }
+                if encoding:
+                    headers["Content-Encoding"] = encoding
+                return Response(content=body, media_type="text/event-stream", headers=headers)
+            
+            # A view of a precached result is fully determined by the result and the view
+            etag = make_etag(payload.etag, view.bbox, view.state, view.offset, view.limit)
+            if etag_matches(if_none_match, [etag]):
+                return not_modified(etag, COVERAGE_CACHE_MAX_AGE)
+            stream_headers.update({"Cache-Control": cache_control(COVERAGE_CACHE_MAX_AGE), "ETag": etag})
+        
+        return StreamingResponse(
+            get_coverage_gap_analysis_stream(filters, radius, format, view),
+            media_type="text/event-stream",
+            headers=stream_headers
+        )
+    except Exception as e:
+        print(f"Error in coverage gap analysis: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Coverage gap analysis failed: {str(e)}")
+
+
 @coverage_gap_router.post("/coverage_gap_warehouses")
 async def coverage_gap_warehouses(
+    http_request: Request,
     request: CoverageGapRequest = CoverageGapRequest(),
-    radius: Optional[float] = None
+    radius: Optional[float] = None,
+    format: Literal["rows", "columnar"] = "rows",
+    bbox: Optional[str] = None,
+    state: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1)
 ):
     """
     Get comprehensive coverage gap analysis with warehouses (grouped by city and radius).
@@ -23,28 +96,86 @@ async def coverage_gap_warehouses(
     
     Query parameters:
     - radius: Radius in miles for grouping nearby warehouses (default: groups by city only)
+    - format: "rows" (default) returns one object per city; "columnar" returns parallel
+      arrays per field with nearby warehouses as indexes into `warehouses`
+    - bbox: "west,south,east,north" in degrees; only cities (and warehouses) inside it are returned
+    - state: only cities (and warehouses) in this state are returned
+    - offset / limit: page through the cities in view; the response's `view` reports
+      `totalCities` and the `nextOffset` to request
     
     Accepts optional filters in request body to filter warehouses by tier, state, city, etc.
     
+    Unfiltered precached radii carry an ETag; send it back in If-None-Match to get a
+    304 when nothing changed since the last precache.
+    
     Returns:
     - SSE stream with progress messages (type: "log") and final data (type: "data")
     - All warehouses in StaticWarehouseData format
     - Coverage analysis by location (grouped by city and radius if provided)
     - Total counts and metrics
     """
+    return build_coverage_response(http_request, request.filters, radius, format, bbox, state, offset, limit)
+
+
+@coverage_gap_router.get("/coverage_gap_warehouses")
+async def coverage_gap_warehouses_get(
+    http_request: Request,
+    radius: Optional[float] = None,
+    format: Literal["rows", "columnar"] = "rows",
+    bbox: Optional[str] = None,
+    state: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1)
+):
+    """
+    Unfiltered coverage gap analysis, with the same query parameters as the POST endpoint.
+    Being a GET, precached radii can be revalidated and cached by browsers, CDNs and proxies.
+    """
+    return build_coverage_response(http_request, None, radius, format, bbox, state, offset, limit)
+
+
+async def build_grid_response(filters: Optional[CoverageGapFilters], resolution: str, cell: Optional[str]) -> ResponseModel[CoverageGridResponse]:
+    """Grid coverage response shared by the GET and POST endpoints."""
     try:
-        return StreamingResponse(
-            get_coverage_gap_analysis_stream(request.filters, radius),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no"  # Disable nginx buffering
-            }
-        )
+        data = await get_coverage_grid(resolution, filters, cell)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid grid request: {str(e)}")
     except Exception as e:
-        print(f"Error in coverage gap analysis: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Coverage gap analysis failed: {str(e)}")
+        print(f"Error in coverage grid analysis: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Coverage grid analysis failed: {str(e)}")
+    return ResponseModel(status="success", data=data)
+
+
+@coverage_gap_router.post("/coverage_gap/grid", response_model=ResponseModel[CoverageGridResponse])
+async def coverage_gap_grid(
+    request: CoverageGapRequest = CoverageGapRequest(),
+    resolution: Literal["national", "regional", "local"] = DEFAULT_GRID_RESOLUTION,
+    cell: Optional[str] = None
+):
+    """
+    Coverage gap analysis aggregated on a fixed grid instead of per city.
+    
+    Query parameters:
+    - resolution: cell size; "national" (4 degrees), "regional" (1 degree) or "local" (0.25 degrees)
+    - cell: ID of a coarser cell to refine; only the cells of `resolution` inside it are returned
+    
+    Accepts optional filters in request body to filter warehouses by tier, state, city, etc.
+    
+    Returns, per cell with warehouses or cities:
+    - Supply: matching warehouses located in the cell, by tier
+    - Demand: US cities in the cell and their requests
+    - Gap metrics: requests per warehouse, coverage gap flag, expansion opportunity and density
+    """
+    return await build_grid_response(request.filters, resolution, cell)
+
+
+@coverage_gap_router.get("/coverage_gap/grid", response_model=ResponseModel[CoverageGridResponse])
+async def coverage_gap_grid_get(
+    resolution: Literal["national", "regional", "local"] = DEFAULT_GRID_RESOLUTION,
+    cell: Optional[str] = None
+):
+    """Unfiltered grid coverage analysis, with the same query parameters as the POST endpoint."""
+    return await build_grid_response(None, resolution, cell)
 
 
 @coverage_gap_router.post("/ai_analysis", response_model=ResponseModel[AIAnalysisData])
@@ -140,3 +271,28 @@ async def trigger_ai_analysis_precache():
         print(f"Error in AI analysis pre-cache job: {str(e)}")
         raise HTTPException(status_code=500, detail=f"AI analysis pre-cache failed: {str(e)}")
 
+
+
+@coverage_gap_router.get("/coverage_gap/precache/status", response_model=ResponseModel[dict])
+async def precache_status(job: Optional[Literal["coverage_gap", "ai_analysis"]] = None):
+    """
+    Status of the recent precache runs (scheduled, startup and manual) on this worker.
+    Scheduled runs only happen on the leader worker, so followers usually list manual runs only.
+    
+    Returns, most recent run first:
+    - state ("running", "completed" or "failed"), trigger and start/finish times
+    - stages: wall time per stage in seconds (loading inputs, building the distance table,
+      analyzing radii, serializing, publishing, popular combinations, waiting between retries)
+    - radii: status, wall time and attempts per radius
+    - inputs: the coverage engine version and the input sizes it was built from
+    - retries and lastError
+    """
+    return ResponseModel(
+        status="success",
+        data={
+            "isLeader": get_leader_election().is_leader,
+            "lastPrecacheTimestamp": get_last_precache_timestamp(),
+            "lastAIAnalysisPrecacheTimestamp": get_last_ai_analysis_precache_timestamp(),
+            "jobs": get_precache_jobs(job)
+        }
+    )
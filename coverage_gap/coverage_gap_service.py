@@ -3,62 +3,35 @@ Coverage gap analysis service.
 Provides comprehensive coverage gap analysis and AI-powered recommendations.
 """
 
-import os
 import json
 from typing import List, Optional, Dict, Any, AsyncGenerator
-from datetime import datetime, timezone
-import math
-import httpx
-from dotenv import load_dotenv
 
 from warehouse.warehouse_service import _cache, fetch_warehouses_from_airtable
 from warehouse.models import (
     CoverageGapFilters,
     CoverageAnalysisResponse,
     AIAnalysisData,
-    StaticWarehouseData,
-    CoverageAnalysis,
-    MockWarehouse
+    StaticWarehouseData
 )
-from services.gemini_services.coverage_gap_analysis import analyze_coverage_gaps_with_ai, get_request_counts_by_city
-from services.geolocation.geolocation_service import haversine
+from services.gemini_services.coverage_gap_analysis import analyze_coverage_gaps_with_ai
+from services.airtable.requests_aggregate import get_requests_aggregate
+from coverage_gap.spatial_index import build_warehouse_grid
+from coverage_gap.us_cities_store import load_us_cities
 from coverage_gap.coverage_gap_precache import get_precache_key, PRECACHED_RADII, get_last_precache_timestamp
-
-load_dotenv()
-AIRTABLE_TOKEN = os.getenv("AIRTABLE_TOKEN")
-BASE_ID = os.getenv("BASE_ID")
-ODER_TABLE_NAME = "Requests"
+from coverage_gap.coverage_engine import get_coverage_engine
+from coverage_gap.coverage_workers import analyze_in_worker
+from coverage_gap.coverage_view import CoverageView, select_view
+from coverage_gap.coverage_usage import get_analysis_cache_key, record_usage
+from coverage_gap.coverage_payloads import (
+    PRECACHED_LOG_MESSAGE, ROWS_FORMAT, PrecachedPayload, format_sse_data, get_precached_payload_key
+)
 
 
 async def get_total_requests_count() -> int:
     """Get total count of requests from the Requests table."""
-    # Check cache first
-    cached = _cache.get("requests:total_count")
-    if cached is not None:
-        return cached
-    
     try:
-        url = f"https://api.airtable.com/v0/{BASE_ID}/{ODER_TABLE_NAME}"
-        headers = {"Authorization": f"Bearer {AIRTABLE_TOKEN}"}
-        params = {}
-        
-        total_count = 0
-        async with httpx.AsyncClient() as client:
-            offset = None
-            while True:
-                if offset:
-                    params["offset"] = offset
-                resp = await client.get(url, headers=headers, params=params)
-                resp.raise_for_status()
-                data = resp.json()
-                total_count += len(data.get("records", []))
-                offset = data.get("offset")
-                if not offset:
-                    break
-            
-            # Cache for 1 hour
-            _cache.set("requests:total_count", total_count, ttl=3600)
-            return total_count
+        aggregate = await get_requests_aggregate()
+        return aggregate.total_count
     except Exception as e:
         print(f"Error getting total requests count: {e}")
         return 0
@@ -72,58 +45,9 @@ async def get_average_monthly_requests() -> int:
     Example: If we're on day 10 of the month and have 50 requests, average = 50/10 = 5 requests/day.
     Example: If average is 13.5, it returns 14 (rounded up).
     """
-    # Check cache first
-    cached = _cache.get("requests:average_monthly")
-    if cached is not None:
-        return cached
-    
     try:
-        url = f"https://api.airtable.com/v0/{BASE_ID}/{ODER_TABLE_NAME}"
-        headers = {"Authorization": f"Bearer {AIRTABLE_TOKEN}"}
-        params = {}
-        
-        # Get current month start
-        now = datetime.now(timezone.utc)
-        month_start = datetime(now.year, now.month, 1, tzinfo=timezone.utc)
-        
-        # Count requests created this month
-        monthly_count = 0
-        async with httpx.AsyncClient() as client:
-            offset = None
-            while True:
-                if offset:
-                    params["offset"] = offset
-                resp = await client.get(url, headers=headers, params=params)
-                resp.raise_for_status()
-                data = resp.json()
-                
-                records = data.get("records", [])
-                for record in records:
-                    created_time_str = record.get("createdTime")
-                    if created_time_str:
-                        try:
-                            # Parse the createdTime (ISO format: "2024-01-15T10:30:00.000Z")
-                            created_time = datetime.fromisoformat(created_time_str.replace('Z', '+00:00'))
-                            if created_time >= month_start:
-                                monthly_count += 1
-                        except (ValueError, AttributeError):
-                            # Skip invalid date formats
-                            continue
-                
-                offset = data.get("offset")
-                if not offset:
-                    break
-        
-        # Calculate average: monthly requests / days elapsed in current month
-        days_elapsed = now.day
-        average = monthly_count / days_elapsed if days_elapsed > 0 else float(monthly_count)
-        
-        # ALWAYS round UP to ensure we don't underestimate capacity needs
-        result = math.ceil(average)
-        
-        # Cache for 1 hour (resets daily since it depends on days_elapsed)
-        _cache.set("requests:average_monthly", result, ttl=3600)
-        return result
+        aggregate = await get_requests_aggregate()
+        return aggregate.average_monthly_requests
     except Exception as e:
         print(f"Error calculating average monthly requests: {e}")
         return 0
@@ -184,45 +108,9 @@ def transform_warehouse_to_static_data(warehouse_record: dict, request_count: in
 
 async def get_warehouse_request_counts() -> Dict[str, int]:
     """Get request counts per warehouse from the Requests table."""
-    # Check cache first
-    cached = _cache.get("requests:warehouse_counts")
-    if cached is not None:
-        return cached
-    
     try:
-        url = f"https://api.airtable.com/v0/{BASE_ID}/{ODER_TABLE_NAME}"
-        headers = {"Authorization": f"Bearer {AIRTABLE_TOKEN}"}
-        params = {}
-        
-        warehouse_counts = {}
-        async with httpx.AsyncClient() as client:
-            offset = None
-            while True:
-                if offset:
-                    params["offset"] = offset
-                resp = await client.get(url, headers=headers, params=params)
-                resp.raise_for_status()
-                data = resp.json()
-                
-                records = data.get("records", [])
-                for record in records:
-                    fields = record.get("fields", {})
-                    warehouse_field = fields.get("Warehouse", [])
-                    
-                    # Count requests per warehouse
-                    for warehouse_id in warehouse_field:
-                        if warehouse_id in warehouse_counts:
-                            warehouse_counts[warehouse_id] += 1
-                        else:
-                            warehouse_counts[warehouse_id] = 1
-                
-                offset = data.get("offset")
-                if not offset:
-                    break
-        
-        # Cache for 1 hour
-        _cache.set("requests:warehouse_counts", warehouse_counts, ttl=3600)
-        return warehouse_counts
+        aggregate = await get_requests_aggregate()
+        return aggregate.warehouse_counts
     except Exception as e:
         print(f"Error getting warehouse request counts: {e}")
         return {}
@@ -326,163 +214,43 @@ def apply_warehouse_filters(warehouses: List['StaticWarehouseData'], filters: 'C
     return filtered
 
 
-def load_us_cities() -> Dict[str, Dict]:
-    """Load all US cities from us_cities.json and return as dict keyed by city,state"""
-    import json
-    
-    try:
-        with open('data/us_cities.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        cities_dict = {}
-        for city_data in data.get('cities', []):
-            city_key = f"{city_data['city']},{city_data['state']}"
-            cities_dict[city_key] = city_data
-        
-        print(f"Loaded {len(cities_dict)} US cities from us_cities.json")
-        return cities_dict
-    except FileNotFoundError:
-        print("Warning: us_cities.json not found. Run generate_us_cities.py first.")
-        return {}
-    except Exception as e:
-        print(f"Error loading US cities: {e}")
-        return {}
-
-
-def calculate_aggregated_request_count(
-    city_lat: float,
-    city_lng: float,
-    radius_miles: float,
-    us_cities: Dict[str, Dict],
-    city_request_counts: Dict[str, int]
-) -> int:
-    """Calculate total request count for a city by aggregating requests from all cities within radius.
-    
-    Optimized: Only checks cities that have requests (from city_request_counts) instead of all cities.
-    
-    Args:
-        city_lat: Latitude of the city
-        city_lng: Longitude of the city
-        radius_miles: Radius in miles to search for nearby cities
-        us_cities: Dictionary of all US cities keyed by "city,state"
-        city_request_counts: Dictionary of request counts per city keyed by "city,state"
-    
-    Returns:
-        Total request count including all cities within the radius
+def get_precached_payload(
+    filters: Optional[CoverageGapFilters] = None,
+    radius_miles: Optional[float] = None,
+    response_format: str = ROWS_FORMAT
+) -> Optional[PrecachedPayload]:
+    """Finished SSE body for an unfiltered precached radius, when one is current.
+    
+    Bodies are only served while they match the precached result and the last precache
+    run; otherwise the stream below serializes the result as usual.
     """
-    if not city_lat or not city_lng or radius_miles <= 0:
-        # If no radius or invalid coordinates, return just this city's count
-        return 0
-    
-    total_requests = 0
-    
-    # OPTIMIZATION: Only check cities that have requests (much smaller set!)
-    # Instead of checking all 30,116 cities, only check ~693 cities with requests
-    for other_city_key, request_count in city_request_counts.items():
-        if request_count == 0:
-            continue  # Skip cities with 0 requests
-        
-        other_city_info = us_cities.get(other_city_key)
-        if not other_city_info:
-            continue
-        
-        other_lat = other_city_info.get('latitude')
-        other_lng = other_city_info.get('longitude')
-        
-        # Skip if other city has no valid coordinates
-        if not other_lat or not other_lng:
-            continue
-        
-        # Calculate distance
-        distance = haversine(city_lat, city_lng, other_lat, other_lng)
-        
-        # If within radius, add its request count
-        if distance <= radius_miles:
-            total_requests += request_count
-    
-    return total_requests
-
-
-def get_relevant_cities_for_aggregation(
-    radius_miles: float,
-    us_cities: Dict[str, Dict],
-    city_request_counts: Dict[str, int],
-    warehouse_city_data: Dict[str, Dict]
-) -> set:
-    """Find all cities that need aggregated request count calculation.
-    
-    This includes:
-    1. Cities with requests
-    2. Cities with warehouses
-    3. Cities within radius of cities with requests/warehouses
-    
-    Args:
-        radius_miles: Radius in miles for expansion
-        us_cities: Dictionary of all US cities keyed by "city,state"
-        city_request_counts: Dictionary of request counts per city
-        warehouse_city_data: Dictionary of cities with warehouses
-    
-    Returns:
-        Set of city keys that need aggregated count calculation
-    """
-    relevant_cities = set()
-    
-    # Step 1: Add cities with requests
-    for city_key, count in city_request_counts.items():
-        if count > 0:
-            relevant_cities.add(city_key)
-    
-    # Step 2: Add cities with warehouses
-    for city_key in warehouse_city_data.keys():
-        relevant_cities.add(city_key)
-    
-    # Step 3: Expand - find all cities within radius of relevant cities
-    if radius_miles and radius_miles > 0:
-        expanded_relevant = set(relevant_cities)  # Start with existing relevant cities
-        processed = 0
-        
-        # For each relevant city, find all cities within radius
-        for city_key in relevant_cities:
-            city_info = us_cities.get(city_key)
-            if not city_info:
-                continue
-            
-            city_lat = city_info.get('latitude', 0.0)
-            city_lng = city_info.get('longitude', 0.0)
-            
-            if not city_lat or not city_lng:
-                continue
-            
-            processed += 1
-            if processed % 100 == 0:
-                print(f"  Expanding relevant cities: processed {processed}/{len(relevant_cities)} seed cities...")
-            
-            # Find all cities within radius
-            for other_city_key, other_city_info in us_cities.items():
-                if other_city_key in expanded_relevant:
-                    continue  # Already added
-                
-                other_lat = other_city_info.get('latitude', 0.0)
-                other_lng = other_city_info.get('longitude', 0.0)
-                
-                if not other_lat or not other_lng:
-                    continue
-                
-                distance = haversine(city_lat, city_lng, other_lat, other_lng)
-                if distance <= radius_miles:
-                    expanded_relevant.add(other_city_key)
-        
-        print(f"  Expanded from {len(relevant_cities)} to {len(expanded_relevant)} relevant cities")
-        return expanded_relevant
-    
-    return relevant_cities
+    if filters or radius_miles is None:
+        return None
+    radius_float = float(radius_miles)
+    if radius_float not in PRECACHED_RADII:
+        return None
+    
+    payload = _cache.get(get_precached_payload_key(radius_float, response_format))
+    if payload is None:
+        return None
+    if payload.source is not _cache.get(get_precache_key(radius_float)) or payload.timestamp != get_last_precache_timestamp():
+        return None
+    return payload
 
 
 async def get_coverage_gap_analysis_stream(
     filters: Optional[CoverageGapFilters] = None, 
-    radius_miles: Optional[float] = None
+    radius_miles: Optional[float] = None,
+    response_format: str = ROWS_FORMAT,
+    view: Optional[CoverageView] = None
 ) -> AsyncGenerator[str, None]:
-    """Get comprehensive coverage gap analysis with streaming progress updates via SSE."""
+    """Get comprehensive coverage gap analysis with streaming progress updates via SSE.
+    
+    response_format: "rows" (one object per city) or "columnar" (parallel arrays per field)
+    view: optional bounding box, state and page of cities to return instead of every city;
+        unless a whole-country result is already cached, only the cities in its bounding box
+        and state are computed
+    """
     
     def format_log(message: str, progress: Optional[float] = None) -> str:
         """Helper to format SSE log messages"""
@@ -491,10 +259,11 @@ async def get_coverage_gap_analysis_stream(
             log_data["progress"] = progress
         return f"data: {json.dumps(log_data)}\n\n"
     
-    def format_data(data: CoverageAnalysisResponse) -> str:
+    def format_data(data: CoverageAnalysisResponse, source_key: str) -> str:
         """Helper to format final result"""
-        # Use model_dump with mode='json' to ensure proper serialization
-        return f"data: {json.dumps({'type': 'data', 'data': data.model_dump(mode='json')})}\n\n"
+        if view:
+            data = select_view(data, view, source_key)
+        return format_sse_data(data, response_format)
     
     def format_error(error: str) -> str:
         """Helper to format error message"""
@@ -515,20 +284,15 @@ async def get_coverage_gap_analysis_stream(
                     last_precache_timestamp = get_last_precache_timestamp()
                     if last_precache_timestamp:
                         precached.lastPrecacheTimestamp = last_precache_timestamp
-                    yield format_log("Using pre-cached results", 100)
-                    yield format_data(precached)
+                    yield format_log(PRECACHED_LOG_MESSAGE, 100)
+                    yield format_data(precached, precache_key)
                     return
         
         # STEP 2: Check regular cache (existing logic)
         # Create cache key based on filters and radius
-        if filters:
-            filter_dict = filters.model_dump(exclude_none=True, exclude_unset=True)
-            filter_key = json.dumps(filter_dict, sort_keys=True)
-        else:
-            filter_key = "no_filters"
-        
-        radius_key = f"_radius_{radius_miles}" if radius_miles else "_no_radius"
-        cache_key = f"coverage_gap:{filter_key}{radius_key}"
+        cache_key = get_analysis_cache_key(filters, radius_miles)
+        if filters or radius_miles is None or float(radius_miles) not in PRECACHED_RADII:
+            await record_usage(filters, radius_miles)
         
         # Check cache first
         cached = _cache.get(cache_key)
@@ -540,339 +304,53 @@ async def get_coverage_gap_analysis_stream(
             if last_precache_timestamp:
                 cached.lastPrecacheTimestamp = last_precache_timestamp
             yield format_log("Using cached results")
-            yield format_data(cached)
+            yield format_data(cached, cache_key)
             return
         
+        # A view of a bounding box or state only needs the cities in it computed
+        scope = view.scope() if view else None
+        if scope:
+            cache_key = f"{cache_key}{scope.cache_suffix()}"
+            cached = _cache.get(cache_key)
+            if cached:
+                print("=== COVERAGE GAP ANALYSIS (CACHED SCOPE) ===")
+                print(f"DEBUG: Cache key: {cache_key}")
+                last_precache_timestamp = get_last_precache_timestamp()
+                if last_precache_timestamp:
+                    cached.lastPrecacheTimestamp = last_precache_timestamp
+                yield format_log("Using cached results")
+                yield format_data(cached, cache_key)
+                return
+        
         print("=== COVERAGE GAP ANALYSIS STARTED ===")
         print(f"DEBUG: Cache key: {cache_key}")
         
-        # Step 1: Fetch warehouses
-        yield format_log("Fetching warehouses from Airtable...", 5)
-        warehouses_data = await fetch_warehouses_from_airtable()
-        print(f"Fetched {len(warehouses_data)} warehouses from Airtable")
-        yield format_log(f"Fetched {len(warehouses_data)} warehouses from Airtable", 10)
-        
-        # Step 2: Get total requests count
-        yield format_log("Calculating total request count...", 12)
-        total_requests = await get_total_requests_count()
-        print(f"Total requests: {total_requests}")
-        yield format_log(f"Total requests: {total_requests}", 20)
+        # Every analysis thresholds the shared city-warehouse distance table; filters mask its warehouses
+        yield format_log("Loading city-warehouse distance table...", 5)
+        engine = await get_coverage_engine()
+        if radius_miles and radius_miles > engine.max_radius:
+            yield format_log(f"Computing city-warehouse distances up to {radius_miles} miles...", 40)
         
-        # Step 3: Get warehouse request counts
-        yield format_log("Fetching request counts per warehouse...", 22)
-        warehouse_request_counts = await get_warehouse_request_counts()
-        print(f"Fetched request counts for {len(warehouse_request_counts)} warehouses")
-        yield format_log(f"Fetched request counts for {len(warehouse_request_counts)} warehouses", 30)
-        
-        # Step 4: Transform warehouses
-        yield format_log("Transforming warehouse data...", 32)
-        static_warehouses = []
-        for idx, warehouse_record in enumerate(warehouses_data):
-            warehouse_id = warehouse_record.get("id", "")
-            request_count = warehouse_request_counts.get(warehouse_id, 0)
-            static_warehouse = transform_warehouse_to_static_data(warehouse_record, request_count)
-            static_warehouses.append(static_warehouse)
-            if (idx + 1) % 500 == 0:
-                yield format_log(f"Transformed {idx + 1}/{len(warehouses_data)} warehouses...", 32 + int((idx + 1) / len(warehouses_data) * 6))
-        print(f"Transformed {len(static_warehouses)} warehouses")
-        yield format_log(f"Transformed {len(static_warehouses)} warehouses", 40)
-        
-        # Step 5: Apply filters if provided
         if filters:
-            print(f"Applying filters: {filters}")
-            yield format_log(f"Applying filters: {filters}", 42)
-            static_warehouses = apply_warehouse_filters(static_warehouses, filters)
-            print(f"After filtering: {len(static_warehouses)} warehouses")
-            yield format_log(f"After filtering: {len(static_warehouses)} warehouses remain", 45)
-        
-        # Step 6: Get average monthly requests
-        yield format_log("Calculating average monthly requests...", 47)
-        average_monthly_requests = await get_average_monthly_requests()
-        print(f"Average monthly requests: {average_monthly_requests}")
-        yield format_log(f"Average monthly requests: {average_monthly_requests}", 50)
-        
-        # Step 6.5: Get request counts by city from Requests table
-        yield format_log("Fetching request counts by city from Requests table...", 51)
-        city_request_counts = await get_request_counts_by_city()
-        print(f"Fetched request counts for {len(city_request_counts)} cities from Requests table")
-        yield format_log(f"Fetched request counts for {len(city_request_counts)} cities", 52)
-        
-        # Step 7: Load all US cities
-        print("Loading all US cities...")
-        yield format_log("Loading all US cities from database...", 53)
-        us_cities = load_us_cities()
-        print(f"Loaded {len(us_cities)} US cities from us_cities.json")
-        yield format_log(f"Loaded {len(us_cities)} US cities from database", 55)
-        
-        # Step 8: Group warehouses by city
-        print("Grouping warehouses by city")
-        yield format_log("Grouping warehouses by city...", 57)
-        warehouse_city_data = {}
-        for warehouse in static_warehouses:
-            city = warehouse.city.strip() if warehouse.city else ""
-            state = warehouse.state.strip() if warehouse.state else ""
-            if not city or not state:
-                continue
-            
-            city_key = f"{city},{state}"
-            
-            if city_key not in warehouse_city_data:
-                warehouse_city_data[city_key] = {
-                    "warehouses": [],
-                    "totalRequests": 0
-                }
-            
-            warehouse_city_data[city_key]["warehouses"].append(warehouse)
-            warehouse_city_data[city_key]["totalRequests"] += warehouse.reqCount
-        print(f"Grouped warehouses into {len(warehouse_city_data)} cities")
-        yield format_log(f"Grouped warehouses into {len(warehouse_city_data)} cities", 60)
-        
-        # Step 9: Radius expansion if provided
-        if radius_miles and radius_miles > 0:
-            print(f"Expanding all cities with radius: {radius_miles} miles")
-            yield format_log(f"Expanding coverage with {radius_miles} mile radius...", 62)
-            
-            valid_warehouses = [wh for wh in static_warehouses if wh.lat != 0 and wh.lng != 0]
-            print(f"  Processing {len(valid_warehouses)} warehouses with valid coordinates")
-            print(f"  Checking against {len(us_cities)} US cities")
-            yield format_log(f"Processing {len(valid_warehouses)} warehouses against {len(us_cities)} cities...", 65)
-            
-            # First, expand existing warehouse city groups
-            yield format_log("Expanding existing warehouse cities...", 67)
-            for city_key, data in warehouse_city_data.items():
-                # Get city coordinates from US cities data or calculate from warehouses
-                city_info = us_cities.get(city_key, {})
-                if city_info and city_info.get('latitude') and city_info.get('longitude'):
-                    center_lat = city_info['latitude']
-                    center_lng = city_info['longitude']
-                else:
-                    # Calculate from warehouses
-                    valid_coords = [(wh.lat, wh.lng) for wh in data["warehouses"] 
-                                  if wh.lat != 0 and wh.lng != 0]
-                    if not valid_coords:
-                        continue
-                    center_lat = sum(coord[0] for coord in valid_coords) / len(valid_coords)
-                    center_lng = sum(coord[1] for coord in valid_coords) / len(valid_coords)
-                
-                existing_warehouse_ids = {wh.id for wh in data["warehouses"]}
-                
-                for warehouse in valid_warehouses:
-                    if warehouse.id in existing_warehouse_ids:
-                        continue
-                    
-                    distance = haversine(center_lat, center_lng, warehouse.lat, warehouse.lng)
-                    if distance <= radius_miles:
-                        data["warehouses"].append(warehouse)
-                        data["totalRequests"] += warehouse.reqCount
-                        existing_warehouse_ids.add(warehouse.id)
-            
-            # Second, check ALL US cities (including those without warehouses) for nearby warehouses
-            processed = 0
-            total_cities = len(us_cities)
-            yield format_log(f"Checking all {total_cities} US cities for nearby warehouses...", 70)
-            
-            for city_key, city_info in us_cities.items():
-                processed += 1
-                if processed % 5000 == 0:
-                    progress = 70 + int((processed / total_cities) * 20)  # 70-90% range
-                    print(f"  Processing city {processed}/{total_cities}...")
-                    yield format_log(f"Processing city {processed}/{total_cities}...", progress)
-                
-                # Skip if city already has warehouses (already processed above)
-                if city_key in warehouse_city_data:
-                    continue
-                
-                # Skip if city has no valid coordinates
-                if not city_info.get('latitude') or not city_info.get('longitude'):
-                    continue
-                
-                center_lat = city_info['latitude']
-                center_lng = city_info['longitude']
-                
-                # Check if any warehouses fall within radius of this city
-                nearby_warehouses_for_city = []
-                for warehouse in valid_warehouses:
-                    distance = haversine(center_lat, center_lng, warehouse.lat, warehouse.lng)
-                    if distance <= radius_miles:
-                        nearby_warehouses_for_city.append(warehouse)
-                
-                # If warehouses found within radius, add them to warehouse_city_data
-                if nearby_warehouses_for_city:
-                    warehouse_city_data[city_key] = {
-                        "warehouses": nearby_warehouses_for_city,
-                        "totalRequests": sum(wh.reqCount for wh in nearby_warehouses_for_city)
-                    }
-            
-            print(f"  Radius expansion completed. Cities with warehouses after expansion: {len(warehouse_city_data)}")
-            yield format_log(f"Radius expansion completed. {len(warehouse_city_data)} cities now have warehouses", 90)
-        
-        # Step 10: Pre-calculate aggregated request counts if radius expansion is enabled
-        aggregated_request_counts = {}
-        if radius_miles and radius_miles > 0:
-            print(f"Finding relevant cities for aggregated request counts (radius: {radius_miles} miles)...")
-            yield format_log(f"Finding relevant cities...", 92)
-            
-            # Get only relevant cities (cities with requests/warehouses + cities within radius)
-            relevant_cities = get_relevant_cities_for_aggregation(
-                radius_miles,
-                us_cities,
-                city_request_counts,
-                warehouse_city_data
-            )
-            
-            print(f"Pre-calculating aggregated request counts for {len(relevant_cities)} relevant cities...")
-            yield format_log(f"Pre-calculating aggregated counts for {len(relevant_cities)} cities...", 93)
-            
-            processed_agg = 0
-            total_cities_agg = len(relevant_cities)
-            for city_key in relevant_cities:
-                processed_agg += 1
-                if processed_agg % 1000 == 0:
-                    progress = 93 + int((processed_agg / total_cities_agg) * 2)  # 93-95% range
-                    print(f"  Pre-calculating aggregated counts: {processed_agg}/{total_cities_agg}...")
-                    yield format_log(f"Pre-calculating aggregated counts: {processed_agg}/{total_cities_agg}...", progress)
-                
-                city_info = us_cities.get(city_key, {})
-                city_lat = city_info.get('latitude', 0.0)
-                city_lng = city_info.get('longitude', 0.0)
-                if city_lat and city_lng:
-                    aggregated_request_counts[city_key] = calculate_aggregated_request_count(
-                        city_lat,
-                        city_lng,
-                        radius_miles,
-                        us_cities,
-                        city_request_counts
-                    )
-                else:
-                    aggregated_request_counts[city_key] = city_request_counts.get(city_key, 0)
-            
-            print(f"  Pre-calculated aggregated request counts for {len(aggregated_request_counts)} cities")
-        
-        # Step 11: Create coverage analysis for ALL US cities
-        print(f"Creating coverage analysis for all {len(us_cities)} US cities...")
-        yield format_log(f"Creating coverage analysis for all {len(us_cities)} US cities...", 95)
-        coverage_analysis = []
-        
-        processed_cities = 0
-        for city_key, city_info in us_cities.items():
-            processed_cities += 1
-            if processed_cities % 5000 == 0:
-                progress = 95 + int((processed_cities / len(us_cities)) * 3)  # 95-98% range
-                yield format_log(f"Analyzing city {processed_cities}/{len(us_cities)}...", progress)
-            
-            # Get warehouse data for this city if available
-            warehouse_data = warehouse_city_data.get(city_key, {})
-            warehouses_in_city = warehouse_data.get("warehouses", [])
-            
-            # If filters are applied, skip cities with no matching warehouses
-            if filters and len(warehouses_in_city) == 0:
-                continue
-            
-            # Get request count: use pre-calculated aggregated counts if available, otherwise use direct count
-            if aggregated_request_counts:
-                total_requests_in_city = aggregated_request_counts.get(city_key, 0)
-            else:
-                # Use request counts from Requests table (where requests originated from)
-                total_requests_in_city = city_request_counts.get(city_key, 0)
-            
-            # Count warehouses by tier
-            gold_count = sum(1 for w in warehouses_in_city if w.tier in ["Gold", "Potential Gold"])
-            silver_count = sum(1 for w in warehouses_in_city if w.tier == "Silver")
-            bronze_count = sum(1 for w in warehouses_in_city if w.tier == "Bronze")
-            standard_tiers = ["Gold", "Potential Gold", "Silver", "Bronze"]
-            un_tiered_count = sum(1 for w in warehouses_in_city if not w.tier or (isinstance(w.tier, str) and w.tier.strip() == "") or (w.tier not in standard_tiers))
-            
-            # Create nearby warehouses list (top 3)
-            nearby_warehouses = []
-            for wh in warehouses_in_city[:3]:
-                distance = 0.0
-                if len(warehouses_in_city) > 1:
-                    other_warehouses = [w for w in warehouses_in_city if w.id != wh.id]
-                    if other_warehouses:
-                        distances = []
-                        for other_wh in other_warehouses:
-                            if wh.lat != 0 and wh.lng != 0 and other_wh.lat != 0 and other_wh.lng != 0:
-                                dist = haversine(wh.lat, wh.lng, other_wh.lat, other_wh.lng)
-                                distances.append(dist)
-                        distance = sum(distances) / len(distances) if distances else 0.0
-                
-                nearby_warehouses.append(MockWarehouse(
-                    id=wh.id,
-                    name=wh.name,
-                    tier=wh.tier,
-                    distance=distance
-                ))
-            
-            warehouse_count = len(warehouses_in_city)
-            avg_requests_per_warehouse = total_requests_in_city / warehouse_count if warehouse_count > 0 else 0
-            
-            # Determine expansion opportunity
-            if avg_requests_per_warehouse > 25:
-                expansion_opportunity = "High"
-            elif warehouse_count == 1 and total_requests_in_city > 10:
-                expansion_opportunity = "High"
-            elif warehouse_count == 1 and total_requests_in_city > 3:
-                expansion_opportunity = "Moderate"
-            elif warehouse_count < 3 and total_requests_in_city > 15:
-                expansion_opportunity = "Moderate"
-            elif avg_requests_per_warehouse > 15:
-                expansion_opportunity = "Moderate"
-            elif total_requests_in_city == 0:
-                expansion_opportunity = "None"
-            else:
-                expansion_opportunity = "None"
-            
-            # Calculate warehouses per 100 sq miles
-            estimated_city_area_sq_miles = max(warehouse_count * 25, 50)
-            warehouses_per_100_sq_miles = (warehouse_count / estimated_city_area_sq_miles) * 100 if estimated_city_area_sq_miles > 0 else 0
-            
-            # Determine coverage gap
-            has_coverage_gap = warehouse_count < 2 or avg_requests_per_warehouse > 20
-            
-            coverage_analysis.append(CoverageAnalysis(
-                city=city_info["city"],
-                state=city_info["state"],
-                latitude=city_info["latitude"],
-                longitude=city_info["longitude"],
-                zipcodes=city_info["zipcodes"],
-                nearbyWarehouses=nearby_warehouses,
-                warehouseCount=warehouse_count,
-                hasCoverageGap=has_coverage_gap,
-                expansionOpportunity=expansion_opportunity,
-                goldWarehouseCount=gold_count,
-                silverWarehouseCount=silver_count,
-                bronzeWarehouseCount=bronze_count,
-                unTieredWarehouseCount=un_tiered_count,
-                warehousesPer100SqMiles=warehouses_per_100_sq_miles,
-                reqCount=total_requests_in_city
-            ))
+            yield format_log(f"Applying filters: {filters}", 50)
+        if scope:
+            yield format_log(f"Creating coverage analysis for the US cities in {scope.state or 'view'}...", 60)
+        else:
+            yield format_log(f"Creating coverage analysis for all {len(engine.inputs.us_cities)} US cities...", 60)
+        result = await analyze_in_worker(engine, radius_miles, filters, scope)
         
-        # Step 11: Build final result
         if filters:
-            yield format_log(f"Coverage analysis complete: {len(coverage_analysis)} cities with matching warehouses", 98)
-            print(f"Coverage analysis complete: {len(coverage_analysis)} cities with matching warehouses")
+            yield format_log(f"Coverage analysis complete: {len(result.coverageAnalysis)} cities with matching warehouses", 98)
+            print(f"Coverage analysis complete: {len(result.coverageAnalysis)} cities with matching warehouses")
         else:
-            yield format_log(f"Coverage analysis complete: {len(coverage_analysis)} total cities", 98)
-            print(f"Coverage analysis complete: {len(coverage_analysis)} total cities")
-        
-        yield format_log("Finalizing results...", 99)
-        # Get last precache timestamp
-        last_precache_timestamp = get_last_precache_timestamp()
-        result = CoverageAnalysisResponse(
-            warehouses=static_warehouses,
-            coverageAnalysis=coverage_analysis,
-            average_number_of_requests=average_monthly_requests,
-            totalWarehouses=len(static_warehouses),
-            totalRequests=total_requests,
-            analysisRadius=radius_miles if radius_miles else 50,
-            lastPrecacheTimestamp=last_precache_timestamp
-        )
+            yield format_log(f"Coverage analysis complete: {len(result.coverageAnalysis)} total cities", 98)
+            print(f"Coverage analysis complete: {len(result.coverageAnalysis)} total cities")
         
         # Cache the result for 30 minutes
         _cache.set(cache_key, result, ttl=1800)
         
         yield format_log("Analysis complete!", 100)
-        yield format_data(result)
+        yield format_data(result, cache_key)
         
     except Exception as e:
         error_msg = f"Coverage gap analysis failed: {str(e)}"
@@ -904,15 +382,9 @@ async def get_coverage_gap_analysis(filters: Optional[CoverageGapFilters] = None
     
     # STEP 2: Check regular cache (existing logic) - skip if skip_precache is True
     # Create cache key based on filters and radius
-    import json
-    if filters:
-        filter_dict = filters.model_dump(exclude_none=True, exclude_unset=True)
-        filter_key = json.dumps(filter_dict, sort_keys=True)
-    else:
-        filter_key = "no_filters"
-    
-    radius_key = f"_radius_{radius_miles}" if radius_miles else "_no_radius"
-    cache_key = f"coverage_gap:{filter_key}{radius_key}"
+    cache_key = get_analysis_cache_key(filters, radius_miles)
+    if filters or radius_miles is None or float(radius_miles) not in PRECACHED_RADII:
+        await record_usage(filters, radius_miles)
     
     # Check cache first (unless we're forcing a refresh)
     if not skip_precache:
@@ -924,283 +396,20 @@ async def get_coverage_gap_analysis(filters: Optional[CoverageGapFilters] = None
             last_precache_timestamp = get_last_precache_timestamp()
             if last_precache_timestamp:
                 cached.lastPrecacheTimestamp = last_precache_timestamp
-        return cached
+            return cached
     
+    # STEP 3: Threshold the shared city-warehouse distance table, so any radius and filter
+    # combination is served without re-fetching data or recomputing distances
     print("=== COVERAGE GAP ANALYSIS STARTED ===")
     print(f"DEBUG: Cache key: {cache_key}")
-    
-    # Get all warehouses
-    warehouses_data = await fetch_warehouses_from_airtable()
-    
-    # Get total requests count
-    total_requests = await get_total_requests_count()
-    
-    # Get warehouse request counts
-    warehouse_request_counts = await get_warehouse_request_counts()
-    
-    # Transform warehouses to StaticWarehouseData format
-    static_warehouses = []
-    for warehouse_record in warehouses_data:
-        warehouse_id = warehouse_record.get("id", "")
-        request_count = warehouse_request_counts.get(warehouse_id, 0)
-        static_warehouse = transform_warehouse_to_static_data(warehouse_record, request_count)
-        static_warehouses.append(static_warehouse)
-    
-    # Apply filters if provided
-    if filters:
-        print(f"Applying filters: {filters}")
-        static_warehouses = apply_warehouse_filters(static_warehouses, filters)
-        print(f"After filtering: {len(static_warehouses)} warehouses")
-    
-    # Get average monthly requests
-    average_monthly_requests = await get_average_monthly_requests()
-    print(f"Average monthly requests: {average_monthly_requests}")
-    
-    # Get request counts by city from Requests table
-    print("Fetching request counts by city from Requests table...")
-    city_request_counts = await get_request_counts_by_city()
-    print(f"Fetched request counts for {len(city_request_counts)} cities from Requests table")
-    
-    # Load all US cities
-    print("Loading all US cities...")
-    us_cities = load_us_cities()
-    
-    # Group warehouses by city
-    print("Grouping warehouses by city")
-    warehouse_city_data = {}
-    for warehouse in static_warehouses:
-        city = warehouse.city.strip() if warehouse.city else ""
-        state = warehouse.state.strip() if warehouse.state else ""
-        if not city or not state:
-            continue
-        
-        city_key = f"{city},{state}"
-        
-        if city_key not in warehouse_city_data:
-            warehouse_city_data[city_key] = {
-                "warehouses": [],
-                "totalRequests": 0
-            }
-        
-        warehouse_city_data[city_key]["warehouses"].append(warehouse)
-        warehouse_city_data[city_key]["totalRequests"] += warehouse.reqCount
-    
-    # If radius is provided, expand ALL cities (including those without warehouses) to include nearby warehouses
-    if radius_miles and radius_miles > 0:
-        print(f"Expanding all cities with radius: {radius_miles} miles")
-        
-        valid_warehouses = [wh for wh in static_warehouses if wh.lat != 0 and wh.lng != 0]
-        print(f"  Processing {len(valid_warehouses)} warehouses with valid coordinates")
-        print(f"  Checking against {len(us_cities)} US cities")
-        
-        # First, expand existing warehouse city groups
-        for city_key, data in warehouse_city_data.items():
-            # Get city coordinates from US cities data or calculate from warehouses
-            city_info = us_cities.get(city_key, {})
-            if city_info and city_info.get('latitude') and city_info.get('longitude'):
-                center_lat = city_info['latitude']
-                center_lng = city_info['longitude']
-            else:
-                # Calculate from warehouses
-                valid_coords = [(wh.lat, wh.lng) for wh in data["warehouses"] 
-                              if wh.lat != 0 and wh.lng != 0]
-                if not valid_coords:
-                    continue
-                center_lat = sum(coord[0] for coord in valid_coords) / len(valid_coords)
-                center_lng = sum(coord[1] for coord in valid_coords) / len(valid_coords)
-            
-            existing_warehouse_ids = {wh.id for wh in data["warehouses"]}
-            
-            for warehouse in valid_warehouses:
-                if warehouse.id in existing_warehouse_ids:
-                    continue
-                
-                distance = haversine(center_lat, center_lng, warehouse.lat, warehouse.lng)
-                if distance <= radius_miles:
-                    data["warehouses"].append(warehouse)
-                    data["totalRequests"] += warehouse.reqCount
-                    existing_warehouse_ids.add(warehouse.id)
-        
-        # Second, check ALL US cities (including those without warehouses) for nearby warehouses
-        processed = 0
-        for city_key, city_info in us_cities.items():
-            processed += 1
-            if processed % 5000 == 0:
-                print(f"  Processing city {processed}/{len(us_cities)}...")
-            
-            # Skip if city already has warehouses (already processed above)
-            if city_key in warehouse_city_data:
-                continue
-            
-            # Skip if city has no valid coordinates
-            if not city_info.get('latitude') or not city_info.get('longitude'):
-                continue
-            
-            center_lat = city_info['latitude']
-            center_lng = city_info['longitude']
-            
-            # Check if any warehouses fall within radius of this city
-            nearby_warehouses_for_city = []
-            for warehouse in valid_warehouses:
-                distance = haversine(center_lat, center_lng, warehouse.lat, warehouse.lng)
-                if distance <= radius_miles:
-                    nearby_warehouses_for_city.append(warehouse)
-            
-            # If warehouses found within radius, add them to warehouse_city_data
-            if nearby_warehouses_for_city:
-                warehouse_city_data[city_key] = {
-                    "warehouses": nearby_warehouses_for_city,
-                    "totalRequests": sum(wh.reqCount for wh in nearby_warehouses_for_city)
-                }
-        
-        print(f"  Radius expansion completed. Cities with warehouses after expansion: {len(warehouse_city_data)}")
-    
-    # Pre-calculate aggregated request counts if radius expansion is enabled
-    aggregated_request_counts = {}
-    if radius_miles and radius_miles > 0:
-        print(f"Finding relevant cities for aggregated request counts (radius: {radius_miles} miles)...")
-        
-        # Get only relevant cities (cities with requests/warehouses + cities within radius)
-        relevant_cities = get_relevant_cities_for_aggregation(
-            radius_miles,
-            us_cities,
-            city_request_counts,
-            warehouse_city_data
-        )
-        
-        print(f"Pre-calculating aggregated request counts for {len(relevant_cities)} relevant cities...")
-        processed_agg = 0
-        total_cities_agg = len(relevant_cities)
-        for city_key in relevant_cities:
-            processed_agg += 1
-            if processed_agg % 1000 == 0:
-                print(f"  Pre-calculating aggregated counts: {processed_agg}/{total_cities_agg}...")
-            
-            city_info = us_cities.get(city_key, {})
-            city_lat = city_info.get('latitude', 0.0)
-            city_lng = city_info.get('longitude', 0.0)
-            if city_lat and city_lng:
-                aggregated_request_counts[city_key] = calculate_aggregated_request_count(
-                    city_lat,
-                    city_lng,
-                    radius_miles,
-                    us_cities,
-                    city_request_counts
-                )
-            else:
-                aggregated_request_counts[city_key] = city_request_counts.get(city_key, 0)
-        
-        print(f"  Pre-calculated aggregated request counts for {len(aggregated_request_counts)} cities")
-    
-    # Create coverage analysis for ALL US cities
-    print(f"Creating coverage analysis for all {len(us_cities)} US cities...")
-    coverage_analysis = []
-    
-    for city_key, city_info in us_cities.items():
-        # Get warehouse data for this city if available
-        warehouse_data = warehouse_city_data.get(city_key, {})
-        warehouses_in_city = warehouse_data.get("warehouses", [])
-        
-        # If filters are applied, skip cities with no matching warehouses
-        if filters and len(warehouses_in_city) == 0:
-            continue
-        
-        # Get request count: use pre-calculated aggregated counts if available, otherwise use direct count
-        if aggregated_request_counts:
-            total_requests_in_city = aggregated_request_counts.get(city_key, 0)
-        else:
-            # Use request counts from Requests table (where requests originated from)
-            total_requests_in_city = city_request_counts.get(city_key, 0)
-        
-        # Count warehouses by tier
-        gold_count = sum(1 for w in warehouses_in_city if w.tier in ["Gold", "Potential Gold"])
-        silver_count = sum(1 for w in warehouses_in_city if w.tier == "Silver")
-        bronze_count = sum(1 for w in warehouses_in_city if w.tier == "Bronze")
-        standard_tiers = ["Gold", "Potential Gold", "Silver", "Bronze"]
-        un_tiered_count = sum(1 for w in warehouses_in_city if not w.tier or (isinstance(w.tier, str) and w.tier.strip() == "") or (w.tier not in standard_tiers))
-        
-        # Create nearby warehouses list (top 3)
-        nearby_warehouses = []
-        for wh in warehouses_in_city[:3]:
-            distance = 0.0
-            if len(warehouses_in_city) > 1:
-                other_warehouses = [w for w in warehouses_in_city if w.id != wh.id]
-                if other_warehouses:
-                    distances = []
-                    for other_wh in other_warehouses:
-                        if wh.lat != 0 and wh.lng != 0 and other_wh.lat != 0 and other_wh.lng != 0:
-                            dist = haversine(wh.lat, wh.lng, other_wh.lat, other_wh.lng)
-                            distances.append(dist)
-                    distance = sum(distances) / len(distances) if distances else 0.0
-            
-            nearby_warehouses.append(MockWarehouse(
-                id=wh.id,
-                name=wh.name,
-                tier=wh.tier,
-                distance=distance
-            ))
-        
-        warehouse_count = len(warehouses_in_city)
-        avg_requests_per_warehouse = total_requests_in_city / warehouse_count if warehouse_count > 0 else 0
-        
-        # Determine expansion opportunity
-        if avg_requests_per_warehouse > 25:
-            expansion_opportunity = "High"
-        elif warehouse_count == 1 and total_requests_in_city > 10:
-            expansion_opportunity = "High"
-        elif warehouse_count == 1 and total_requests_in_city > 3:
-            expansion_opportunity = "Moderate"
-        elif warehouse_count < 3 and total_requests_in_city > 15:
-            expansion_opportunity = "Moderate"
-        elif avg_requests_per_warehouse > 15:
-            expansion_opportunity = "Moderate"
-        elif total_requests_in_city == 0:
-            expansion_opportunity = "None"
-        else:
-            expansion_opportunity = "None"
-        
-        # Calculate warehouses per 100 sq miles
-        estimated_city_area_sq_miles = max(warehouse_count * 25, 50)
-        warehouses_per_100_sq_miles = (warehouse_count / estimated_city_area_sq_miles) * 100 if estimated_city_area_sq_miles > 0 else 0
-        
-        # Determine coverage gap
-        has_coverage_gap = warehouse_count < 2 or avg_requests_per_warehouse > 20
-        
-        coverage_analysis.append(CoverageAnalysis(
-            city=city_info["city"],
-            state=city_info["state"],
-            latitude=city_info["latitude"],
-            longitude=city_info["longitude"],
-            zipcodes=city_info["zipcodes"],
-            nearbyWarehouses=nearby_warehouses,
-            warehouseCount=warehouse_count,
-            hasCoverageGap=has_coverage_gap,
-            expansionOpportunity=expansion_opportunity,
-            goldWarehouseCount=gold_count,
-            silverWarehouseCount=silver_count,
-            bronzeWarehouseCount=bronze_count,
-            unTieredWarehouseCount=un_tiered_count,
-            warehousesPer100SqMiles=warehouses_per_100_sq_miles,
-            reqCount=total_requests_in_city
-        ))
+    engine = await get_coverage_engine(force_refresh=skip_precache)
+    result = await analyze_in_worker(engine, radius_miles, filters)
     
     # Log the results
     if filters:
-        print(f"Coverage analysis complete: {len(coverage_analysis)} cities with matching warehouses")
+        print(f"Coverage analysis complete: {len(result.coverageAnalysis)} cities with matching warehouses")
     else:
-        print(f"Coverage analysis complete: {len(coverage_analysis)} total cities")
-    
-    # Get last precache timestamp
-    last_precache_timestamp = get_last_precache_timestamp()
-    result = CoverageAnalysisResponse(
-        warehouses=static_warehouses,
-        coverageAnalysis=coverage_analysis,
-        average_number_of_requests=average_monthly_requests,
-        totalWarehouses=len(static_warehouses),
-        totalRequests=total_requests,
-        analysisRadius=radius_miles if radius_miles else 50,  # Use provided radius or default to 50
-        lastPrecacheTimestamp=last_precache_timestamp
-    )
+        print(f"Coverage analysis complete: {len(result.coverageAnalysis)} total cities")
     
     # Cache the result for 30 minutes
     _cache.set(cache_key, result, ttl=1800)
@@ -1293,6 +502,8 @@ async def get_ai_analysis_only(filters: Optional[CoverageGapFilters] = None, ski
         print(f"Expanding cities with radius: {radius_miles} miles")
         
         valid_warehouses = [wh for wh in static_warehouses if wh.lat != 0 and wh.lng != 0]
+        # Grid index so each city only tests warehouses in neighbouring cells
+        warehouse_grid = build_warehouse_grid(valid_warehouses, radius_miles)
         print(f"  Processing {len(valid_warehouses)} warehouses with valid coordinates")
         print(f"  Checking against {len(us_cities)} US cities")
         
@@ -1314,15 +525,14 @@ async def get_ai_analysis_only(filters: Optional[CoverageGapFilters] = None, ski
             
             existing_warehouse_ids = {wh.id for wh in data["warehouses"]}
             
-            for warehouse in valid_warehouses:
+            for warehouse_index, _ in warehouse_grid.within_radius(center_lat, center_lng, radius_miles):
+                warehouse = valid_warehouses[warehouse_index]
                 if warehouse.id in existing_warehouse_ids:
                     continue
                 
-                distance = haversine(center_lat, center_lng, warehouse.lat, warehouse.lng)
-                if distance <= radius_miles:
-                    data["warehouses"].append(warehouse)
-                    data["totalRequests"] += warehouse.reqCount
-                    existing_warehouse_ids.add(warehouse.id)
+                data["warehouses"].append(warehouse)
+                data["totalRequests"] += warehouse.reqCount
+                existing_warehouse_ids.add(warehouse.id)
         
         # Second, check ALL US cities (including those without warehouses) for nearby warehouses
         processed = 0
@@ -1343,11 +553,10 @@ async def get_ai_analysis_only(filters: Optional[CoverageGapFilters] = None, ski
             center_lng = city_info['longitude']
             
             # Check if any warehouses fall within radius of this city
-            nearby_warehouses_for_city = []
-            for warehouse in valid_warehouses:
-                distance = haversine(center_lat, center_lng, warehouse.lat, warehouse.lng)
-                if distance <= radius_miles:
-                    nearby_warehouses_for_city.append(warehouse)
+            nearby_warehouses_for_city = [
+                valid_warehouses[warehouse_index]
+                for warehouse_index, _ in warehouse_grid.within_radius(center_lat, center_lng, radius_miles)
+            ]
             
             # If warehouses found within radius, add them to city_warehouses_dict
             if nearby_warehouses_for_city:
@@ -0,0 +1,126 @@
+"""
+Incremental coverage updates for warehouse changes.
+When Airtable reports a warehouse added, moved or re-tiered, the engine the precached radii
+were computed from is patched instead of rebuilt, and only the precached cities near the
+warehouse's old and new positions are recomputed, so fresh results are served seconds after the edit.
+
+Only the worker holding that engine (the one that ran the precache, normally the scheduler
+leader) can patch the results; it publishes them to the others. A worker that receives a
+webhook without holding it queues the change in the shared cache for that worker instead.
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from warehouse.warehouse_service import _cache
+from services.airtable.warehouses import fetch_warehouse_by_id_from_airtable
+from services.caching.shared_cache import pop_shared_items, queue_shared_item
+from coverage_gap.coverage_engine import CoverageEngine, _engine_lock, invalidate_coverage_engine
+from coverage_gap.coverage_gap_precache import (
+    PRECACHE_ENGINE_KEY,
+    PRECACHED_RADII,
+    get_popular_precached_combinations,
+    get_precache_engine_key,
+    get_precache_key,
+    precache_combinations,
+    precache_payloads,
+    publish_precached_results
+)
+
+# Shared queue of Airtable record IDs waiting for the worker holding the precache engine
+WAREHOUSE_CHANGES_QUEUE = "coverage_gap:warehouse_changes"
+
+
+def get_precache_engine() -> Optional[CoverageEngine]:
+    """The engine the current precached results were computed from, if this worker holds it."""
+    engine = _cache.get(PRECACHE_ENGINE_KEY)
+    if engine is None:
+        return None
+    if not any(_cache.get(get_precache_engine_key(radius)) == engine.version for radius in PRECACHED_RADII):
+        return None
+    return engine
+
+
+async def apply_warehouse_change(record_id: str) -> Dict[str, Any]:
+    """
+    Apply one added or changed Airtable warehouse to the precache engine and the precached radii.
+    The record is re-read from Airtable, since webhook payloads may carry only some fields.
+    Only radii computed from this worker's precache engine are patched; a worker without it
+    queues the change for the one that has it. Either way the on-demand engine is dropped,
+    so the next on-demand analysis is rebuilt from Airtable with the change.
+    Returns a summary of what was updated.
+    """
+    # Lazy import to avoid circular dependency
+    from coverage_gap.coverage_gap_service import transform_warehouse_to_static_data
+
+    invalidate_coverage_engine()
+    try:
+        async with _engine_lock:
+            engine = get_precache_engine()
+            if engine is None:
+                await queue_shared_item(WAREHOUSE_CHANGES_QUEUE, record_id)
+                print(f"[COVERAGE_UPDATE] Queued warehouse {record_id} for the worker holding the pre-cache engine")
+                return {"updated": False, "queued": True, "reason": "Pre-cache engine not held by this worker"}
+
+            record = await fetch_warehouse_by_id_from_airtable(record_id)
+            previous = next((wh for wh in engine.inputs.warehouses if wh.id == record_id), None)
+            warehouse = transform_warehouse_to_static_data(record, previous.reqCount if previous else 0)
+            updated = await asyncio.to_thread(engine.with_warehouse, warehouse)
+            _cache.set(PRECACHE_ENGINE_KEY, updated, ttl=90000)  # 25 hours in seconds
+
+            cities_updated = {}
+            for radius in PRECACHED_RADII:
+                result = _cache.get(get_precache_key(radius))
+                # Results from another engine (such as an earlier attempt) are left to the next precache
+                if result is None or _cache.get(get_precache_engine_key(radius)) != engine.version:
+                    continue
+                cities = updated.cities_affected_by([previous, warehouse], radius)
+                analyses = await asyncio.to_thread(updated.analyze_cities, radius, cities)
+                coverage_analysis = list(result.coverageAnalysis)
+                for number, analysis in zip(cities.tolist(), analyses):
+                    coverage_analysis[number] = analysis
+                _cache.set(get_precache_key(radius), result.model_copy(update={
+                    "warehouses": updated.inputs.warehouses,
+                    "coverageAnalysis": coverage_analysis,
+                    "totalWarehouses": len(updated.inputs.warehouses)
+                }), ttl=90000)  # 25 hours in seconds
+                _cache.set(get_precache_engine_key(radius), updated.version, ttl=90000)
+                cities_updated[radius] = len(cities)
+
+        if cities_updated:
+            await precache_payloads(list(cities_updated))
+            await publish_precached_results(PRECACHED_RADII)
+
+        # Filtered results cannot be patched city by city; recompute the precached popular ones
+        popular = get_popular_precached_combinations()
+        if popular:
+            await precache_combinations(updated, popular)
+
+        print(f"[COVERAGE_UPDATE] ✓ Applied warehouse {warehouse.id} ({'changed' if previous else 'added'}); cities updated per radius: {cities_updated}")
+        return {
+            "updated": True,
+            "warehouseId": warehouse.id,
+            "added": previous is None,
+            "citiesUpdated": cities_updated,
+            "popularCombinationsRefreshed": len(popular)
+        }
+
+    except Exception as e:
+        print(f"[COVERAGE_UPDATE] ✗ Error applying warehouse change: {str(e)}")
+        return {"updated": False, "reason": str(e)}
+
+
+async def apply_queued_warehouse_changes() -> List[Dict[str, Any]]:
+    """
+    Apply the warehouse changes queued by other workers, if this worker holds the precache engine.
+    Returns the summary of each change applied.
+    """
+    if get_precache_engine() is None:
+        return []
+    try:
+        record_ids = await pop_shared_items(WAREHOUSE_CHANGES_QUEUE)
+    except Exception as e:
+        print(f"[COVERAGE_UPDATE] ✗ Error reading queued warehouse changes: {str(e)}")
+        return []
+    # A warehouse edited several times is re-read once
+    return [await apply_warehouse_change(record_id) for record_id in dict.fromkeys(record_ids)]
@@ -0,0 +1,176 @@
+"""
+Grid coverage analysis.
+Instead of one entry per US city (about 30k, crowded in metros), supply, demand and gap
+metrics are aggregated onto a fixed latitude/longitude grid at a few resolutions, so national
+views have bounded compute and payload sizes. Cells are squares in degrees and each
+resolution divides the coarser one evenly, so any coarse cell can be refined on demand into
+the finer cells it contains.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from warehouse.warehouse_service import _cache
+from warehouse.models import CoverageGapFilters, CoverageGridCell, CoverageGridResponse
+from coverage_gap.coverage_engine import TIER_COLUMNS, CoverageEngine, classify_cities, get_coverage_engine
+from coverage_gap.coverage_gap_precache import get_last_precache_timestamp
+from coverage_gap.coverage_usage import get_analysis_cache_key
+
+# Cell size (degrees) per resolution, coarsest first; each divides the previous one evenly
+GRID_RESOLUTIONS: Dict[str, float] = {
+    "national": 4.0,
+    "regional": 1.0,
+    "local": 0.25
+}
+DEFAULT_GRID_RESOLUTION = "national"
+
+# Grid layers are cheap to recompute, but are kept as long as other on-demand analyses (30 minutes)
+GRID_CACHE_TTL = 1800
+
+MILES_PER_DEGREE_LATITUDE = 69.0
+
+
+def parse_cell_id(cell_id: str) -> Tuple[str, int, int]:
+    """Resolution, row and column of a "resolution:row:col" cell ID."""
+    parts = cell_id.split(":")
+    if len(parts) != 3 or parts[0] not in GRID_RESOLUTIONS:
+        raise ValueError(f"cell must be resolution:row:col with resolution one of {', '.join(GRID_RESOLUTIONS)}")
+    return parts[0], int(parts[1]), int(parts[2])
+
+
+def _cell_indexes(lats: np.ndarray, lngs: np.ndarray, size: float) -> Tuple[np.ndarray, np.ndarray]:
+    rows = np.floor((lats + 90.0) / size).astype(np.int64)
+    cols = np.floor((lngs + 180.0) / size).astype(np.int64)
+    return rows, cols
+
+
+def _in_cell(lats: np.ndarray, lngs: np.ndarray, size: float, row: int, col: int) -> np.ndarray:
+    """Points binned into one cell of the given size."""
+    rows, cols = _cell_indexes(lats, lngs, size)
+    return (rows == row) & (cols == col)
+
+
+def analyze_grid(
+    engine: CoverageEngine,
+    resolution: str = DEFAULT_GRID_RESOLUTION,
+    filters: Optional[CoverageGapFilters] = None,
+    parent_cell: Optional[str] = None
+) -> CoverageGridResponse:
+    """Supply (matching warehouses), demand (cities and their requests) and gap metrics per grid cell.
+
+    With parent_cell, only the cells of this resolution inside that coarser cell are returned.
+    Cells without warehouses or cities are left out. Coverage classes use the same thresholds
+    as per-city analyses, applied to each cell's totals.
+    """
+    size = GRID_RESOLUTIONS.get(resolution)
+    if size is None:
+        raise ValueError(f"resolution must be one of {', '.join(GRID_RESOLUTIONS)}")
+    parent = None
+    if parent_cell:
+        parent_resolution, parent_row, parent_col = parse_cell_id(parent_cell)
+        if GRID_RESOLUTIONS[parent_resolution] <= size:
+            raise ValueError(f"cell {parent_cell} is not coarser than resolution {resolution}")
+        parent = (GRID_RESOLUTIONS[parent_resolution], parent_row, parent_col)
+
+    warehouses, included = engine.matching_warehouses(filters)
+    supply = engine.warehouse_has_coords.copy()
+    if included is not None:
+        supply &= included
+    warehouse_lats = engine.warehouse_lats[supply]
+    warehouse_lngs = engine.warehouse_lngs[supply]
+    warehouse_tiers = engine.warehouse_tiers[supply]
+
+    city_lats, city_lngs, _ = engine.city_locations()
+    located = (city_lats != 0) & (city_lngs != 0)
+    request_counts = engine.inputs.city_request_counts
+    city_requests = np.array([request_counts.get(city_key, 0) for city_key in engine.city_keys], dtype=np.int64)
+    city_lats, city_lngs, city_requests = city_lats[located], city_lngs[located], city_requests[located]
+
+    if parent:
+        inside = _in_cell(warehouse_lats, warehouse_lngs, *parent)
+        warehouse_lats, warehouse_lngs, warehouse_tiers = warehouse_lats[inside], warehouse_lngs[inside], warehouse_tiers[inside]
+        inside = _in_cell(city_lats, city_lngs, *parent)
+        city_lats, city_lngs, city_requests = city_lats[inside], city_lngs[inside], city_requests[inside]
+
+    # Bin warehouses and cities together: one dense index per occupied cell
+    warehouse_rows, warehouse_cols = _cell_indexes(warehouse_lats, warehouse_lngs, size)
+    city_rows, city_cols = _cell_indexes(city_lats, city_lngs, size)
+    columns = int(round(360.0 / size)) + 1
+    keys = np.concatenate([warehouse_rows * columns + warehouse_cols, city_rows * columns + city_cols])
+    cell_keys, cell_of = np.unique(keys, return_inverse=True)
+    cell_count = len(cell_keys)
+    warehouse_cells, city_cells = cell_of[:len(warehouse_rows)], cell_of[len(warehouse_rows):]
+
+    counts = np.bincount(warehouse_cells, minlength=cell_count)
+    tier_counts = np.bincount(warehouse_cells * TIER_COLUMNS + warehouse_tiers, minlength=cell_count * TIER_COLUMNS).reshape(cell_count, TIER_COLUMNS)
+    city_counts = np.bincount(city_cells, minlength=cell_count)
+    demand = np.bincount(city_cells, weights=city_requests, minlength=cell_count).astype(np.int64)
+    classes = classify_cities(counts, demand)
+
+    rows, cols = np.divmod(cell_keys, columns)
+    souths = rows * size - 90.0
+    wests = cols * size - 180.0
+    centre_lats = souths + size / 2
+    # Cell area shrinks with the cosine of its latitude
+    areas = (size * MILES_PER_DEGREE_LATITUDE) ** 2 * np.cos(np.radians(centre_lats))
+    density = counts / np.maximum(areas, 1e-9) * 100
+    requests_per_warehouse = demand / np.maximum(counts, 1)
+
+    cells = []
+    for cell, (row, col, south, west) in enumerate(zip(rows.tolist(), cols.tolist(), souths.tolist(), wests.tolist())):
+        gold_count, silver_count, bronze_count, un_tiered_count = tier_counts[cell].tolist()
+        cells.append(CoverageGridCell(
+            id=f"{resolution}:{row}:{col}",
+            bounds=[west, south, west + size, south + size],
+            latitude=south + size / 2,
+            longitude=west + size / 2,
+            warehouseCount=int(counts[cell]),
+            goldWarehouseCount=gold_count,
+            silverWarehouseCount=silver_count,
+            bronzeWarehouseCount=bronze_count,
+            unTieredWarehouseCount=un_tiered_count,
+            cityCount=int(city_counts[cell]),
+            reqCount=int(demand[cell]),
+            requestsPerWarehouse=float(requests_per_warehouse[cell]),
+            hasCoverageGap=bool(classes["has_coverage_gap"][cell]),
+            expansionOpportunity=str(classes["expansion_opportunity"][cell]),
+            warehousesPer100SqMiles=float(density[cell])
+        ))
+
+    return CoverageGridResponse(
+        resolution=resolution,
+        cellSizeDegrees=size,
+        parentCell=parent_cell,
+        cells=cells,
+        totalWarehouses=len(warehouses),
+        totalRequests=engine.inputs.total_requests,
+        lastPrecacheTimestamp=get_last_precache_timestamp()
+    )
+
+
+def get_grid_cache_key(engine: CoverageEngine, resolution: str, filters: Optional[CoverageGapFilters], parent_cell: Optional[str]) -> str:
+    """Cache key for a grid layer; the engine version ties it to the data it was binned from."""
+    return f"{get_analysis_cache_key(filters, None)}_grid_{resolution}_{parent_cell or 'all'}_{engine.version}"
+
+
+async def get_coverage_grid(
+    resolution: str = DEFAULT_GRID_RESOLUTION,
+    filters: Optional[CoverageGapFilters] = None,
+    parent_cell: Optional[str] = None
+) -> CoverageGridResponse:
+    """Grid coverage layer from the shared coverage engine, cached until the engine is replaced."""
+    # Lazy import to avoid circular dependency
+    from coverage_gap.coverage_workers import analyze_grid_in_worker
+
+    engine = await get_coverage_engine()
+    cache_key = get_grid_cache_key(engine, resolution, filters, parent_cell)
+    cached = _cache.get(cache_key)
+    if cached:
+        print(f"=== COVERAGE GRID (CACHED) === {cache_key}")
+        return cached
+
+    result = await analyze_grid_in_worker(engine, resolution, filters, parent_cell)
+    print(f"Coverage grid complete: {len(result.cells)} {resolution} cells" + (f" in {parent_cell}" if parent_cell else ""))
+    _cache.set(cache_key, result, ttl=GRID_CACHE_TTL)
+    return result
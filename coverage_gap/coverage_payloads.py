@@ -0,0 +1,162 @@
+"""
+Wire formats for coverage gap analysis responses.
+The default format is the CoverageAnalysisResponse model as-is: one object per city.
+The columnar format sends parallel arrays per field and refers to warehouses by their
+index in the `warehouses` list, so 30k cities do not repeat every key name.
+
+Precached radii are also kept as finished SSE response bodies (plain, gzip and brotli),
+so serving them skips serialization and compression entirely.
+"""
+
+import gzip
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.caching.conditional_requests import make_etag
+from warehouse.models import (
+    ColumnarCoverageAnalysis, ColumnarCoverageAnalysisResponse, ColumnarCoverageAnalysisViewResponse,
+    CoverageAnalysisResponse, CoverageAnalysisViewResponse
+)
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip and plain bodies are always available
+    brotli = None
+
+ROWS_FORMAT = "rows"
+COLUMNAR_FORMAT = "columnar"
+RESPONSE_FORMATS = (ROWS_FORMAT, COLUMNAR_FORMAT)
+
+# Compression settings for precached bodies: built once per precache run, served many times
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Log line sent ahead of precached results
+PRECACHED_LOG_MESSAGE = "Using pre-cached results"
+
+# CoverageAnalysis fields copied into columns unchanged
+COLUMNAR_FIELDS = (
+    "city", "state", "latitude", "longitude", "zipcodes", "warehouseCount", "hasCoverageGap",
+    "expansionOpportunity", "goldWarehouseCount", "silverWarehouseCount", "bronzeWarehouseCount",
+    "unTieredWarehouseCount", "warehousesPer100SqMiles", "reqCount"
+)
+
+
+def to_columnar_response(result: CoverageAnalysisResponse) -> ColumnarCoverageAnalysisResponse:
+    """Convert a coverage analysis into the columnar wire format."""
+    warehouse_positions: Dict[str, int] = {}
+    for position, wh in enumerate(result.warehouses):
+        warehouse_positions.setdefault(wh.id, position)
+
+    columns: Dict[str, List] = {field: [] for field in COLUMNAR_FIELDS}
+    nearby_indexes: List[List[int]] = []
+    nearby_distances: List[List[float]] = []
+    for analysis in result.coverageAnalysis:
+        for field in COLUMNAR_FIELDS:
+            columns[field].append(getattr(analysis, field))
+        nearby_indexes.append([warehouse_positions[wh.id] for wh in analysis.nearbyWarehouses])
+        nearby_distances.append([wh.distance for wh in analysis.nearbyWarehouses])
+
+    extra = {"view": result.view} if isinstance(result, CoverageAnalysisViewResponse) else {}
+    response_class = ColumnarCoverageAnalysisViewResponse if extra else ColumnarCoverageAnalysisResponse
+    return response_class(
+        warehouses=result.warehouses,
+        coverageAnalysis=ColumnarCoverageAnalysis.model_construct(
+            nearbyWarehouseIndexes=nearby_indexes,
+            nearbyWarehouseDistances=nearby_distances,
+            **columns
+        ),
+        average_number_of_requests=result.average_number_of_requests,
+        totalWarehouses=result.totalWarehouses,
+        totalRequests=result.totalRequests,
+        analysisRadius=result.analysisRadius,
+        lastPrecacheTimestamp=result.lastPrecacheTimestamp,
+        **extra
+    )
+
+
+def format_sse_log(message: str, progress: Optional[float] = None) -> str:
+    """SSE frame for a progress message"""
+    log_data = {"type": "log", "message": message}
+    if progress is not None:
+        log_data["progress"] = progress
+    return f"data: {json.dumps(log_data)}\n\n"
+
+
+def format_sse_data(result: CoverageAnalysisResponse, response_format: str = ROWS_FORMAT) -> str:
+    """SSE frame for a final result in the requested wire format"""
+    data = to_columnar_response(result) if response_format == COLUMNAR_FORMAT else result
+    # Use model_dump with mode='json' to ensure proper serialization
+    return f"data: {json.dumps({'type': 'data', 'data': data.model_dump(mode='json')})}\n\n"
+
+
+@dataclass
+class PrecachedPayload:
+    """Finished SSE body for a precached radius, with its compressed variants.
+
+    `source` and `timestamp` identify the precached result and precache run the body was
+    built from; a body whose result has since been replaced is not served.
+    """
+    source: CoverageAnalysisResponse
+    timestamp: Optional[str]
+    identity: bytes
+    gzip: bytes
+    br: Optional[bytes] = None
+    etag: str = ""  # Strong ETag of the identity body
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        """ETag of one encoded variant; each content coding gets its own strong validator."""
+        return self.etag if not encoding else f'{self.etag[:-1]}-{encoding}"'
+
+    def encoded(self, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+        """Body and Content-Encoding for a request's Accept-Encoding header."""
+        accepted = parse_accept_encoding(accept_encoding)
+        if self.br is not None and accepted.get("br", 0) > 0:
+            return self.br, "br"
+        if accepted.get("gzip", 0) > 0:
+            return self.gzip, "gzip"
+        return self.identity, None
+
+
+def parse_accept_encoding(accept_encoding: str) -> Dict[str, float]:
+    """Accept-Encoding header as {coding: q-value}; "*" stands in for unlisted codings."""
+    accepted: Dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    if "*" in accepted:
+        for coding in ("br", "gzip"):
+            accepted.setdefault(coding, accepted["*"])
+    return accepted
+
+
+def get_precached_payload_key(radius: float, response_format: str = ROWS_FORMAT) -> str:
+    """Cache key for the finished response body of a precached radius."""
+    return f"coverage_gap:precached_payload:radius_{radius}:{response_format}"
+
+
+def encode_precached_body(result: CoverageAnalysisResponse, response_format: str = ROWS_FORMAT) -> Dict[str, Any]:
+    """Serialize and compress the full SSE body served for a precached result (the PrecachedPayload body fields)."""
+    body = (format_sse_log(PRECACHED_LOG_MESSAGE, 100) + format_sse_data(result, response_format)).encode("utf-8")
+    return {
+        "identity": body,
+        "gzip": gzip.compress(body, compresslevel=GZIP_LEVEL),
+        "br": brotli.compress(body, quality=BROTLI_QUALITY) if brotli is not None else None,
+        "etag": make_etag(body)
+    }
+
+
+def encode_precached_bodies(result: CoverageAnalysisResponse, response_formats: Tuple[str, ...] = RESPONSE_FORMATS) -> Dict[str, Dict[str, Any]]:
+    """Worker task: the bodies of every wire format for one result, so the result is shipped to the worker once."""
+    return {response_format: encode_precached_body(result, response_format) for response_format in response_formats}
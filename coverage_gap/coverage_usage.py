@@ -0,0 +1,70 @@
+"""
+Usage tracking for coverage gap analyses.
+Filtered and non-precached analyses are counted by cache key, so the nightly precache can
+also compute the filter and radius combinations that are actually requested. Counts live in
+the shared cache, so the ranking covers requests served by every worker.
+"""
+
+import json
+import os
+import time
+from typing import List, Optional, Tuple
+
+from warehouse.models import CoverageGapFilters
+from services.caching.shared_cache import decay_shared_counters, get_shared_counters, increment_shared_counter
+
+# Shared counters of usage by analysis cache key
+USAGE_KEY = "coverage_gap:usage"
+USAGE_TTL = 2592000  # 30 days
+
+# Counts are halved after every nightly precache, so combinations nobody uses any more fade out
+USAGE_DECAY = 0.5
+# Decayed counts below this are forgotten
+MIN_USAGE_COUNT = 0.5
+
+# Most-used combinations precached each night, and the compute time they may take (seconds)
+POPULAR_PRECACHE_COUNT = int(os.getenv("POPULAR_PRECACHE_COUNT", "10"))
+POPULAR_PRECACHE_BUDGET_SECONDS = float(os.getenv("POPULAR_PRECACHE_BUDGET_SECONDS", "300"))
+
+Combination = Tuple[str, Optional[CoverageGapFilters], Optional[float]]
+
+
+def get_analysis_cache_key(filters: Optional[CoverageGapFilters], radius_miles: Optional[float]) -> str:
+    """Cache key for an analysis result, based on filters and radius."""
+    if filters:
+        filter_dict = filters.model_dump(exclude_none=True, exclude_unset=True)
+        filter_key = json.dumps(filter_dict, sort_keys=True)
+    else:
+        filter_key = "no_filters"
+
+    radius_key = f"_radius_{radius_miles}" if radius_miles else "_no_radius"
+    return f"coverage_gap:{filter_key}{radius_key}"
+
+
+async def record_usage(filters: Optional[CoverageGapFilters], radius_miles: Optional[float]) -> None:
+    """Count one request for a filter and radius combination. Failures are logged, never raised to the request."""
+    key = get_analysis_cache_key(filters, radius_miles)
+    details = {
+        "filters": filters.model_dump(exclude_none=True, exclude_unset=True) if filters else None,
+        "radius": radius_miles,
+        "lastUsed": time.time()
+    }
+    try:
+        await increment_shared_counter(USAGE_KEY, key, details, USAGE_TTL)
+    except Exception as e:
+        print(f"[COVERAGE_USAGE] ✗ Error recording usage of {key}: {str(e)}")
+
+
+async def popular_combinations(limit: int = POPULAR_PRECACHE_COUNT) -> List[Combination]:
+    """(cache key, filters, radius) of the most-used combinations, most used (then most recent) first."""
+    usage = await get_shared_counters(USAGE_KEY)
+    ranked = sorted(usage.items(), key=lambda item: (-item[1][0], -item[1][1]["lastUsed"]))
+    return [
+        (key, CoverageGapFilters(**details["filters"]) if details["filters"] else None, details["radius"])
+        for key, (_, details) in ranked[:limit]
+    ]
+
+
+async def decay_usage() -> None:
+    """Age every count by USAGE_DECAY, dropping combinations that fall below MIN_USAGE_COUNT."""
+    await decay_shared_counters(USAGE_KEY, USAGE_DECAY, MIN_USAGE_COUNT, USAGE_TTL)
@@ -0,0 +1,176 @@
+"""
+Viewport, state and paging queries over a coverage analysis.
+A CoverageViewIndex is built once per cached result: cities sorted by latitude for
+bounding-box range scans plus row lists per state, so a map viewport only serializes the
+cities and warehouses it shows instead of every US city.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from warehouse.warehouse_service import _cache
+from warehouse.models import CoverageAnalysisResponse, CoverageAnalysisViewResponse, CoverageViewInfo
+
+VIEW_INDEX_KEY_PREFIX = "coverage_gap:view_index:"
+# Outlives the precached results it indexes; an index whose result was replaced is rebuilt
+VIEW_INDEX_TTL = 90000
+
+BBox = Tuple[float, float, float, float]
+
+
+@dataclass(frozen=True)
+class CoverageScope:
+    """Part of the country an analysis covers: cities (and warehouses) inside `bbox` and/or `state`."""
+    bbox: Optional[BBox] = None  # (west, south, east, north) in degrees
+    state: Optional[str] = None
+
+    def contains(self, lats: np.ndarray, lngs: np.ndarray, states: np.ndarray) -> np.ndarray:
+        """Mask of the points in scope; states are upper-case, as the view index compares them."""
+        mask = np.ones(len(lats), dtype=bool)
+        if self.state:
+            mask &= states == self.state.upper()
+        if self.bbox:
+            west, south, east, north = self.bbox
+            mask &= (lats >= south) & (lats <= north)
+            mask &= _longitude_mask(lngs, west, east)
+        return mask
+
+    def cache_suffix(self) -> str:
+        parts = []
+        if self.state:
+            parts.append(f"_state_{self.state.upper()}")
+        if self.bbox:
+            parts.append("_bbox_" + ",".join(str(value) for value in self.bbox))
+        return "".join(parts)
+
+
+@dataclass
+class CoverageView:
+    """Part of a coverage analysis to return: cities inside `bbox` and/or `state`, paged."""
+    bbox: Optional[BBox] = None  # (west, south, east, north) in degrees
+    state: Optional[str] = None
+    offset: int = 0
+    limit: Optional[int] = None
+
+    def scope(self) -> Optional[CoverageScope]:
+        """The cities this view can show, or None when it pages through every city."""
+        if self.bbox or self.state:
+            return CoverageScope(bbox=self.bbox, state=self.state)
+        return None
+
+
+def parse_bbox(value: str) -> BBox:
+    """Parse a "west,south,east,north" query value. West > east crosses the antimeridian."""
+    parts = value.split(",")
+    if len(parts) != 4:
+        raise ValueError("bbox must be west,south,east,north")
+    west, south, east, north = (float(part) for part in parts)
+    if south > north:
+        raise ValueError("bbox south must not exceed north")
+    return west, south, east, north
+
+
+def _longitude_mask(lngs: np.ndarray, west: float, east: float) -> np.ndarray:
+    if west <= east:
+        return (lngs >= west) & (lngs <= east)
+    return (lngs >= west) | (lngs <= east)
+
+
+class CoverageViewIndex:
+    """Spatial index over one CoverageAnalysisResponse.
+
+    `source` is the result the index was built from; rows are positions in its
+    coverageAnalysis and warehouses lists.
+    """
+
+    def __init__(self, result: CoverageAnalysisResponse):
+        self.source = result
+
+        cities = result.coverageAnalysis
+        latitudes = np.array([city.latitude for city in cities], dtype=np.float64)
+        self.city_lngs = np.array([city.longitude for city in cities], dtype=np.float64)
+        self.lat_order = np.argsort(latitudes, kind="stable")
+        self.sorted_lats = latitudes[self.lat_order]
+
+        rows_by_state: Dict[str, List[int]] = {}
+        for row, city in enumerate(cities):
+            rows_by_state.setdefault(city.state.upper(), []).append(row)
+        self.state_rows = {state: np.array(rows, dtype=np.int64) for state, rows in rows_by_state.items()}
+
+        self.warehouse_lats = np.array([wh.lat for wh in result.warehouses], dtype=np.float64)
+        self.warehouse_lngs = np.array([wh.lng for wh in result.warehouses], dtype=np.float64)
+        self.warehouse_states = np.array([wh.state.upper() for wh in result.warehouses], dtype=object)
+
+    def city_rows(self, bbox: Optional[BBox] = None, state: Optional[str] = None) -> np.ndarray:
+        """Rows of the cities in view, in the result's original order."""
+        if state:
+            rows = self.state_rows.get(state.upper(), np.zeros(0, dtype=np.int64))
+        else:
+            rows = np.arange(len(self.city_lngs))
+        if bbox:
+            west, south, east, north = bbox
+            start = np.searchsorted(self.sorted_lats, south, side="left")
+            end = np.searchsorted(self.sorted_lats, north, side="right")
+            in_band = self.lat_order[start:end]
+            in_band = np.sort(in_band[_longitude_mask(self.city_lngs[in_band], west, east)])
+            rows = np.intersect1d(rows, in_band, assume_unique=True)
+        return rows
+
+    def warehouse_rows(self, bbox: Optional[BBox] = None, state: Optional[str] = None) -> np.ndarray:
+        """Rows of the warehouses located in view."""
+        mask = np.ones(len(self.warehouse_lats), dtype=bool)
+        if state:
+            mask &= self.warehouse_states == state.upper()
+        if bbox:
+            west, south, east, north = bbox
+            mask &= (self.warehouse_lats >= south) & (self.warehouse_lats <= north)
+            mask &= _longitude_mask(self.warehouse_lngs, west, east)
+        return np.flatnonzero(mask)
+
+
+def get_view_index(result: CoverageAnalysisResponse, source_key: str) -> CoverageViewIndex:
+    """View index for a cached result, built on first use and kept next to it."""
+    key = f"{VIEW_INDEX_KEY_PREFIX}{source_key}"
+    index = _cache.get(key)
+    if index is None or index.source is not result:
+        index = CoverageViewIndex(result)
+        _cache.set(key, index, ttl=VIEW_INDEX_TTL)
+    return index
+
+
+def select_view(result: CoverageAnalysisResponse, view: CoverageView, source_key: str) -> CoverageAnalysisViewResponse:
+    """The cities in view (one page of them) and the warehouses they show or reference.
+
+    Warehouses located in the view are included, plus any warehouse listed as nearby for a
+    returned city, so nearbyWarehouses always resolve. Totals describe the whole analysis.
+    """
+    index = get_view_index(result, source_key)
+    rows = index.city_rows(view.bbox, view.state)
+    end = view.offset + view.limit if view.limit else None
+    page = rows[view.offset:end].tolist()
+    cities = [result.coverageAnalysis[row] for row in page]
+
+    referenced = {wh.id for city in cities for wh in city.nearbyWarehouses}
+    in_view = set(index.warehouse_rows(view.bbox, view.state).tolist())
+    warehouses = [wh for row, wh in enumerate(result.warehouses) if row in in_view or wh.id in referenced]
+
+    next_offset = view.offset + len(page)
+    return CoverageAnalysisViewResponse(
+        warehouses=warehouses,
+        coverageAnalysis=cities,
+        average_number_of_requests=result.average_number_of_requests,
+        totalWarehouses=result.totalWarehouses,
+        totalRequests=result.totalRequests,
+        analysisRadius=result.analysisRadius,
+        lastPrecacheTimestamp=result.lastPrecacheTimestamp,
+        view=CoverageViewInfo(
+            bbox=list(view.bbox) if view.bbox else None,
+            state=view.state,
+            offset=view.offset,
+            limit=view.limit,
+            totalCities=len(rows),
+            nextOffset=next_offset if next_offset < len(rows) else None
+        )
+    )
@@ -0,0 +1,277 @@
+"""
+Process pool for CPU-heavy coverage gap stages.
+Distance-table builds, coverage analyses and grid layers run in worker processes, so the event loop only
+orchestrates I/O and keeps serving other requests while they compute.
+
+Engines reach the workers through files: each engine is written once to COVERAGE_ENGINE_DIR
+(by the worker that built it, or by this process for patched engines), and every worker
+loads it from there the first time it analyzes with it, instead of receiving a pickled copy
+with each task.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional
+
+from warehouse.models import CoverageAnalysisResponse, CoverageGapFilters, CoverageGridResponse
+from coverage_gap.coverage_engine import CoverageEngine, CoverageInputs, scope_inputs
+from coverage_gap.coverage_view import CoverageScope
+from coverage_gap.coverage_gap_precache import PRECACHED_RADII, get_last_precache_timestamp
+
+# Worker processes for coverage computations, one per precached radius so a precache run takes
+# as long as its slowest radius; 0 computes inline on the event loop
+COVERAGE_WORKERS = int(os.getenv("COVERAGE_WORKERS", str(len(PRECACHED_RADII))))
+
+# Engines a worker keeps loaded, and engine files kept on disk (the shared engine plus the one it replaces)
+WORKER_ENGINE_SLOTS = 2
+
+# Where engines are written for the worker processes to load
+COVERAGE_ENGINE_DIR = os.getenv("COVERAGE_ENGINE_DIR", os.path.join(tempfile.gettempdir(), "jsm-warehousenow-engines"))
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+# Engines already loaded in this worker process, by engine version
+_worker_engines: Dict[str, CoverageEngine] = {}
+
+# Engine files this process made available to its workers, oldest first; concurrent callers share one write
+_engine_files: Dict[str, asyncio.Future] = {}
+
+
+class EngineNotLoaded(Exception):
+    """Raised in a worker asked to analyze with an engine version whose file is gone."""
+
+
+def _remember_engine(engine: CoverageEngine) -> None:
+    _worker_engines.pop(engine.version, None)
+    _worker_engines[engine.version] = engine
+    while len(_worker_engines) > WORKER_ENGINE_SLOTS:
+        _worker_engines.pop(next(iter(_worker_engines)))
+
+
+def engine_path(version: str, directory: Optional[str] = None) -> str:
+    return os.path.join(directory or COVERAGE_ENGINE_DIR, f"engine_{version}.pickle")
+
+
+def write_engine(engine: CoverageEngine, directory: Optional[str] = None) -> None:
+    """Write an engine for the workers, replaced atomically so they never load a partial file."""
+    path = engine_path(engine.version, directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    staging = f"{path}.{os.getpid()}.tmp"
+    with open(staging, "wb") as f:
+        pickle.dump(engine, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(staging, path)
+
+
+def _load_engine(version: str, engine_file: str) -> CoverageEngine:
+    """The engine of a version, read from its file the first time this worker needs it."""
+    loaded = _worker_engines.get(version)
+    if loaded is None:
+        try:
+            with open(engine_file, "rb") as f:
+                loaded = pickle.load(f)
+        except FileNotFoundError:
+            raise EngineNotLoaded(version)
+        _remember_engine(loaded)
+    return loaded
+
+
+def build_engine_task(inputs: CoverageInputs, max_radius: float, engine_dir: Optional[str] = None) -> CoverageEngine:
+    """Worker task: build a distance table, write it to engine_dir for the other workers and keep it loaded."""
+    engine = CoverageEngine(inputs, max_radius)
+    if engine_dir:
+        write_engine(engine, engine_dir)
+    _remember_engine(engine)
+    return engine
+
+
+def analyze_task(
+    version: str,
+    engine_file: str,
+    radius_miles: Optional[float],
+    filters: Optional[CoverageGapFilters],
+    scope: Optional[CoverageScope] = None
+) -> CoverageAnalysisResponse:
+    """Worker task: analyze with an engine, loading it from its file if this worker has not yet."""
+    return _load_engine(version, engine_file).analyze(radius_miles, filters, scope)
+
+
+def grid_task(
+    version: str,
+    engine_file: str,
+    resolution: str,
+    filters: Optional[CoverageGapFilters],
+    parent_cell: Optional[str]
+) -> CoverageGridResponse:
+    """Worker task: grid layer from an engine, loading it from its file if this worker has not yet."""
+    # Lazy import to avoid circular dependency
+    from coverage_gap.coverage_grid import analyze_grid
+
+    return analyze_grid(_load_engine(version, engine_file), resolution, filters, parent_cell)
+
+
+def build_and_analyze_task(
+    inputs: CoverageInputs,
+    radius_miles: float,
+    filters: Optional[CoverageGapFilters],
+    scope: Optional[CoverageScope] = None
+) -> CoverageAnalysisResponse:
+    """Worker task: one-off distance table for a radius beyond the shared engine's maximum.
+
+    With a scope the table only covers the cities in scope and the warehouses they can reach.
+    """
+    if scope is None:
+        return CoverageEngine(inputs, radius_miles).analyze(radius_miles, filters)
+
+    result = CoverageEngine(scope_inputs(inputs, radius_miles, scope), radius_miles).analyze(radius_miles, filters, scope)
+    # Totals describe the whole country, not just the warehouses the scoped table kept
+    if filters:
+        # Lazy import to avoid circular dependency
+        from coverage_gap.coverage_gap_service import apply_warehouse_filters
+        
+        result.totalWarehouses = len(apply_warehouse_filters(inputs.warehouses, filters))
+    else:
+        result.totalWarehouses = len(inputs.warehouses)
+    return result
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared process pool, or None when computations should run inline."""
+    global _process_pool
+    if COVERAGE_WORKERS <= 0:
+        return None
+    if _process_pool is None:
+        try:
+            # Spawned workers start clean instead of forking the server's threads and event loop
+            _process_pool = ProcessPoolExecutor(
+                max_workers=COVERAGE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        except (OSError, NotImplementedError) as e:
+            print(f"[COVERAGE_WORKERS] Process pool unavailable, computing inline: {e}")
+            return None
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Stop the worker processes (called on application shutdown) and remove the engine files they read."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+    while _engine_files:
+        _forget_engine_file(next(iter(_engine_files)))
+
+
+def _forget_engine_file(version: str) -> None:
+    _engine_files.pop(version, None)
+    try:
+        os.remove(engine_path(version))
+    except OSError:
+        pass
+
+
+def _track_engine_file(version: str, written: asyncio.Future) -> None:
+    _engine_files[version] = written
+    while len(_engine_files) > WORKER_ENGINE_SLOTS:
+        _forget_engine_file(next(iter(_engine_files)))
+
+
+async def share_engine(engine: CoverageEngine) -> None:
+    """Make an engine loadable by the workers, writing it once however many tasks need it."""
+    written = _engine_files.get(engine.version)
+    if written is None:
+        written = asyncio.ensure_future(asyncio.to_thread(write_engine, engine))
+        _track_engine_file(engine.version, written)
+    try:
+        await written
+    except Exception:
+        _engine_files.pop(engine.version, None)
+        raise
+
+
+async def run_in_worker(task: Callable, *args):
+    """Run a task in the process pool (inline when there is none)."""
+    pool = get_process_pool()
+    if pool is None:
+        return task(*args)
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(pool, task, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); start a fresh pool for the next call
+        print("[COVERAGE_WORKERS] Process pool broke; it will be restarted")
+        shutdown_process_pool()
+        raise
+
+
+async def run_with_engine(engine: CoverageEngine, task: Callable, *args):
+    """Run a task taking (engine version, engine file, *args) in the pool, sharing the engine with the workers first."""
+    await share_engine(engine)
+    engine_file = engine_path(engine.version)
+    try:
+        return await run_in_worker(task, engine.version, engine_file, *args)
+    except EngineNotLoaded:
+        # The file was removed (e.g. replaced twice while this task waited); write it again
+        _forget_engine_file(engine.version)
+        await share_engine(engine)
+        return await run_in_worker(task, engine.version, engine_file, *args)
+
+
+async def build_engine_in_worker(inputs: CoverageInputs, max_radius: float) -> CoverageEngine:
+    """Build an engine in a worker, which also writes it for the other workers to load."""
+    pool = get_process_pool()
+    engine = await run_in_worker(build_engine_task, inputs, max_radius, COVERAGE_ENGINE_DIR if pool is not None else None)
+    if pool is not None:
+        written = asyncio.get_running_loop().create_future()
+        written.set_result(None)
+        _track_engine_file(engine.version, written)
+    return engine
+
+
+async def analyze_in_worker(
+    engine: CoverageEngine,
+    radius_miles: Optional[float],
+    filters: Optional[CoverageGapFilters] = None,
+    scope: Optional[CoverageScope] = None
+) -> CoverageAnalysisResponse:
+    """Coverage analysis for any radius and filters, computed off the event loop.
+
+    Radii beyond the engine's maximum get a one-off table over the same inputs (or, with a
+    scope, over the part of them the scope needs).
+    """
+    if radius_miles and radius_miles > engine.max_radius:
+        print(f"[COVERAGE_ENGINE] Radius {radius_miles} exceeds {engine.max_radius}; building a one-off distance table")
+        result = await run_in_worker(build_and_analyze_task, engine.inputs, radius_miles, filters, scope)
+    elif get_process_pool() is None:
+        return engine.analyze(radius_miles, filters, scope)
+    else:
+        result = await run_with_engine(engine, analyze_task, radius_miles, filters, scope)
+
+    # The precache timestamp lives in this process's cache, not the worker's
+    result.lastPrecacheTimestamp = get_last_precache_timestamp()
+    return result
+
+
+async def analyze_grid_in_worker(
+    engine: CoverageEngine,
+    resolution: str,
+    filters: Optional[CoverageGapFilters] = None,
+    parent_cell: Optional[str] = None
+) -> CoverageGridResponse:
+    """Grid layer for a resolution, filters and parent cell, computed off the event loop."""
+    if get_process_pool() is None:
+        # Lazy import to avoid circular dependency
+        from coverage_gap.coverage_grid import analyze_grid
+
+        return analyze_grid(engine, resolution, filters, parent_cell)
+
+    result = await run_with_engine(engine, grid_task, resolution, filters, parent_cell)
+    # The precache timestamp lives in this process's cache, not the worker's
+    result.lastPrecacheTimestamp = get_last_precache_timestamp()
+    return result
@@ -0,0 +1,151 @@
+"""
+Registry of precache job runs in this worker process.
+Scheduled and manually triggered precache jobs register a run here and record each stage's wall
+time, per-radius timings, the versions of the inputs they computed from, retries and errors,
+so /coverage_gap/precache/status can show where a run spends its time.
+"""
+
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Finished runs kept for the status endpoint, most recent last
+JOB_HISTORY_SIZE = 20
+
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+@dataclass
+class PrecacheJob:
+    """One run of a precache job."""
+    name: str  # "coverage_gap" or "ai_analysis"
+    trigger: str  # "scheduled", "startup" or "manual"
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    state: str = JOB_RUNNING
+    startedAt: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    finishedAt: Optional[str] = None
+    durationSeconds: Optional[float] = None
+    stages: Dict[str, float] = field(default_factory=dict)  # Wall time per stage, summed over retries
+    radii: Dict[float, Dict[str, Any]] = field(default_factory=dict)  # Status, wall time and attempts per radius
+    inputs: Dict[str, Any] = field(default_factory=dict)  # Versions and sizes of the inputs computed from
+    retries: int = 0
+    lastError: Optional[str] = None
+    _started: float = field(default_factory=time.monotonic, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "trigger": self.trigger,
+            "state": self.state,
+            "startedAt": self.startedAt,
+            "finishedAt": self.finishedAt,
+            "durationSeconds": self.durationSeconds if self.durationSeconds is not None else round(time.monotonic() - self._started, 3),
+            "stages": dict(self.stages),
+            "radii": {str(radius): dict(entry) for radius, entry in self.radii.items()},
+            "inputs": dict(self.inputs),
+            "retries": self.retries,
+            "lastError": self.lastError
+        }
+
+
+_jobs: Deque[PrecacheJob] = deque(maxlen=JOB_HISTORY_SIZE)
+
+# The run the current task (and the tasks and threads it starts) works for
+_current_job: ContextVar[Optional[PrecacheJob]] = ContextVar("precache_job", default=None)
+
+
+def start_job(name: str, trigger: str) -> Tuple[PrecacheJob, Token]:
+    """Register a run and make it the current one for this task; the token restores the previous one."""
+    job = PrecacheJob(name=name, trigger=trigger)
+    _jobs.append(job)
+    return job, _current_job.set(job)
+
+
+def finish_job(job: PrecacheJob, success: bool) -> None:
+    job.state = JOB_COMPLETED if success else JOB_FAILED
+    job.finishedAt = datetime.now(timezone.utc).isoformat()
+    job.durationSeconds = round(time.monotonic() - job._started, 3)
+
+
+@contextmanager
+def precache_job(name: str, trigger: str):
+    """
+    Register a run for the enclosed block. The block finishes it with finish_job; a run the
+    block leaves unfinished is marked completed, or failed if the block raised (or was cancelled).
+    The run stops being the current one when the block exits.
+    """
+    job, token = start_job(name, trigger)
+    try:
+        yield job
+    except BaseException as e:
+        job.lastError = str(e) or type(e).__name__
+        finish_job(job, False)
+        raise
+    finally:
+        try:
+            _current_job.reset(token)
+        except ValueError:
+            # A streamed run closed from another task (the client went away) has no context to restore
+            pass
+    if job.finishedAt is None:
+        finish_job(job, True)
+
+
+@contextmanager
+def job_stage(name: str):
+    """Add the wall time of the enclosed block to the current run's stage, if a run is active."""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        record_stage(name, time.monotonic() - started)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Add wall time to the current run's stage, if a run is active."""
+    job = _current_job.get()
+    if job is not None:
+        job.stages[name] = round(job.stages.get(name, 0.0) + seconds, 3)
+
+
+def record_radius(radius: float, success: bool, seconds: float) -> None:
+    """Record one attempt at a radius for the current run."""
+    job = _current_job.get()
+    if job is None:
+        return
+    entry = job.radii.setdefault(radius, {"attempts": 0})
+    entry["status"] = "success" if success else "failed"
+    entry["seconds"] = round(seconds, 3)
+    entry["attempts"] += 1
+
+
+def record_inputs(**inputs: Any) -> None:
+    """Record the versions and sizes of the inputs the current run computes from."""
+    job = _current_job.get()
+    if job is not None:
+        job.inputs.update(inputs)
+
+
+def record_error(error: str) -> None:
+    job = _current_job.get()
+    if job is not None:
+        job.lastError = error
+
+
+def record_retry(attempt: int) -> None:
+    job = _current_job.get()
+    if job is not None:
+        job.retries = attempt
+
+
+def get_precache_jobs(name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Registered runs, most recent first, optionally only those of one job."""
+    return [job.to_dict() for job in reversed(_jobs) if name is None or job.name == name]
@@ -0,0 +1,305 @@
+"""
+Spatial indexes for coverage gap analysis.
+Buckets points into lat/lng grid cells so radius queries only test points in nearby cells
+instead of every point.
+"""
+
+import math
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.geolocation.geolocation_service import haversine
+
+# Earth radius in miles, matching haversine()
+EARTH_RADIUS_MILES = 3958.8
+
+# Miles per degree of latitude (and of longitude at the equator)
+MILES_PER_DEGREE = EARTH_RADIUS_MILES * math.pi / 180
+
+# Cells are only summed wholesale when they lie this far inside the query circle, so
+# rounding in the cell geometry can never include a point haversine() would reject
+FULL_CELL_MARGIN_MILES = 0.01
+
+
+def bounding_box(lat: float, lng: float, radius_miles: float) -> Tuple[float, float, float, float]:
+    """Smallest lat/lng box containing every point within radius_miles of (lat, lng).
+
+    Returns (min_lat, max_lat, min_lng, max_lng). Longitudes may extend past ±180; callers
+    wrap them. If the circle reaches a pole, the box spans every longitude.
+    """
+    angular_radius = radius_miles / EARTH_RADIUS_MILES
+    lat_span = math.degrees(angular_radius)
+    min_lat = lat - lat_span
+    max_lat = lat + lat_span
+
+    if max_lat >= 90 or min_lat <= -90 or angular_radius >= math.pi / 2:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+
+    # Exact longitude extent of a spherical cap around (lat, lng)
+    lng_span = math.degrees(math.asin(min(1.0, math.sin(angular_radius) / math.cos(math.radians(lat)))))
+    return min_lat, max_lat, lng - lng_span, lng + lng_span
+
+
+def haversine_pairs(lats1: np.ndarray, lngs1: np.ndarray, lats2: np.ndarray, lngs2: np.ndarray) -> np.ndarray:
+    """Distances in miles between matching points of two sets (arrays broadcast together).
+
+    Same formula as haversine(), evaluated with NumPy; results can differ from it in the last
+    bits, so callers that threshold these distances re-check values right at the threshold.
+    """
+    lats1 = np.asarray(lats1, dtype=np.float64)
+    lngs1 = np.asarray(lngs1, dtype=np.float64)
+    lats2 = np.asarray(lats2, dtype=np.float64)
+    lngs2 = np.asarray(lngs2, dtype=np.float64)
+
+    phi1 = np.radians(lats1)
+    phi2 = np.radians(lats2)
+    dphi = np.radians(lats2 - lats1)
+    dlambda = np.radians(lngs2 - lngs1)
+
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return EARTH_RADIUS_MILES * c
+
+
+def haversine_matrix(lats1: np.ndarray, lngs1: np.ndarray, lats2: np.ndarray, lngs2: np.ndarray) -> np.ndarray:
+    """Distances in miles between every point of the first set (rows) and the second (columns)."""
+    return haversine_pairs(
+        np.asarray(lats1, dtype=np.float64)[:, None],
+        np.asarray(lngs1, dtype=np.float64)[:, None],
+        np.asarray(lats2, dtype=np.float64)[None, :],
+        np.asarray(lngs2, dtype=np.float64)[None, :]
+    )
+
+
+class GridIndex:
+    """Uniform lat/lng grid over a list of points.
+
+    Points keep their position in the input list, so query results are indices into it and
+    are returned in ascending order (the same order a full scan would visit them).
+    """
+
+    def __init__(self, points: Sequence[Tuple[float, float]], cell_size_miles: float):
+        self.points = list(points)
+        self.cell_degrees = max(cell_size_miles, 1.0) / MILES_PER_DEGREE
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        for index, (lat, lng) in enumerate(self.points):
+            self.cells.setdefault(self._cell(lat, lng), []).append(index)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees)
+
+    def _lng_ranges(self, min_lng: float, max_lng: float) -> List[Tuple[float, float]]:
+        """Split a longitude interval that crosses the antimeridian into in-range pieces."""
+        if max_lng - min_lng >= 360:
+            return [(-180.0, 180.0)]
+        ranges = [(max(min_lng, -180.0), min(max_lng, 180.0))]
+        if min_lng < -180:
+            ranges.append((min_lng + 360, 180.0))
+        if max_lng > 180:
+            ranges.append((-180.0, max_lng - 360))
+        return ranges
+
+    def candidates(self, lat: float, lng: float, radius_miles: float) -> Iterator[int]:
+        """Indices of points in cells overlapping the query circle's bounding box (unordered)."""
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_miles)
+        row_start = math.floor(min_lat / self.cell_degrees)
+        row_end = math.floor(max_lat / self.cell_degrees)
+
+        for range_min_lng, range_max_lng in self._lng_ranges(min_lng, max_lng):
+            col_start = math.floor(range_min_lng / self.cell_degrees)
+            col_end = math.floor(range_max_lng / self.cell_degrees)
+
+            # Sparse grids: walking occupied cells is cheaper than walking the box
+            if (row_end - row_start + 1) * (col_end - col_start + 1) > len(self.cells):
+                for (row, col), indices in self.cells.items():
+                    if row_start <= row <= row_end and col_start <= col <= col_end:
+                        yield from indices
+                continue
+
+            for row in range(row_start, row_end + 1):
+                for col in range(col_start, col_end + 1):
+                    indices = self.cells.get((row, col))
+                    if indices:
+                        yield from indices
+
+    def any_within(self, lat: float, lng: float, radius_miles: float) -> bool:
+        """Whether any point lies within radius_miles; stops at the first match, nearest cell first."""
+        own_cell = self.cells.get(self._cell(lat, lng), [])
+        for index in own_cell:
+            point_lat, point_lng = self.points[index]
+            if haversine(lat, lng, point_lat, point_lng) <= radius_miles:
+                return True
+        for index in self.candidates(lat, lng, radius_miles):
+            point_lat, point_lng = self.points[index]
+            if haversine(lat, lng, point_lat, point_lng) <= radius_miles:
+                return True
+        return False
+
+    def within_radius(self, lat: float, lng: float, radius_miles: float) -> List[Tuple[int, float]]:
+        """(index, haversine distance) for every point within radius_miles, in index order."""
+        matches = []
+        for index in sorted(set(self.candidates(lat, lng, radius_miles))):
+            point_lat, point_lng = self.points[index]
+            distance = haversine(lat, lng, point_lat, point_lng)
+            if distance <= radius_miles:
+                matches.append((index, distance))
+        return matches
+
+
+class WeightedGridIndex(GridIndex):
+    """Grid index whose points carry a weight, answering "sum of weights within radius" queries.
+
+    Each grid row keeps its occupied columns sorted with running totals of the cell weights, so
+    cells lying entirely inside the query circle are summed with one prefix-sum difference per
+    row; only points in cells straddling the circle are distance-tested.
+    """
+
+    def __init__(self, points: Sequence[Tuple[float, float]], weights: Sequence[int], cell_size_miles: float):
+        super().__init__(points, cell_size_miles)
+        self.weights = list(weights)
+
+        self.rows: Dict[int, Tuple[List[int], List[int]]] = {}
+        for row, col in sorted(self.cells):
+            self.rows.setdefault(row, ([], [0]))
+            cols, prefix = self.rows[row]
+            cols.append(col)
+            prefix.append(prefix[-1] + sum(self.weights[index] for index in self.cells[(row, col)]))
+
+    def _inner_half_width(self, lat: float, band_lat: float, radius_miles: float) -> Optional[float]:
+        """Longitude half-width (degrees) of the circle at latitude band_lat, or None if it does not reach it."""
+        angular_radius = radius_miles / EARTH_RADIUS_MILES
+        phi1 = math.radians(lat)
+        phi2 = math.radians(band_lat)
+        denominator = math.cos(phi1) * math.cos(phi2)
+        if denominator <= 0:
+            return None
+        cos_dlng = (math.cos(angular_radius) - math.sin(phi1) * math.sin(phi2)) / denominator
+        if cos_dlng > 1:
+            return None
+        return math.degrees(math.acos(max(cos_dlng, -1.0)))
+
+    def _inner_columns(self, lat: float, lng: float, radius_miles: float, row: int) -> Optional[Tuple[int, int]]:
+        """First and last column of the cells in `row` whose four corners are all within radius_miles.
+
+        Over a region this small, distance from the query point peaks on a cell's corners, so
+        those cells lie entirely inside the circle.
+        """
+        inner_radius = radius_miles - FULL_CELL_MARGIN_MILES
+        if inner_radius <= 0:
+            return None
+        half_widths = [
+            self._inner_half_width(lat, band_lat, inner_radius)
+            for band_lat in (row * self.cell_degrees, (row + 1) * self.cell_degrees)
+        ]
+        if None in half_widths:
+            return None
+        half_width = min(half_widths)
+        first_col = math.ceil((lng - half_width) / self.cell_degrees)
+        last_col = math.floor((lng + half_width) / self.cell_degrees) - 1
+        if first_col > last_col:
+            return None
+        return first_col, last_col
+
+    def _sum_points(self, lat: float, lng: float, radius_miles: float, row: int, cols: List[int], start: int, end: int) -> int:
+        """Weights of points within radius_miles in the occupied cells cols[start:end] of `row`."""
+        total = 0
+        for col in cols[start:end]:
+            for index in self.cells[(row, col)]:
+                point_lat, point_lng = self.points[index]
+                if haversine(lat, lng, point_lat, point_lng) <= radius_miles:
+                    total += self.weights[index]
+        return total
+
+    def radius_sum(self, lat: float, lng: float, radius_miles: float) -> int:
+        """Sum of the weights of every point within radius_miles of (lat, lng)."""
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_miles)
+        row_start = math.floor(min_lat / self.cell_degrees)
+        row_end = math.floor(max_lat / self.cell_degrees)
+        lng_ranges = self._lng_ranges(min_lng, max_lng)
+
+        total = 0
+        for row in range(row_start, row_end + 1):
+            row_cells = self.rows.get(row)
+            if not row_cells:
+                continue
+            cols, prefix = row_cells
+
+            # Whole-cell sums only when the box does not wrap around the antimeridian
+            inner = self._inner_columns(lat, lng, radius_miles, row) if len(lng_ranges) == 1 else None
+
+            for range_min_lng, range_max_lng in lng_ranges:
+                start = bisect_left(cols, math.floor(range_min_lng / self.cell_degrees))
+                end = bisect_right(cols, math.floor(range_max_lng / self.cell_degrees))
+                if inner is None:
+                    total += self._sum_points(lat, lng, radius_miles, row, cols, start, end)
+                    continue
+
+                inner_start = max(bisect_left(cols, inner[0]), start)
+                inner_end = max(min(bisect_right(cols, inner[1]), end), inner_start)
+                total += prefix[inner_end] - prefix[inner_start]
+                total += self._sum_points(lat, lng, radius_miles, row, cols, start, inner_start)
+                total += self._sum_points(lat, lng, radius_miles, row, cols, inner_end, end)
+        return total
+
+
+def build_warehouse_grid(warehouses: Sequence, cell_size_miles: float) -> GridIndex:
+    """Grid index over warehouses with valid coordinates (objects with `lat` and `lng`)."""
+    return GridIndex([(wh.lat, wh.lng) for wh in warehouses], cell_size_miles)
+
+
+def find_cities_near(us_cities: Dict[str, Dict], seed_keys, radius_miles: float) -> set:
+    """Keys of US cities with coordinates lying within radius_miles of at least one seed city.
+
+    Seeds without coordinates are ignored. Instead of scanning every US city for each seed,
+    the seeds are gridded once and each city asks whether any seed is nearby.
+    """
+    seeds = []
+    for city_key in seed_keys:
+        city_info = us_cities.get(city_key)
+        if not city_info:
+            continue
+        lat = city_info.get('latitude', 0.0)
+        lng = city_info.get('longitude', 0.0)
+        if lat and lng:
+            seeds.append((lat, lng))
+    if not seeds:
+        return set()
+
+    seed_grid = GridIndex(seeds, radius_miles)
+    nearby = set()
+    for city_key, city_info in us_cities.items():
+        lat = city_info.get('latitude', 0.0)
+        lng = city_info.get('longitude', 0.0)
+        if lat and lng and seed_grid.any_within(lat, lng, radius_miles):
+            nearby.add(city_key)
+    return nearby
+
+
+def build_demand_index(
+    us_cities: Dict[str, Dict],
+    city_request_counts: Dict[str, int],
+    radius_miles: float
+) -> WeightedGridIndex:
+    """Index of cities with requests, weighted by request count, for aggregated request counts.
+
+    Cities with no requests, no entry in us_cities, or missing coordinates are left out, as
+    calculate_aggregated_request_count() always skipped them. Cells are a quarter of the radius
+    so most of each query circle is covered by whole cells.
+    """
+    points = []
+    weights = []
+    for city_key, request_count in city_request_counts.items():
+        if request_count == 0:
+            continue
+        city_info = us_cities.get(city_key)
+        if not city_info:
+            continue
+        lat = city_info.get('latitude')
+        lng = city_info.get('longitude')
+        if not lat or not lng:
+            continue
+        points.append((lat, lng))
+        weights.append(request_count)
+    return WeightedGridIndex(points, weights, radius_miles / 4)
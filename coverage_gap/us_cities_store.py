@@ -0,0 +1,218 @@
+"""
+Binary US cities dataset.
+data/us_cities.json is compiled once (scripts/build_us_cities_store.py) into a directory of
+.npy columns: lat/lng arrays, interned city and state names, and every city's ZIP codes as
+offsets into one flat array. Each process memory-maps the columns on first use instead of
+re-parsing the JSON on every analysis run.
+"""
+
+import json
+import os
+import shutil
+import sys
+from collections.abc import ItemsView, Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+US_CITIES_JSON_PATH = 'data/us_cities.json'
+US_CITIES_STORE_DIR = 'data/us_cities_store'
+
+# Column files of the compiled dataset
+STORE_COLUMNS = ("latitude", "longitude", "city_idx", "state_idx", "zip_offsets", "zipcodes", "names", "name_offsets")
+
+_us_cities: Optional["USCitiesStore"] = None
+
+
+def _pack_strings(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """UTF-8 blob plus int32 offsets for a list of strings."""
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int32)
+    offsets[1:] = np.cumsum([len(value) for value in encoded])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [sys.intern(data[bounds[i]:bounds[i + 1]].decode('utf-8')) for i in range(len(bounds) - 1)]
+
+
+class _CityItems(ItemsView):
+    def __iter__(self):
+        return self._mapping.iter_rows()
+
+
+class USCitiesStore(Mapping):
+    """US cities as columnar arrays, read as a mapping of "city,state" -> city dict.
+
+    latitude / longitude: float64 per city (0.0 when the source had none)
+    city_idx / state_idx: int32 indexes into the interned `names` table
+    zip_offsets / zipcodes: city i owns zipcodes[zip_offsets[i]:zip_offsets[i+1]]
+
+    City dicts (`city`, `state`, `latitude`, `longitude`, `zipcodes`) are built on access,
+    in the order of the source JSON, so the columns stay the only resident copy.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], directory: Optional[str] = None):
+        self.directory = directory
+        self.latitudes = columns["latitude"]
+        self.longitudes = columns["longitude"]
+        self.city_idx = columns["city_idx"]
+        self.state_idx = columns["state_idx"]
+        self.zip_offsets = columns["zip_offsets"]
+        self.zipcodes = columns["zipcodes"]
+        self.names = _unpack_strings(columns["names"], columns["name_offsets"])
+        self._rows: Dict[str, int] = {}
+        for row, (city, state) in enumerate(zip(self.city_idx.tolist(), self.state_idx.tolist())):
+            self._rows[f"{self.names[city]},{self.names[state]}"] = row
+
+    @classmethod
+    def from_cities(cls, cities: List[Dict]) -> "USCitiesStore":
+        """Build the columns from us_cities.json city entries (later duplicates of a key win)."""
+        return cls(build_store_columns(cities))
+
+    def __getitem__(self, city_key: str) -> Dict:
+        row = self._rows[city_key]
+        start, end = int(self.zip_offsets[row]), int(self.zip_offsets[row + 1])
+        return {
+            "city": self.names[self.city_idx[row]],
+            "state": self.names[self.state_idx[row]],
+            "latitude": float(self.latitudes[row]),
+            "longitude": float(self.longitudes[row]),
+            "zipcodes": self.zipcodes[start:end].astype(str).tolist()
+        }
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, city_key) -> bool:
+        return city_key in self._rows
+
+    def items(self) -> ItemsView:
+        return _CityItems(self)
+
+    def iter_rows(self) -> Iterator[Tuple[str, Dict]]:
+        """(city_key, city dict) pairs, converting each column once rather than per city."""
+        latitudes = self.latitudes.tolist()
+        longitudes = self.longitudes.tolist()
+        city_idx = self.city_idx.tolist()
+        state_idx = self.state_idx.tolist()
+        offsets = self.zip_offsets.tolist()
+        zipcodes = self.zipcodes.astype(str).tolist()
+        for city_key, row in self._rows.items():
+            yield city_key, {
+                "city": self.names[city_idx[row]],
+                "state": self.names[state_idx[row]],
+                "latitude": latitudes[row],
+                "longitude": longitudes[row],
+                "zipcodes": zipcodes[offsets[row]:offsets[row + 1]]
+            }
+
+    def location_columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Latitude, longitude and upper-case state per city, in mapping order, without building city dicts."""
+        rows = np.fromiter(self._rows.values(), dtype=np.int64, count=len(self._rows))
+        upper_names = np.array([name.upper() for name in self.names], dtype=object)
+        return (
+            np.asarray(self.latitudes, dtype=np.float64)[rows],
+            np.asarray(self.longitudes, dtype=np.float64)[rows],
+            upper_names[self.state_idx[rows]]
+        )
+
+    def __reduce__(self):
+        # Memory-mapped stores re-open their files in other processes instead of pickling the columns
+        if self.directory:
+            return (read_us_cities_store, (self.directory,))
+        return super().__reduce__()
+
+
+def build_store_columns(cities: List[Dict]) -> Dict[str, np.ndarray]:
+    """Columnar arrays for a list of us_cities.json city entries."""
+    by_key: Dict[str, Dict] = {}
+    for city_data in cities:
+        by_key[f"{city_data['city']},{city_data['state']}"] = city_data
+
+    names: Dict[str, int] = {}
+    city_idx: List[int] = []
+    state_idx: List[int] = []
+    latitudes: List[float] = []
+    longitudes: List[float] = []
+    zip_offsets = [0]
+    zipcodes: List[str] = []
+    for city_data in by_key.values():
+        city_idx.append(names.setdefault(city_data['city'], len(names)))
+        state_idx.append(names.setdefault(city_data['state'], len(names)))
+        latitudes.append(city_data.get('latitude') or 0.0)
+        longitudes.append(city_data.get('longitude') or 0.0)
+        zipcodes.extend(str(zip_code) for zip_code in city_data.get('zipcodes', []))
+        zip_offsets.append(len(zipcodes))
+
+    name_blob, name_offsets = _pack_strings(list(names))
+    return {
+        "latitude": np.array(latitudes, dtype=np.float64),
+        "longitude": np.array(longitudes, dtype=np.float64),
+        "city_idx": np.array(city_idx, dtype=np.int32),
+        "state_idx": np.array(state_idx, dtype=np.int32),
+        "zip_offsets": np.array(zip_offsets, dtype=np.int32),
+        "zipcodes": np.array(zipcodes, dtype='S') if zipcodes else np.zeros(0, dtype='S5'),
+        "names": name_blob,
+        "name_offsets": name_offsets
+    }
+
+
+def write_us_cities_store(cities: List[Dict], directory: str = US_CITIES_STORE_DIR) -> None:
+    """Compile city entries into the binary dataset, replacing any previous build."""
+    columns = build_store_columns(cities)
+    staging = f"{directory}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for name, values in columns.items():
+        np.save(os.path.join(staging, f"{name}.npy"), values)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(staging, directory)
+
+
+def read_us_cities_store(directory: str = US_CITIES_STORE_DIR) -> USCitiesStore:
+    """Memory-map a compiled dataset."""
+    columns = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r') for name in STORE_COLUMNS}
+    return USCitiesStore(columns, directory)
+
+
+def _store_is_current(json_path: str, directory: str) -> bool:
+    store_marker = os.path.join(directory, f"{STORE_COLUMNS[0]}.npy")
+    if not os.path.exists(store_marker):
+        return False
+    # A regenerated us_cities.json makes the compiled store stale
+    return not os.path.exists(json_path) or os.path.getmtime(store_marker) >= os.path.getmtime(json_path)
+
+
+def load_us_cities() -> Mapping:
+    """All US cities keyed by city,state, loaded once per process.
+
+    Reads the compiled store when it is present and current, otherwise falls back to
+    parsing us_cities.json. Returns an empty dict when neither exists.
+    """
+    global _us_cities
+    if _us_cities is not None:
+        return _us_cities
+
+    try:
+        if _store_is_current(US_CITIES_JSON_PATH, US_CITIES_STORE_DIR):
+            _us_cities = read_us_cities_store(US_CITIES_STORE_DIR)
+            print(f"Loaded {len(_us_cities)} US cities from {US_CITIES_STORE_DIR}")
+            return _us_cities
+
+        with open(US_CITIES_JSON_PATH, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        _us_cities = USCitiesStore.from_cities(data.get('cities', []))
+        print(f"Loaded {len(_us_cities)} US cities from us_cities.json (run scripts/build_us_cities_store.py to compile it)")
+        return _us_cities
+    except FileNotFoundError:
+        print("Warning: us_cities.json not found. Run generate_us_cities.py first.")
+        return {}
+    except Exception as e:
+        print(f"Error loading US cities: {e}")
+        return {}
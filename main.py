@@ -3,11 +3,16 @@ from fastapi import FastAPI
 import asyncio
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
 from warehouse.warehouse_route import warehouse_router
 from coverage_gap.coverage_gap_route import coverage_gap_router
-from coverage_gap.coverage_gap_precache import precache_all_radii
-from coverage_gap.ai_analysis_precache import precache_ai_analysis
+from coverage_gap.coverage_gap_precache import load_precached_results, precache_all_radii
+from coverage_gap.coverage_gap_updates import apply_queued_warehouse_changes
+from coverage_gap.ai_analysis_precache import load_precached_ai_analysis, precache_ai_analysis
+from coverage_gap.coverage_workers import shutdown_process_pool
+from services.caching.leader_election import get_leader_election, leader_only
+from services.caching.shared_cache import SHARED_CACHE_SYNC_INTERVAL
 from fastapi.middleware.cors import CORSMiddleware
 
 scheduler = AsyncIOScheduler()
@@ -16,11 +21,15 @@ scheduler = AsyncIOScheduler()
 async def lifespan(app: FastAPI):
     print("Starting application...")
     
+    leader_election = get_leader_election()
+    is_leader = await leader_election.start()
+    print(f"✓ Leader election started ({'leader' if is_leader else 'follower'}: scheduled jobs run on one worker)")
+    
     scheduler.start()
     print("✓ Background scheduler started")
     
     scheduler.add_job(
-        precache_all_radii,
+        leader_only(precache_all_radii),
         trigger=CronTrigger(hour=8, minute=0, timezone="America/New_York"),
         id="precache_coverage_gap",
         replace_existing=True
@@ -28,28 +37,53 @@ async def lifespan(app: FastAPI):
     print("✓ Coverage gap pre-cache job scheduled (daily at 8:00 AM EST)")
     
     scheduler.add_job(
-        precache_ai_analysis,
+        leader_only(precache_ai_analysis),
         trigger=CronTrigger(hour=8, minute=30, timezone="America/New_York"),
         id="precache_ai_analysis",
         replace_existing=True
     )
     print("✓ AI analysis pre-cache job scheduled (daily at 8:30 AM EST)")
     
-    asyncio.create_task(precache_all_radii())
-    print("✓ Initial coverage gap pre-cache started in background")
+    async def load_shared_precache():
+        # Results published by the leader (or a manual pre-cache on any worker)
+        await load_precached_results()
+        await load_precached_ai_analysis()
+        # Warehouse changes received by other workers, patched in by the worker holding the pre-cache engine
+        await apply_queued_warehouse_changes()
+    
+    scheduler.add_job(
+        load_shared_precache,
+        trigger=IntervalTrigger(seconds=SHARED_CACHE_SYNC_INTERVAL),
+        id="load_shared_precache",
+        replace_existing=True
+    )
+    print(f"✓ Shared pre-cache sync scheduled (every {SHARED_CACHE_SYNC_INTERVAL} seconds)")
     
-    async def delayed_ai_precache():
-        await asyncio.sleep(900)
-        await precache_ai_analysis()
+    # Serve the last published results right away, even while the leader recomputes them
+    await load_shared_precache()
     
-    asyncio.create_task(delayed_ai_precache())
-    print("✓ Initial AI analysis pre-cache scheduled to start in 15 minutes")
+    if is_leader:
+        asyncio.create_task(precache_all_radii(trigger="startup"))
+        print("✓ Initial coverage gap pre-cache started in background")
+        
+        async def delayed_ai_precache():
+            await asyncio.sleep(900)
+            # Leadership may have moved while waiting
+            if leader_election.is_leader:
+                await precache_ai_analysis(trigger="startup")
+        
+        asyncio.create_task(delayed_ai_precache())
+        print("✓ Initial AI analysis pre-cache scheduled to start in 15 minutes")
     
     yield
     
     print("Shutting down application...")
     scheduler.shutdown()
     print("✓ Scheduler stopped")
+    await leader_election.stop()
+    print("✓ Leader lock released")
+    shutdown_process_pool()
+    print("✓ Coverage worker processes stopped")
 
 
 app = FastAPI(title="jsm-warehousenow", lifespan=lifespan)
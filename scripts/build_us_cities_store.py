@@ -0,0 +1,23 @@
+"""
+Script to compile data/us_cities.json into the binary US cities dataset
+(data/us_cities_store) that the coverage gap services memory-map at runtime.
+Run from the project root: python -m scripts.build_us_cities_store
+"""
+
+import json
+
+from coverage_gap.us_cities_store import US_CITIES_JSON_PATH, US_CITIES_STORE_DIR, write_us_cities_store
+
+
+def build_us_cities_store():
+    print(f"Loading {US_CITIES_JSON_PATH}...")
+    with open(US_CITIES_JSON_PATH, 'r', encoding='utf-8') as f:
+        cities = json.load(f).get('cities', [])
+    
+    print(f"Compiling {len(cities)} cities into {US_CITIES_STORE_DIR}...")
+    write_us_cities_store(cities, US_CITIES_STORE_DIR)
+    print(f"✓ Successfully built {US_CITIES_STORE_DIR}")
+
+
+if __name__ == "__main__":
+    build_us_cities_store()
@@ -25,7 +25,11 @@ async def check_null_warehouse_requests():
     headers = {
         "Authorization": f"Bearer {AIRTABLE_TOKEN}"
     }
-    params = {}
+    # Only project the columns this report reads
+    params = {
+        "pageSize": 100,
+        "fields[]": ["Warehouse", "Request ID", "City", "State", "Created Time"]
+    }
     
     requests_without_warehouse = []
     total_requests = 0
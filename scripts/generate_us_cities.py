@@ -6,6 +6,8 @@ Groups zipcodes by city+state and calculates average coordinates.
 import json
 from collections import defaultdict
 
+from coverage_gap.us_cities_store import write_us_cities_store
+
 def generate_us_cities():
     
     print("Loading zipcodes.json...")
@@ -92,6 +94,10 @@ def generate_us_cities():
     print(f"  Total cities: {len(cities_list)}")
     print(f"  Sample cities: {cities_list[:3]}")
     
+    # Compile the binary dataset the services load at runtime
+    write_us_cities_store(cities_list)
+    print("✓ Successfully built data/us_cities_store")
+    
     return output
 
 if __name__ == "__main__":
@@ -1,7 +1,6 @@
 
-
 import re
-from typing import List
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 from fastapi import HTTPException
 import httpx
@@ -14,14 +13,56 @@ AIRTABLE_TOKEN = os.getenv("AIRTABLE_TOKEN")
 BASE_ID = os.getenv("BASE_ID")
 ODER_TABLE_NAME = "Requests"
 
-async def fetch_requests_from_airtable():
+# Airtable's maximum page size; fewer round trips per full-table scan
+AIRTABLE_PAGE_SIZE = 100
+
+# Field projections for Requests table scans. Each consumer declares only the
+# columns it reads so scans skip long text and attachment columns such as
+# "BOL & Pictures". Airtable always returns `id` and `createdTime`, so scans that
+# only need those still project one small field (an empty projection means "all").
+REQUEST_ID_FIELDS = ["Request ID"]
+WAREHOUSE_COUNT_FIELDS = ["Warehouse"]
+CITY_COUNT_FIELDS = ["City", "State"]
+REQUEST_DETAIL_FIELDS = ["Request ID", "Commodity", "Loading Style", "BOL & Pictures"]
+
+# Local Request ID index: parsed RequestData cached per ID (the "requests:" prefix is cleared by the webhook)
+REQUEST_INDEX_KEY_PREFIX = "requests:by_id:"
+REQUEST_INDEX_TTL = 1800
+# Request IDs per OR(...) lookup, kept well under Airtable's formula and page limits
+REQUEST_ID_BATCH_SIZE = 50
+
+
+def merge_field_projections(*projections: Optional[List[str]]) -> Optional[List[str]]:
+    """Union of several field projections, for scans that serve multiple consumers.
+
+    A `None` projection means the consumer needs every field, so it wins.
+    """
+    merged: List[str] = []
+    for projection in projections:
+        if projection is None:
+            return None
+        for field in projection:
+            if field not in merged:
+                merged.append(field)
+    return merged
+
+
+def build_request_scan_params(fields: Optional[List[str]] = None) -> dict:
+    """Query params for a Requests scan: page size plus an optional `fields[]` projection."""
+    params = {"pageSize": AIRTABLE_PAGE_SIZE}
+    if fields:
+        params["fields[]"] = list(fields)
+    return params
+
+
+async def iter_request_pages(fields: Optional[List[str]] = None) -> AsyncGenerator[List[dict], None]:
+    """Page through the Requests table, yielding the records of each page as it arrives."""
     url = f"https://api.airtable.com/v0/{BASE_ID}/{ODER_TABLE_NAME}"
     headers = {
         "Authorization": f"Bearer {AIRTABLE_TOKEN}"
     }
-    params = {}
+    params = build_request_scan_params(fields)
 
-    records = []
     async with httpx.AsyncClient() as client:
         offset = None
         while True:
@@ -30,22 +71,30 @@ async def fetch_requests_from_airtable():
             resp = await client.get(url, headers=headers, params=params)
             resp.raise_for_status()
             data = resp.json()
-            records.extend(data.get("records", []))
+            yield data.get("records", [])
             offset = data.get("offset")
             if not offset:
                 break
-    
-    return records
 
 
-async def fetch_request_by_id_from_airtable(request_id: int) -> List[RequestData]:
+async def fetch_requests_page(
+    cursor: Optional[str] = None,
+    page_size: int = AIRTABLE_PAGE_SIZE,
+    fields: Optional[List[str]] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """Fetch one page of the Requests table.
+
+    `cursor` is the Airtable offset returned with the previous page; returns the page's
+    records and the cursor for the next page (None on the last page).
+    """
     url = f"https://api.airtable.com/v0/{BASE_ID}/{ODER_TABLE_NAME}"
     headers = {
         "Authorization": f"Bearer {AIRTABLE_TOKEN}"
     }
-    params = {
-        "filterByFormula": f"{{Request ID}} = {request_id}",
-    }
+    params = build_request_scan_params(fields)
+    params["pageSize"] = min(max(page_size, 1), AIRTABLE_PAGE_SIZE)
+    if cursor:
+        params["offset"] = cursor
 
     async with httpx.AsyncClient() as client:
         resp = await client.get(url, headers=headers, params=params)
@@ -53,25 +102,114 @@ async def fetch_request_by_id_from_airtable(request_id: int) -> List[RequestData
         data = resp.json()
 
     records = data.get("records", [])
+    if merge_field_projections(fields, REQUEST_DETAIL_FIELDS) == fields:
+        index_request_records(records)
+    return records, data.get("offset")
+
+
+async def fetch_requests_from_airtable(fields: Optional[List[str]] = None):
+    # Full-detail scans also refresh the local Request ID index
+    index_pages = merge_field_projections(fields, REQUEST_DETAIL_FIELDS) == fields
+
+    records = []
+    async for page in iter_request_pages(fields):
+        records.extend(page)
+        if index_pages:
+            index_request_records(page)
+
+    return records
+
+
+def parse_request_record(record: dict) -> RequestData:
+    """Build RequestData from a Requests record, extracting image URLs from "BOL & Pictures"."""
+    fields = record.get("fields", {})
+    request_images: List[str] = []
+    raw_images = fields.get("BOL & Pictures")
 
-    result: RequestData = None
+    if isinstance(raw_images, str):
+        request_images = re.findall(r"\((https?://[^\)]+)\)", raw_images)
+    elif isinstance(raw_images, list):
+        for img in raw_images:
+            if isinstance(img, dict) and "url" in img:
+                request_images.append(img["url"])
+
+    return RequestData(
+            commodity=fields.get("Commodity"),
+            loading_method=fields.get("Loading Style"),
+            request_images=request_images
+        )
+
+
+def get_request_index_key(request_id: int) -> str:
+    """Cache key for a parsed request in the local Request ID index."""
+    return f"{REQUEST_INDEX_KEY_PREFIX}{request_id}"
+
+
+def index_request_records(records: List[dict]) -> Dict[int, RequestData]:
+    """Parse records and store them in the local Request ID index. Returns the parsed requests by ID."""
+    from warehouse.warehouse_service import _cache
+
+    indexed: Dict[int, RequestData] = {}
     for record in records:
-        fields = record.get("fields", {})
-        request_images: List[str] = []
-        raw_images = fields.get("BOL & Pictures")
-
-        if isinstance(raw_images, str):
-            request_images = re.findall(r"\((https?://[^\)]+)\)", raw_images)
-        elif isinstance(raw_images, list):
-            for img in raw_images:
-                if isinstance(img, dict) and "url" in img:
-                    request_images.append(img["url"])
-
-        result = RequestData(
-                commodity=fields.get("Commodity"),
-                loading_method=fields.get("Loading Style"),
-                request_images=request_images
-            )
+        raw_id = record.get("fields", {}).get("Request ID")
+        try:
+            request_id = int(raw_id)
+        except (TypeError, ValueError):
+            continue
+        indexed[request_id] = parse_request_record(record)
+        _cache.set(get_request_index_key(request_id), indexed[request_id], ttl=REQUEST_INDEX_TTL)
+    return indexed
+
+
+async def fetch_requests_by_ids_from_airtable(request_ids: List[int]) -> Dict[int, RequestData]:
+    """Resolve many Request IDs at once.
+
+    IDs already in the local index are served from memory; the rest are fetched with one
+    OR(...) formula query per chunk and indexed. IDs that do not exist are absent from the result.
+    """
+    from warehouse.warehouse_service import _cache
+
+    found: Dict[int, RequestData] = {}
+    missing: List[int] = []
+    for request_id in dict.fromkeys(request_ids):
+        cached = _cache.get(get_request_index_key(request_id))
+        if cached is not None:
+            found[request_id] = cached
+        else:
+            missing.append(request_id)
+
+    if not missing:
+        return found
+
+    url = f"https://api.airtable.com/v0/{BASE_ID}/{ODER_TABLE_NAME}"
+    headers = {
+        "Authorization": f"Bearer {AIRTABLE_TOKEN}"
+    }
+
+    async with httpx.AsyncClient() as client:
+        for start in range(0, len(missing), REQUEST_ID_BATCH_SIZE):
+            chunk = missing[start:start + REQUEST_ID_BATCH_SIZE]
+            params = build_request_scan_params(REQUEST_DETAIL_FIELDS)
+            params["filterByFormula"] = "OR(" + ", ".join(f"{{Request ID}} = {request_id}" for request_id in chunk) + ")"
+
+            offset = None
+            while True:
+                if offset:
+                    params["offset"] = offset
+                resp = await client.get(url, headers=headers, params=params)
+                resp.raise_for_status()
+                data = resp.json()
+                found.update(index_request_records(data.get("records", [])))
+                offset = data.get("offset")
+                if not offset:
+                    break
+
+    return {request_id: found[request_id] for request_id in dict.fromkeys(request_ids) if request_id in found}
+
+
+async def fetch_request_by_id_from_airtable(request_id: int) -> RequestData:
+    results = await fetch_requests_by_ids_from_airtable([request_id])
+    result = results.get(request_id)
 
     if not result:
         raise HTTPException(
@@ -79,4 +217,4 @@ async def fetch_request_by_id_from_airtable(request_id: int) -> List[RequestData
                 detail=f"Order with Request ID {request_id} not found"
             )   
 
-    return result
\ No newline at end of file
+    return result
@@ -0,0 +1,150 @@
+"""
+Single-pass aggregate over the Requests table.
+One scan computes every request statistic used by the coverage gap and AI analysis paths,
+and the result is cached as one unit keyed by a snapshot version.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from services.airtable.requests import (
+    iter_request_pages,
+    merge_field_projections,
+    REQUEST_ID_FIELDS,
+    WAREHOUSE_COUNT_FIELDS,
+    CITY_COUNT_FIELDS
+)
+from services.airtable.requests_store import RequestsStore, RequestsStoreBuilder
+from warehouse.models import RequestTrends
+from warehouse.warehouse_service import _cache
+
+# Cache key and TTL for the aggregate (the "requests:" prefix is cleared by the webhook)
+REQUESTS_AGGREGATE_KEY = "requests:aggregate"
+REQUESTS_AGGREGATE_TTL = 3600
+
+# Union of the fields read by every statistic computed in the scan
+AGGREGATE_FIELDS = merge_field_projections(REQUEST_ID_FIELDS, WAREHOUSE_COUNT_FIELDS, CITY_COUNT_FIELDS)
+
+# Serializes concurrent refreshes so parallel callers share one scan
+_aggregate_lock = asyncio.Lock()
+
+
+@dataclass
+class RequestsAggregate:
+    """Request statistics computed in one pass over the Requests table."""
+    total_count: int = 0
+    monthly_count: int = 0
+    average_monthly_requests: int = 0
+    warehouse_counts: Dict[str, int] = field(default_factory=dict)
+    city_counts: Dict[str, int] = field(default_factory=dict)
+    past_week_count: int = 0
+    previous_week_count: int = 0
+    past_3_months_count: int = 0
+    previous_3_months_count: int = 0
+    snapshot_version: str = ""
+    computed_at: str = ""
+    # Columnar records backing the statistics, for ad-hoc time-window and histogram queries
+    store: Optional[RequestsStore] = field(default=None, repr=False)
+
+    def request_trends(self) -> RequestTrends:
+        """Week-over-week and 3-month-over-3-month request trends."""
+        past_week_change = self.past_week_count - self.previous_week_count
+        past_3_months_change = self.past_3_months_count - self.previous_3_months_count
+        
+        # Determine trend direction
+        if past_week_change > 2 and past_3_months_change > 10:
+            trend_direction = "increasing"
+        elif past_week_change < -2 and past_3_months_change < -10:
+            trend_direction = "decreasing"
+        else:
+            trend_direction = "stable"
+        
+        return RequestTrends(
+            pastWeekChange=float(past_week_change),
+            past3MonthsChange=float(past_3_months_change),
+            trendDirection=trend_direction
+        )
+
+
+class RequestsAggregateBuilder:
+    """Accumulates Requests records page by page and builds a RequestsAggregate.
+
+    Records are packed into a columnar RequestsStore; every statistic is then a
+    vectorized mask or bincount over its arrays.
+    """
+
+    def __init__(self, now: Optional[datetime] = None):
+        self.now = now or datetime.now(timezone.utc)
+        self._store_builder = RequestsStoreBuilder()
+        self._fingerprints = []
+
+    def add_record(self, record: dict) -> None:
+        self._store_builder.add_record(record)
+        self._fingerprints.append(json.dumps([record.get("id", ""), record.get("createdTime"), record.get("fields", {})], sort_keys=True, default=str))
+
+    def build(self) -> RequestsAggregate:
+        store = self._store_builder.build()
+        now = int(self.now.timestamp())
+        month_start = int(datetime(self.now.year, self.now.month, 1, tzinfo=timezone.utc).timestamp())
+        day = 86400
+        
+        aggregate = RequestsAggregate(
+            total_count=len(store),
+            monthly_count=store.count_created_between(month_start),
+            warehouse_counts=store.warehouse_counts(),
+            city_counts=store.city_counts(),
+            # Past week (last 7 days) / previous week (7-14 days ago)
+            past_week_count=store.count_created_between(now - 7 * day, now, include_end=True),
+            previous_week_count=store.count_created_between(now - 14 * day, now - 7 * day),
+            # Past 3 months / previous 3 months (3-6 months ago)
+            past_3_months_count=store.count_created_between(now - 90 * day, now, include_end=True),
+            previous_3_months_count=store.count_created_between(now - 180 * day, now - 90 * day),
+            store=store
+        )
+        
+        # Average requests per day this month, ALWAYS rounded UP so capacity is never underestimated
+        days_elapsed = self.now.day
+        average = aggregate.monthly_count / days_elapsed if days_elapsed > 0 else float(aggregate.monthly_count)
+        aggregate.average_monthly_requests = math.ceil(average)
+        
+        # Snapshot version: order-independent digest of the projected records
+        digest = hashlib.sha1()
+        for fingerprint in sorted(self._fingerprints):
+            digest.update(fingerprint.encode("utf-8"))
+        aggregate.snapshot_version = digest.hexdigest()[:16]
+        aggregate.computed_at = self.now.isoformat()
+        return aggregate
+
+
+async def scan_requests_aggregate() -> RequestsAggregate:
+    """Scan the Requests table once and compute every aggregate statistic."""
+    builder = RequestsAggregateBuilder()
+    async for records in iter_request_pages(AGGREGATE_FIELDS):
+        for record in records:
+            builder.add_record(record)
+    return builder.build()
+
+
+async def get_requests_aggregate(force_refresh: bool = False) -> RequestsAggregate:
+    """Get the cached Requests aggregate, scanning the table only when it is missing or expired."""
+    if not force_refresh:
+        cached = _cache.get(REQUESTS_AGGREGATE_KEY)
+        if cached is not None:
+            return cached
+    
+    async with _aggregate_lock:
+        # Another caller may have refreshed the aggregate while we waited
+        if not force_refresh:
+            cached = _cache.get(REQUESTS_AGGREGATE_KEY)
+            if cached is not None:
+                return cached
+        
+        aggregate = await scan_requests_aggregate()
+        _cache.set(REQUESTS_AGGREGATE_KEY, aggregate, ttl=REQUESTS_AGGREGATE_TTL)
+        print(f"Scanned {aggregate.total_count} requests (snapshot {aggregate.snapshot_version})")
+        return aggregate
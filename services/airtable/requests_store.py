@@ -0,0 +1,163 @@
+"""
+Columnar in-memory store for Requests records.
+Holds each request as parallel NumPy arrays so time-window counts and per-city or
+per-warehouse histograms are vectorized masks and bincounts instead of table scans.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Sentinel for requests without a parseable createdTime
+MISSING_TIME = np.iinfo(np.int64).min
+
+
+def parse_created_times(created_times: List[Optional[str]]) -> np.ndarray:
+    """Parse Airtable ISO createdTime strings into int64 epoch seconds in one vectorized pass.
+
+    Missing or unparseable values get MISSING_TIME; a malformed value only drops the
+    batch to per-value parsing, it never fails the whole store.
+    """
+    seconds = np.full(len(created_times), MISSING_TIME, dtype=np.int64)
+    present = [i for i, value in enumerate(created_times) if isinstance(value, str)]
+    if not present:
+        return seconds
+    
+    try:
+        # createdTime is always UTC ("2024-01-15T10:30:00.000Z"); numpy wants it without the suffix
+        stripped = [created_times[i].rstrip('Z') for i in present]
+        seconds[present] = np.array(stripped, dtype='datetime64[s]').astype(np.int64)
+        return seconds
+    except ValueError:
+        pass
+    
+    for i in present:
+        try:
+            seconds[i] = int(datetime.fromisoformat(created_times[i].replace('Z', '+00:00')).timestamp())
+        except ValueError:
+            continue
+    return seconds
+
+
+class RequestsStore:
+    """Requests as columnar arrays.
+
+    created_at: int64 epoch seconds (MISSING_TIME when unknown)
+    city_idx: int32 index into city_keys ("city,state"), -1 when city or state is missing
+    state_code: int16 index into states, -1 when missing
+    warehouse_idx / warehouse_offsets: CSR layout of the linked warehouses, since a request
+        can reference several warehouses; request i owns warehouse_idx[offsets[i]:offsets[i+1]]
+    """
+
+    def __init__(
+        self,
+        created_at: np.ndarray,
+        city_idx: np.ndarray,
+        state_code: np.ndarray,
+        warehouse_idx: np.ndarray,
+        warehouse_offsets: np.ndarray,
+        city_keys: List[str],
+        states: List[str],
+        warehouse_ids: List[str]
+    ):
+        self.created_at = created_at
+        self.city_idx = city_idx
+        self.state_code = state_code
+        self.warehouse_idx = warehouse_idx
+        self.warehouse_offsets = warehouse_offsets
+        self.city_keys = city_keys
+        self.states = states
+        self.warehouse_ids = warehouse_ids
+
+    def __len__(self) -> int:
+        return len(self.created_at)
+
+    def time_mask(self, start: Optional[int] = None, end: Optional[int] = None, include_end: bool = False) -> np.ndarray:
+        """Boolean mask of requests created in [start, end) (or [start, end] with include_end)."""
+        mask = self.created_at != MISSING_TIME
+        if start is not None:
+            mask &= self.created_at >= start
+        if end is not None:
+            mask &= (self.created_at <= end) if include_end else (self.created_at < end)
+        return mask
+
+    def count_created_between(self, start: Optional[int] = None, end: Optional[int] = None, include_end: bool = False) -> int:
+        return int(np.count_nonzero(self.time_mask(start, end, include_end)))
+
+    def city_histogram(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Request count per city index (aligned with city_keys)."""
+        city_idx = self.city_idx if mask is None else self.city_idx[mask]
+        return np.bincount(city_idx[city_idx >= 0], minlength=len(self.city_keys))
+
+    def state_histogram(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Request count per state code (aligned with states)."""
+        state_code = self.state_code if mask is None else self.state_code[mask]
+        return np.bincount(state_code[state_code >= 0], minlength=len(self.states))
+
+    def warehouse_histogram(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Request count per warehouse index (aligned with warehouse_ids)."""
+        warehouse_idx = self.warehouse_idx
+        if mask is not None:
+            links_per_request = np.diff(self.warehouse_offsets)
+            warehouse_idx = warehouse_idx[np.repeat(mask, links_per_request)]
+        return np.bincount(warehouse_idx, minlength=len(self.warehouse_ids))
+
+    def city_counts(self, mask: Optional[np.ndarray] = None) -> Dict[str, int]:
+        """Non-zero request counts keyed by "city,state"."""
+        histogram = self.city_histogram(mask)
+        return {self.city_keys[i]: int(histogram[i]) for i in np.flatnonzero(histogram)}
+
+    def warehouse_counts(self, mask: Optional[np.ndarray] = None) -> Dict[str, int]:
+        """Non-zero request counts keyed by warehouse record ID."""
+        histogram = self.warehouse_histogram(mask)
+        return {self.warehouse_ids[i]: int(histogram[i]) for i in np.flatnonzero(histogram)}
+
+
+class RequestsStoreBuilder:
+    """Collects Requests records page by page and packs them into a RequestsStore."""
+
+    def __init__(self):
+        self._created_times: List[Optional[str]] = []
+        self._city_idx: List[int] = []
+        self._state_code: List[int] = []
+        self._warehouse_idx: List[int] = []
+        self._warehouse_offsets: List[int] = [0]
+        self._city_index: Dict[str, int] = {}
+        self._state_index: Dict[str, int] = {}
+        self._warehouse_index: Dict[str, int] = {}
+
+    @staticmethod
+    def _intern(index: Dict[str, int], value: str) -> int:
+        position = index.get(value)
+        if position is None:
+            position = len(index)
+            index[value] = position
+        return position
+
+    def add_record(self, record: dict) -> None:
+        fields = record.get("fields", {})
+        
+        city = fields.get("City", "").strip() if fields.get("City") else ""
+        state = fields.get("State", "").strip() if fields.get("State") else ""
+        self._city_idx.append(self._intern(self._city_index, f"{city},{state}") if city and state else -1)
+        self._state_code.append(self._intern(self._state_index, state) if state else -1)
+        
+        for warehouse_id in fields.get("Warehouse", []) or []:
+            self._warehouse_idx.append(self._intern(self._warehouse_index, warehouse_id))
+        self._warehouse_offsets.append(len(self._warehouse_idx))
+        
+        created_time = record.get("createdTime")
+        self._created_times.append(created_time if isinstance(created_time, str) else None)
+
+    def build(self) -> RequestsStore:
+        return RequestsStore(
+            created_at=parse_created_times(self._created_times),
+            city_idx=np.array(self._city_idx, dtype=np.int32),
+            state_code=np.array(self._state_code, dtype=np.int16),
+            warehouse_idx=np.array(self._warehouse_idx, dtype=np.int32),
+            warehouse_offsets=np.array(self._warehouse_offsets, dtype=np.int64),
+            city_keys=list(self._city_index),
+            states=list(self._state_index),
+            warehouse_ids=list(self._warehouse_index)
+        )
@@ -49,4 +49,17 @@ async def fetch_warehouses_from_airtable(force_refresh: bool = False) -> list[an
     
     # Cache the result with Warehouse Master API view key
     _cache.set("warehouses:master_api", records, ttl=ttl)
-    return records
\ No newline at end of file
+    return records
+
+
+async def fetch_warehouse_by_id_from_airtable(record_id: str) -> dict:
+    """One warehouse record ({"id", "fields", "createdTime"}) as currently stored in Airtable, bypassing the cache."""
+    url = f"https://api.airtable.com/v0/{BASE_ID}/{WAREHOUSE_TABLE_NAME}/{record_id}"
+    headers = {
+        "Authorization": f"Bearer {AIRTABLE_TOKEN}"
+    }
+
+    async with httpx.AsyncClient() as client:
+        resp = await client.get(url, headers=headers)
+        resp.raise_for_status()
+        return resp.json()
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""
+Conditional request helpers: strong ETags, If-None-Match handling and Cache-Control
+headers, so polling clients and any CDN or reverse proxy in front of the API can
+revalidate unchanged payloads with a 304 instead of downloading them again.
+"""
+
+import hashlib
+import os
+from typing import Iterable, Optional
+
+from fastapi.responses import Response
+
+# Seconds shared caches may serve a response before revalidating it
+COVERAGE_CACHE_MAX_AGE = int(os.getenv("COVERAGE_CACHE_MAX_AGE", "300"))
+WAREHOUSES_CACHE_MAX_AGE = int(os.getenv("WAREHOUSES_CACHE_MAX_AGE", "60"))
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag (quoted) derived from the given version parts or body bytes."""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etags: Iterable[str]) -> bool:
+    """Whether an If-None-Match header matches any of the current ETags.
+
+    Uses weak comparison, as If-None-Match requires, so "W/" prefixes added by proxies still match.
+    """
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",") if tag.strip()]
+    if "*" in candidates:
+        return True
+    current = set(etags)
+    return any((tag[2:] if tag.startswith("W/") else tag) in current for tag in candidates)
+
+
+def cache_control(max_age: int) -> str:
+    """Cache-Control for shared, revalidatable responses."""
+    return f"public, max-age={max_age}, must-revalidate"
+
+
+def not_modified(etag: str, max_age: int, vary: Optional[str] = None) -> Response:
+    """304 response carrying the validators a cache needs to keep serving its copy."""
+    headers = {"ETag": etag, "Cache-Control": cache_control(max_age)}
+    if vary:
+        headers["Vary"] = vary
+    return Response(status_code=304, headers=headers)
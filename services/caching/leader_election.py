@@ -0,0 +1,155 @@
+"""
+Leader election for scheduled jobs.
+Every worker process starts the scheduler, but only the worker holding the leader lock runs
+the precache jobs; the others load the results it publishes to the shared cache. Locally the
+lock is an exclusive flock on a file, released by the OS if the leader dies; with REDIS_URL
+set it is a Redis key taken with SET NX PX and renewed while the leader is alive.
+"""
+
+import asyncio
+import fcntl
+import functools
+import os
+import socket
+import tempfile
+import uuid
+from typing import Awaitable, Callable, Optional
+
+from services.caching.shared_cache import get_redis_client
+
+LEADER_LOCK_KEY = "jsm-warehousenow:scheduler-leader"
+LEADER_LOCK_PATH = os.getenv("LEADER_LOCK_PATH", os.path.join(tempfile.gettempdir(), "jsm-warehousenow-leader.lock"))
+
+# A Redis leader that stops renewing loses the lock after this long
+LEADER_LEASE_SECONDS = int(os.getenv("LEADER_LEASE_SECONDS", "30"))
+
+# The leader renews its lease, and followers try to take over, this often
+LEADER_CHECK_INTERVAL = LEADER_LEASE_SECONDS / 3
+
+# Only extend or delete the lock while it still holds our token
+RENEW_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+
+class FileLeaderLock:
+    """Exclusive lock on a local file, held until released or the process exits."""
+
+    def __init__(self, path: str = LEADER_LOCK_PATH):
+        self.path = path
+        self._file = None
+
+    async def acquire(self) -> bool:
+        """Take the lock if it is free; True while this process holds it."""
+        if self._file is not None:
+            return True
+        lock_file = open(self.path, "a+")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._file = lock_file
+        return True
+
+    async def release(self) -> None:
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+class RedisLeaderLock:
+    """Lease on a Redis key, shared by every worker on every host."""
+
+    def __init__(self, client, key: str = LEADER_LOCK_KEY, lease_seconds: int = LEADER_LEASE_SECONDS):
+        self.client = client
+        self.key = key
+        self.lease_ms = lease_seconds * 1000
+        self.token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        self._held = False
+
+    async def acquire(self) -> bool:
+        """Take the lock if it is free, or renew it if held; True while this process holds it."""
+        if self._held:
+            self._held = bool(await self.client.eval(RENEW_SCRIPT, 1, self.key, self.token, self.lease_ms))
+        else:
+            self._held = bool(await self.client.set(self.key, self.token, nx=True, px=self.lease_ms))
+        return self._held
+
+    async def release(self) -> None:
+        if self._held:
+            await self.client.eval(RELEASE_SCRIPT, 1, self.key, self.token)
+            self._held = False
+
+
+class LeaderElection:
+    """Keeps trying to hold the leader lock in the background and tracks whether this worker leads."""
+
+    def __init__(self, lock):
+        self.lock = lock
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def check(self) -> bool:
+        try:
+            leader = await self.lock.acquire()
+        except Exception as e:
+            # Without a reachable lock, step down rather than risk two leaders
+            print(f"[LEADER] Error checking leader lock: {str(e)}")
+            leader = False
+        if leader != self.is_leader:
+            print(f"[LEADER] Worker {os.getpid()} {'is now' if leader else 'is no longer'} the scheduler leader")
+        self.is_leader = leader
+        return leader
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(LEADER_CHECK_INTERVAL)
+            await self.check()
+
+    async def start(self) -> bool:
+        """Contend for leadership now and keep doing so in the background. Returns whether this worker leads."""
+        leader = await self.check()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return leader
+
+    async def stop(self) -> None:
+        """Stop contending and hand the lock to another worker."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        try:
+            await self.lock.release()
+        except Exception as e:
+            print(f"[LEADER] Error releasing leader lock: {str(e)}")
+        self.is_leader = False
+
+
+_leader_election: Optional[LeaderElection] = None
+
+
+def get_leader_election() -> LeaderElection:
+    """This process's leader election, on Redis when REDIS_URL is set and a lock file otherwise."""
+    global _leader_election
+    if _leader_election is None:
+        client = get_redis_client()
+        lock = RedisLeaderLock(client) if client is not None else FileLeaderLock()
+        _leader_election = LeaderElection(lock)
+    return _leader_election
+
+
+def leader_only(job: Callable[[], Awaitable]) -> Callable[[], Awaitable]:
+    """Wrap a scheduled job so it only runs on the leader worker."""
+    @functools.wraps(job)
+    async def run_if_leader():
+        if not get_leader_election().is_leader:
+            print(f"[LEADER] Skipping {job.__name__}: another worker is the scheduler leader")
+            return None
+        return await job()
+
+    return run_if_leader
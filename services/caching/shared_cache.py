@@ -0,0 +1,296 @@
+"""
+Cache entries shared between worker processes.
+Each process keeps its own MemoryCache; a worker that computed expensive entries (such as
+the scheduler leader's precache results) publishes them here as one versioned snapshot, and
+the other workers copy the snapshot into their own cache when the version changes. Locally
+snapshots are files in SHARED_CACHE_DIR; with REDIS_URL set they are Redis keys.
+
+Work that only one worker can do (such as patching the precached results with the engine
+they were computed from) is handed over through shared queues of short string items, and
+counts that rank cluster-wide activity (such as analysis usage) are kept in shared counters.
+"""
+
+import asyncio
+import fcntl
+import json
+import os
+import pickle
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from warehouse.warehouse_service import _cache
+
+# Redis for multi-host deployments; without it workers share the local filesystem
+REDIS_URL = os.getenv("REDIS_URL")
+SHARED_CACHE_DIR = os.getenv("SHARED_CACHE_DIR", os.path.join(tempfile.gettempdir(), "jsm-warehousenow-shared"))
+
+# Published snapshots outlive the daily jobs that replace them
+SHARED_SNAPSHOT_TTL = 90000
+
+# Seconds between checks for snapshots published by other workers
+SHARED_CACHE_SYNC_INTERVAL = int(os.getenv("SHARED_CACHE_SYNC_INTERVAL", "60"))
+
+SHARED_KEY_PREFIX = "shared_cache:"
+
+# Scales every counter in one step, dropping those that fall below the minimum.
+# KEYS: counts hash, details hash; ARGV: factor, minimum, TTL (seconds)
+DECAY_COUNTERS_SCRIPT = """
+local counts = redis.call('hgetall', KEYS[1])
+for i = 1, #counts, 2 do
+    local count = tonumber(counts[i + 1]) * tonumber(ARGV[1])
+    if count < tonumber(ARGV[2]) then
+        redis.call('hdel', KEYS[1], counts[i])
+        redis.call('hdel', KEYS[2], counts[i])
+    else
+        redis.call('hset', KEYS[1], counts[i], tostring(count))
+    end
+end
+redis.call('expire', KEYS[1], ARGV[3])
+redis.call('expire', KEYS[2], ARGV[3])
+return #counts / 2
+"""
+
+_redis_client = None
+
+# Snapshot versions already present in this process's cache, by snapshot name
+_loaded_versions: Dict[str, str] = {}
+
+
+def get_redis_client():
+    """Shared async Redis client, or None when REDIS_URL is not set."""
+    global _redis_client
+    if not REDIS_URL:
+        return None
+    if _redis_client is None:
+        # Lazy import: Redis is only needed in clustered deployments
+        import redis.asyncio as redis
+
+        _redis_client = redis.from_url(REDIS_URL)
+    return _redis_client
+
+
+class FileSharedStore:
+    """Snapshots as files in one directory, replaced atomically so readers never see partial writes.
+
+    Files expire SHARED_SNAPSHOT_TTL seconds after they were written.
+    """
+
+    def __init__(self, directory: str = SHARED_CACHE_DIR):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key.replace(":", "_"))
+
+    def _write(self, key: str, value: bytes) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        staging = f"{path}.{os.getpid()}.tmp"
+        with open(staging, "wb") as f:
+            f.write(value)
+        os.replace(staging, path)
+
+    def _read(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            # Files left by a previous deployment expire like Redis keys would
+            if time.time() - os.path.getmtime(path) > SHARED_SNAPSHOT_TTL:
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def _locked(self, key: str):
+        """Exclusive lock on one key, for read-modify-write across processes."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(f"{self._path(key)}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_list(self, key: str) -> List[bytes]:
+        value = self._read(key)
+        return pickle.loads(value) if value is not None else []
+
+    def _append(self, key: str, value: bytes) -> None:
+        with self._locked(key):
+            self._write(key, pickle.dumps(self._read_list(key) + [value]))
+
+    def _pop_all(self, key: str) -> List[bytes]:
+        with self._locked(key):
+            values = self._read_list(key)
+            if values:
+                os.remove(self._path(key))
+            return values
+
+    def _read_counters(self, key: str) -> Dict[str, Tuple[float, bytes]]:
+        value = self._read(key)
+        return pickle.loads(value) if value is not None else {}
+
+    def _increment(self, key: str, field: str, amount: float, details: bytes) -> None:
+        with self._locked(key):
+            counters = self._read_counters(key)
+            count, _ = counters.get(field, (0.0, b""))
+            counters[field] = (count + amount, details)
+            self._write(key, pickle.dumps(counters))
+
+    def _decay(self, key: str, factor: float, minimum: float) -> None:
+        with self._locked(key):
+            counters = {}
+            for field, (count, details) in self._read_counters(key).items():
+                if count * factor >= minimum:
+                    counters[field] = (count * factor, details)
+            self._write(key, pickle.dumps(counters))
+
+    async def put(self, key: str, value: bytes, ttl: int) -> None:
+        await asyncio.to_thread(self._write, key, value)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._read, key)
+
+    async def append(self, key: str, value: bytes, ttl: int) -> None:
+        await asyncio.to_thread(self._append, key, value)
+
+    async def pop_all(self, key: str) -> List[bytes]:
+        return await asyncio.to_thread(self._pop_all, key)
+
+    async def increment(self, key: str, field: str, amount: float, details: bytes, ttl: int) -> None:
+        await asyncio.to_thread(self._increment, key, field, amount, details)
+
+    async def counters(self, key: str) -> Dict[str, Tuple[float, bytes]]:
+        return await asyncio.to_thread(self._read_counters, key)
+
+    async def decay(self, key: str, factor: float, minimum: float, ttl: int) -> None:
+        await asyncio.to_thread(self._decay, key, factor, minimum)
+
+
+class RedisSharedStore:
+    """Snapshots as Redis keys with a TTL."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def put(self, key: str, value: bytes, ttl: int) -> None:
+        await self.client.set(key, value, ex=ttl)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def append(self, key: str, value: bytes, ttl: int) -> None:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.rpush(key, value)
+            pipe.expire(key, ttl)
+            await pipe.execute()
+
+    async def pop_all(self, key: str) -> List[bytes]:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.lrange(key, 0, -1)
+            pipe.delete(key)
+            values, _ = await pipe.execute()
+        return values
+
+    async def increment(self, key: str, field: str, amount: float, details: bytes, ttl: int) -> None:
+        # Counts and details are separate hashes, so concurrent increments add up in Redis
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hincrbyfloat(f"{key}:counts", field, amount)
+            pipe.hset(f"{key}:details", field, details)
+            pipe.expire(f"{key}:counts", ttl)
+            pipe.expire(f"{key}:details", ttl)
+            await pipe.execute()
+
+    async def counters(self, key: str) -> Dict[str, Tuple[float, bytes]]:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hgetall(f"{key}:counts")
+            pipe.hgetall(f"{key}:details")
+            counts, details = await pipe.execute()
+        return {
+            field.decode("utf-8"): (float(count), details[field])
+            for field, count in counts.items() if field in details
+        }
+
+    async def decay(self, key: str, factor: float, minimum: float, ttl: int) -> None:
+        await self.client.eval(DECAY_COUNTERS_SCRIPT, 2, f"{key}:counts", f"{key}:details", factor, minimum, ttl)
+
+
+def get_shared_store():
+    client = get_redis_client()
+    return RedisSharedStore(client) if client is not None else FileSharedStore(SHARED_CACHE_DIR)
+
+
+async def publish_cache_entries(name: str, key_ttls: Dict[str, int]) -> bool:
+    """
+    Publish the current values of several cache keys as one snapshot.
+    Entries are pickled together, so objects referencing each other keep doing so once loaded.
+    Returns False if none of the keys is cached.
+    """
+    entries = {}
+    for key, ttl in key_ttls.items():
+        value = _cache.get(key)
+        if value is not None:
+            entries[key] = (value, ttl)
+    if not entries:
+        return False
+
+    version = uuid.uuid4().hex
+    snapshot = await asyncio.to_thread(pickle.dumps, {"version": version, "entries": entries}, pickle.HIGHEST_PROTOCOL)
+    store = get_shared_store()
+    # The version goes last, so a reader that sees it can also read the matching snapshot
+    await store.put(f"{SHARED_KEY_PREFIX}{name}", snapshot, SHARED_SNAPSHOT_TTL)
+    await store.put(f"{SHARED_KEY_PREFIX}{name}:version", version.encode("utf-8"), SHARED_SNAPSHOT_TTL)
+    _loaded_versions[name] = version
+    print(f"[SHARED_CACHE] Published {len(entries)} entries as {name} ({len(snapshot)} bytes)")
+    return True
+
+
+async def load_cache_entries(name: str) -> bool:
+    """
+    Copy the latest published snapshot into this process's cache, unless it is already loaded.
+    Returns True if entries were loaded.
+    """
+    store = get_shared_store()
+    version = await store.get(f"{SHARED_KEY_PREFIX}{name}:version")
+    if version is None or version.decode("utf-8") == _loaded_versions.get(name):
+        return False
+
+    snapshot = await store.get(f"{SHARED_KEY_PREFIX}{name}")
+    if snapshot is None:
+        return False
+    data = await asyncio.to_thread(pickle.loads, snapshot)
+    for key, (value, ttl) in data["entries"].items():
+        _cache.set(key, value, ttl=ttl)
+    _loaded_versions[name] = data["version"]
+    print(f"[SHARED_CACHE] Loaded {len(data['entries'])} entries from {name}")
+    return True
+
+
+async def queue_shared_item(name: str, item: str) -> None:
+    """Append an item to a shared queue, for whichever worker drains it."""
+    await get_shared_store().append(f"{SHARED_KEY_PREFIX}{name}:queue", item.encode("utf-8"), SHARED_SNAPSHOT_TTL)
+
+
+async def pop_shared_items(name: str) -> List[str]:
+    """Take every item queued so far, in queue order; each item is returned to one caller only."""
+    values = await get_shared_store().pop_all(f"{SHARED_KEY_PREFIX}{name}:queue")
+    return [value.decode("utf-8") for value in values]
+
+
+async def increment_shared_counter(name: str, field: str, details: Dict[str, Any], ttl: int, amount: float = 1) -> None:
+    """Add to one counter of a shared set, replacing the JSON details kept alongside it."""
+    await get_shared_store().increment(f"{SHARED_KEY_PREFIX}{name}", field, amount, json.dumps(details).encode("utf-8"), ttl)
+
+
+async def get_shared_counters(name: str) -> Dict[str, Tuple[float, Dict[str, Any]]]:
+    """Every counter of a shared set, as {field: (count, details)}."""
+    counters = await get_shared_store().counters(f"{SHARED_KEY_PREFIX}{name}")
+    return {field: (count, json.loads(details)) for field, (count, details) in counters.items()}
+
+
+async def decay_shared_counters(name: str, factor: float, minimum: float, ttl: int) -> None:
+    """Scale every counter of a shared set by factor, dropping those that fall below minimum."""
+    await get_shared_store().decay(f"{SHARED_KEY_PREFIX}{name}", factor, minimum, ttl)
@@ -6,39 +6,13 @@ identifying areas where warehouse coverage is insufficient relative to demand.
 """
 
 import os
-import httpx
 import google.generativeai as genai
-from typing import List, Dict
-from datetime import datetime, timezone, timedelta
+from typing import List, Dict, Optional
 from warehouse.models import StaticWarehouseData, AIAnalysisData, CoverageGap, HighRequestArea, RequestTrends, Recommendation
 from services.geolocation.geolocation_service import haversine
-
-# Constants for API access
-AIRTABLE_TOKEN = os.getenv("AIRTABLE_TOKEN")
-BASE_ID = os.getenv("BASE_ID")
-REQUEST_TABLE_NAME = "Requests"
-
-
-def load_us_cities() -> Dict[str, Dict]:
-    """Load all US cities from us_cities.json and return as dict keyed by city,state"""
-    import json
-    
-    try:
-        with open('data/us_cities.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        cities_dict = {}
-        for city_data in data.get('cities', []):
-            city_key = f"{city_data['city']},{city_data['state']}"
-            cities_dict[city_key] = city_data
-        
-        return cities_dict
-    except FileNotFoundError:
-        print("Warning: us_cities.json not found. Run generate_us_cities.py first.")
-        return {}
-    except Exception as e:
-        print(f"Error loading US cities: {e}")
-        return {}
+from services.airtable.requests_aggregate import get_requests_aggregate
+from coverage_gap.spatial_index import WeightedGridIndex, build_demand_index, find_cities_near
+from coverage_gap.us_cities_store import load_us_cities
 
 
 def calculate_aggregated_request_count(
@@ -46,7 +20,8 @@ def calculate_aggregated_request_count(
     city_lng: float,
     radius_miles: float,
     us_cities: Dict[str, Dict],
-    city_request_counts: Dict[str, int]
+    city_request_counts: Dict[str, int],
+    demand_index: Optional[WeightedGridIndex] = None
 ) -> int:
     """Calculate total request count for a city by aggregating requests from all cities within radius.
     
@@ -56,6 +31,8 @@ def calculate_aggregated_request_count(
         radius_miles: Radius in miles to search for nearby cities
         us_cities: Dictionary of all US cities keyed by "city,state"
         city_request_counts: Dictionary of request counts per city keyed by "city,state"
+        demand_index: Optional index from build_demand_index() over the same inputs; callers
+            aggregating many cities build it once and each call becomes a single radius query
     
     Returns:
         Total request count including all cities within the radius
@@ -64,6 +41,9 @@ def calculate_aggregated_request_count(
         # If no radius or invalid coordinates, return just this city's count
         return 0
     
+    if demand_index is not None:
+        return demand_index.radius_sum(city_lat, city_lng, radius_miles)
+    
     total_requests = 0
     
     # OPTIMIZATION: Only check cities that have requests (much smaller set!)
@@ -128,39 +108,9 @@ def get_relevant_cities_for_aggregation(
     
     # Step 3: Expand - find all cities within radius of relevant cities
     if radius_miles and radius_miles > 0:
-        expanded_relevant = set(relevant_cities)  # Start with existing relevant cities
-        processed = 0
-        
-        # For each relevant city, find all cities within radius
-        for city_key in relevant_cities:
-            city_info = us_cities.get(city_key)
-            if not city_info:
-                continue
-            
-            city_lat = city_info.get('latitude', 0.0)
-            city_lng = city_info.get('longitude', 0.0)
-            
-            if not city_lat or not city_lng:
-                continue
-            
-            processed += 1
-            if processed % 100 == 0:
-                print(f"  Expanding relevant cities: processed {processed}/{len(relevant_cities)} seed cities...")
-            
-            # Find all cities within radius
-            for other_city_key, other_city_info in us_cities.items():
-                if other_city_key in expanded_relevant:
-                    continue  # Already added
-                
-                other_lat = other_city_info.get('latitude', 0.0)
-                other_lng = other_city_info.get('longitude', 0.0)
-                
-                if not other_lat or not other_lng:
-                    continue
-                
-                distance = haversine(city_lat, city_lng, other_lat, other_lng)
-                if distance <= radius_miles:
-                    expanded_relevant.add(other_city_key)
+        # Start with existing relevant cities and add every city within radius of one of them
+        expanded_relevant = set(relevant_cities)
+        expanded_relevant |= find_cities_near(us_cities, relevant_cities, radius_miles)
         
         print(f"  Expanded from {len(relevant_cities)} to {len(expanded_relevant)} relevant cities")
         return expanded_relevant
@@ -175,37 +125,9 @@ async def get_request_counts_by_city() -> Dict[str, int]:
         Dict keyed by "city,state" with request count as value
     """
     try:
-        url = f"https://api.airtable.com/v0/{BASE_ID}/{REQUEST_TABLE_NAME}"
-        headers = {"Authorization": f"Bearer {AIRTABLE_TOKEN}"}
-        params = {}
-        
-        city_request_counts = {}
-        
-        async with httpx.AsyncClient() as client:
-            offset = None
-            while True:
-                if offset:
-                    params["offset"] = offset
-                resp = await client.get(url, headers=headers, params=params)
-                resp.raise_for_status()
-                data = resp.json()
-                
-                records = data.get("records", [])
-                for record in records:
-                    fields = record.get("fields", {})
-                    city = fields.get("City", "").strip() if fields.get("City") else ""
-                    state = fields.get("State", "").strip() if fields.get("State") else ""
-                    
-                    if city and state:
-                        city_key = f"{city},{state}"
-                        city_request_counts[city_key] = city_request_counts.get(city_key, 0) + 1
-                
-                offset = data.get("offset")
-                if not offset:
-                    break
-        
-        print(f"Loaded request counts for {len(city_request_counts)} cities from Requests table")
-        return city_request_counts
+        aggregate = await get_requests_aggregate()
+        print(f"Loaded request counts for {len(aggregate.city_counts)} cities from Requests table")
+        return aggregate.city_counts
         
     except Exception as e:
         print(f"Error getting request counts by city: {e}")
@@ -216,78 +138,8 @@ async def get_request_trends(total_requests: int) -> RequestTrends:
     """Calculate actual request trends based on historical data."""
     
     try:
-        # Define time periods
-        now = datetime.now(timezone.utc)
-        seven_days_ago = now - timedelta(days=7)
-        fourteen_days_ago = now - timedelta(days=14)
-        three_months_ago = now - timedelta(days=90)
-        six_months_ago = now - timedelta(days=180)
-        
-        # Fetch all requests
-        url = f"https://api.airtable.com/v0/{BASE_ID}/{REQUEST_TABLE_NAME}"
-        headers = {"Authorization": f"Bearer {AIRTABLE_TOKEN}"}
-        params = {}
-        
-        # Count requests in different time periods
-        past_week_count = 0
-        previous_week_count = 0
-        past_3_months_count = 0
-        previous_3_months_count = 0
-        
-        async with httpx.AsyncClient() as client:
-            offset = None
-            while True:
-                if offset:
-                    params["offset"] = offset
-                resp = await client.get(url, headers=headers, params=params)
-                resp.raise_for_status()
-                data = resp.json()
-                
-                records = data.get("records", [])
-                for record in records:
-                    created_time_str = record.get("createdTime")
-                    if created_time_str:
-                        try:
-                            created_time = datetime.fromisoformat(created_time_str.replace('Z', '+00:00'))
-                            
-                            # Past week (last 7 days)
-                            if seven_days_ago <= created_time <= now:
-                                past_week_count += 1
-                            # Previous week (7-14 days ago)
-                            elif fourteen_days_ago <= created_time < seven_days_ago:
-                                previous_week_count += 1
-                            
-                            # Past 3 months
-                            if three_months_ago <= created_time <= now:
-                                past_3_months_count += 1
-                            # Previous 3 months (3-6 months ago)
-                            elif six_months_ago <= created_time < three_months_ago:
-                                previous_3_months_count += 1
-                                
-                        except (ValueError, AttributeError):
-                            continue
-                
-                offset = data.get("offset")
-                if not offset:
-                    break
-        
-        # Calculate changes
-        past_week_change = past_week_count - previous_week_count
-        past_3_months_change = past_3_months_count - previous_3_months_count
-        
-        # Determine trend direction
-        if past_week_change > 2 and past_3_months_change > 10:
-            trend_direction = "increasing"
-        elif past_week_change < -2 and past_3_months_change < -10:
-            trend_direction = "decreasing"
-        else:
-            trend_direction = "stable"
-        
-        return RequestTrends(
-            pastWeekChange=float(past_week_change),
-            past3MonthsChange=float(past_3_months_change),
-            trendDirection=trend_direction
-        )
+        aggregate = await get_requests_aggregate()
+        return aggregate.request_trends()
         
     except Exception as e:
         print(f"Error calculating request trends: {e}")
@@ -341,6 +193,7 @@ async def analyze_coverage_gaps_with_ai(city_warehouses_dict: Dict[str, Dict], t
         )
         
         print(f"Pre-calculating aggregated request counts for {len(relevant_cities)} relevant cities...")
+        demand_index = build_demand_index(us_cities, city_request_counts, radius_miles)
         processed_agg = 0
         total_cities_agg = len(relevant_cities)
         for city_key in relevant_cities:
@@ -357,7 +210,8 @@ async def analyze_coverage_gaps_with_ai(city_warehouses_dict: Dict[str, Dict], t
                     city_lng,
                     radius_miles,
                     us_cities,
-                    city_request_counts
+                    city_request_counts,
+                    demand_index
                 )
             else:
                 aggregated_request_counts[city_key] = city_request_counts.get(city_key, 0)
@@ -1,9 +1,14 @@
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import AsyncMock, patch
+from contextlib import ExitStack
 import os
+import random
 
 from main import app
+from coverage_gap.coverage_engine import MAX_ENGINE_RADIUS, CoverageEngine, CoverageInputs
+from coverage_gap.coverage_gap_service import transform_warehouse_to_static_data
+from services.airtable.requests_aggregate import RequestsAggregate
 
 @pytest.fixture
 def client():
@@ -66,3 +71,93 @@ def sample_email_data():
             }
         ]
     }
+
+def build_coverage_sample(seed=1):
+    """Random cities, warehouse records and request counts covering the grouping edge cases"""
+    rng = random.Random(seed)
+    us_cities = {}
+    for i in range(250):
+        lat, lng = (0.0, 0.0) if i % 50 == 0 else (rng.uniform(29, 37), rng.uniform(-104, -92))
+        us_cities[f"City{i},TX"] = {"city": f"City{i}", "state": "TX", "latitude": lat, "longitude": lng, "zipcodes": [str(75000 + i)]}
+
+    warehouse_records = []
+    for i in range(80):
+        city = rng.choice(list(us_cities.values()))
+        fields = {
+            "Warehouse Name": f"WH{i}",
+            "City": city["city"] if i % 20 else f"Elsewhere{i}",
+            "State": "TX",
+            "Tier": rng.choice(["Gold", "Potential Gold", "Silver", "Bronze", "", "Platinum"]),
+            "Hazmat": rng.choice(["Yes", "No"])
+        }
+        if i % 13:
+            fields["Latitude"] = rng.uniform(29, 37)
+            fields["Longitude"] = rng.uniform(-104, -92)
+        warehouse_records.append({"id": f"recW{i}", "fields": fields})
+
+    city_request_counts = {key: rng.randint(0, 6) for key in list(us_cities)[::3]}
+    warehouse_request_counts = {record["id"]: rng.randint(0, 9) for record in warehouse_records}
+    return us_cities, warehouse_records, city_request_counts, warehouse_request_counts
+
+def build_coverage_inputs(us_cities, warehouse_records, city_request_counts, warehouse_request_counts):
+    """Coverage engine inputs for a coverage sample"""
+    return CoverageInputs(
+        warehouses=[transform_warehouse_to_static_data(record, warehouse_request_counts[record["id"]]) for record in warehouse_records],
+        us_cities=us_cities,
+        city_request_counts=city_request_counts,
+        total_requests=321,
+        average_monthly_requests=7
+    )
+
+@pytest.fixture
+def coverage_sample():
+    """Factory for seeded coverage samples: (us_cities, warehouse_records, city_request_counts, warehouse_request_counts)"""
+    return build_coverage_sample
+
+@pytest.fixture
+def coverage_inputs():
+    """Factory for coverage engine inputs from the parts of a coverage sample"""
+    return build_coverage_inputs
+
+@pytest.fixture
+def coverage_engine():
+    """Factory for a coverage engine over a seeded sample, built at the shared engine's radius"""
+    def build(seed=1):
+        return CoverageEngine(build_coverage_inputs(*build_coverage_sample(seed)), MAX_ENGINE_RADIUS)
+    return build
+
+@pytest.fixture
+def sample_result(coverage_engine):
+    """Factory for an unfiltered coverage analysis of a seeded sample"""
+    def analyze(radius=50.0, seed=7):
+        return coverage_engine(seed).analyze(radius)
+    return analyze
+
+@pytest.fixture
+def patch_coverage_inputs():
+    """
+    Patch the coverage engine's data sources with a coverage sample until the test ends.
+    Returns the source mocks by name.
+    """
+    service = "coverage_gap.coverage_gap_service"
+    with ExitStack() as stack:
+        def patch_sample(us_cities, warehouse_records, city_request_counts, warehouse_request_counts):
+            sources = {
+                "fetch_warehouses_from_airtable": AsyncMock(return_value=warehouse_records),
+                "get_total_requests_count": AsyncMock(return_value=321),
+                "get_warehouse_request_counts": AsyncMock(return_value=warehouse_request_counts),
+                "get_average_monthly_requests": AsyncMock(return_value=7)
+            }
+            for name, mock in sources.items():
+                stack.enter_context(patch(f"{service}.{name}", mock))
+            sources["get_request_counts_by_city"] = stack.enter_context(patch(
+                "coverage_gap.coverage_engine.get_request_counts_by_city",
+                AsyncMock(return_value=city_request_counts)
+            ))
+            sources["get_requests_aggregate"] = stack.enter_context(patch(
+                "coverage_gap.coverage_engine.get_requests_aggregate",
+                AsyncMock(return_value=RequestsAggregate(snapshot_version="sample-snapshot"))
+            ))
+            stack.enter_context(patch(f"{service}.load_us_cities", return_value=us_cities))
+            return sources
+        yield patch_sample
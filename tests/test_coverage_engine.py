@@ -0,0 +1,218 @@
+import asyncio
+import dataclasses
+import pytest
+from unittest.mock import patch
+
+from coverage_gap.coverage_engine import COVERAGE_ENGINE_KEY, MAX_ENGINE_RADIUS, CoverageInputs, CoverageEngine, scope_inputs
+from coverage_gap.coverage_gap_precache import PRECACHED_RADII, get_precache_key, precache_all_radii, precache_radii_from_engine
+from coverage_gap.coverage_gap_service import apply_warehouse_filters, get_coverage_gap_analysis
+from coverage_gap.coverage_view import CoverageView, select_view
+from coverage_gap.coverage_workers import build_and_analyze_task
+from warehouse.models import CoverageGapFilters
+from services.geolocation.geolocation_service import haversine
+from warehouse.warehouse_service import _cache
+
+
+def full_scan(city_key, city_info, inputs, radius, warehouses=None):
+    """Warehouse IDs covering a city and its aggregated request count, by checking every pair"""
+    warehouses = inputs.warehouses if warehouses is None else warehouses
+    valid = [wh for wh in warehouses if wh.lat != 0 and wh.lng != 0]
+    own = [wh for wh in warehouses if f"{wh.city.strip()},{wh.state.strip()}" == city_key]
+    center = (city_info["latitude"], city_info["longitude"])
+    if own and not center[0]:
+        own_valid = [wh for wh in own if wh.lat != 0 and wh.lng != 0]
+        center = (sum(wh.lat for wh in own_valid) / len(own_valid), sum(wh.lng for wh in own_valid) / len(own_valid)) if own_valid else (0, 0)
+    
+    warehouse_ids = [wh.id for wh in own]
+    if center[0]:
+        warehouse_ids += [wh.id for wh in valid if wh.id not in warehouse_ids and haversine(*center, wh.lat, wh.lng) <= radius]
+    
+    if not city_info["latitude"]:
+        return warehouse_ids, inputs.city_request_counts.get(city_key, 0)
+    request_count = sum(
+        count for key, count in inputs.city_request_counts.items()
+        if inputs.us_cities[key]["latitude"] and haversine(city_info["latitude"], city_info["longitude"], inputs.us_cities[key]["latitude"], inputs.us_cities[key]["longitude"]) <= radius
+    )
+    return warehouse_ids, request_count
+
+
+class TestCoverageEngine:
+    """Test cases for the multi-radius coverage engine"""
+
+    def test_thresholded_radii_match_full_scan(self, coverage_sample, coverage_inputs):
+        """Test every radius emitted from one engine matches a per-pair scan of cities and warehouses"""
+        us_cities, warehouse_records, city_request_counts, warehouse_request_counts = coverage_sample()
+        inputs = coverage_inputs(us_cities, warehouse_records, city_request_counts, warehouse_request_counts)
+        engine = CoverageEngine(inputs, max(PRECACHED_RADII))
+        
+        for radius in PRECACHED_RADII:
+            result = engine.analyze(radius)
+            assert len(result.coverageAnalysis) == len(us_cities)
+            for (city_key, city_info), analysis in zip(us_cities.items(), result.coverageAnalysis):
+                warehouse_ids, request_count = full_scan(city_key, city_info, inputs, radius)
+                assert analysis.warehouseCount == len(warehouse_ids)
+                assert [wh.id for wh in analysis.nearbyWarehouses] == warehouse_ids[:3]
+                assert analysis.reqCount == request_count
+
+    def test_city_statistics_match_per_city_scan(self, coverage_sample, coverage_inputs):
+        """Test bulk tier counts, intra-group distances, expansion and gap flags match a per-city computation"""
+        inputs = coverage_inputs(*coverage_sample(seed=3))
+        engine = CoverageEngine(inputs, MAX_ENGINE_RADIUS)
+        warehouses_by_id = {wh.id: wh for wh in inputs.warehouses}
+        
+        for radius in (None, 25.0, 100.0):
+            result = engine.analyze(radius)
+            for (city_key, city_info), analysis in zip(inputs.us_cities.items(), result.coverageAnalysis):
+                if radius:
+                    warehouse_ids, request_count = full_scan(city_key, city_info, inputs, radius)
+                else:
+                    warehouse_ids = [wh.id for wh in engine.city_groups.get(city_key, [])]
+                    request_count = inputs.city_request_counts.get(city_key, 0)
+                group = [warehouses_by_id[warehouse_id] for warehouse_id in warehouse_ids]
+                
+                tiers = [wh.tier for wh in group]
+                assert analysis.goldWarehouseCount == sum(tier in ("Gold", "Potential Gold") for tier in tiers)
+                assert analysis.silverWarehouseCount == tiers.count("Silver")
+                assert analysis.bronzeWarehouseCount == tiers.count("Bronze")
+                assert analysis.unTieredWarehouseCount == sum(tier not in ("Gold", "Potential Gold", "Silver", "Bronze") for tier in tiers)
+                
+                for wh, nearby in zip(group[:3], analysis.nearbyWarehouses):
+                    distances = [
+                        haversine(wh.lat, wh.lng, other.lat, other.lng)
+                        for other in group
+                        if other.id != wh.id and wh.lat and wh.lng and other.lat and other.lng
+                    ]
+                    assert nearby.distance == pytest.approx(sum(distances) / len(distances) if distances else 0.0)
+                
+                average_requests = request_count / len(group) if group else 0
+                assert analysis.hasCoverageGap == (len(group) < 2 or average_requests > 20)
+                if average_requests > 25 or (len(group) == 1 and request_count > 10):
+                    assert analysis.expansionOpportunity == "High"
+                elif (len(group) == 1 and request_count > 3) or (len(group) < 3 and request_count > 15) or average_requests > 15:
+                    assert analysis.expansionOpportunity == "Moderate"
+                else:
+                    assert analysis.expansionOpportunity == "None"
+
+    def test_filtered_analysis_masks_unfiltered_table(self, coverage_sample, coverage_inputs):
+        """Test filtered results from the unfiltered table match a full scan of the matching warehouses"""
+        inputs = coverage_inputs(*coverage_sample(seed=4))
+        engine = CoverageEngine(inputs, MAX_ENGINE_RADIUS)
+        filters = CoverageGapFilters(tier=["Gold"], hazmat=["Yes"])
+        matching = apply_warehouse_filters(inputs.warehouses, filters)
+        
+        result = engine.analyze(100.0, filters)
+        
+        assert result.totalWarehouses == len(matching)
+        expected = {}
+        for city_key, city_info in inputs.us_cities.items():
+            warehouse_ids, request_count = full_scan(city_key, city_info, inputs, 100.0, matching)
+            if warehouse_ids:
+                expected[city_key] = (warehouse_ids[:3], len(warehouse_ids), request_count)
+        assert {
+            f"{city.city},{city.state}": ([wh.id for wh in city.nearbyWarehouses], city.warehouseCount, city.reqCount)
+            for city in result.coverageAnalysis
+        } == expected
+
+    def test_warehouse_change_matches_rebuild(self, coverage_sample, coverage_inputs):
+        """Test patching one warehouse into an engine matches rebuilding it, and only nearby cities change"""
+        inputs = coverage_inputs(*coverage_sample(seed=7))
+        engine = CoverageEngine(inputs, MAX_ENGINE_RADIUS)
+        moved = inputs.warehouses[5].model_copy(update={"lat": 33.1, "lng": -97.2, "tier": "Gold"})
+        added = inputs.warehouses[0].model_copy(update={"id": "recNew", "lat": 35.0, "lng": -95.0, "city": "City9"})
+        
+        for previous, warehouse in ((inputs.warehouses[5], moved), (None, added)):
+            updated = engine.with_warehouse(warehouse)
+            warehouses = [warehouse if wh.id == warehouse.id else wh for wh in inputs.warehouses]
+            if previous is None:
+                warehouses.append(warehouse)
+            rebuilt = CoverageEngine(dataclasses.replace(inputs, warehouses=warehouses), MAX_ENGINE_RADIUS)
+            
+            assert updated.version != engine.version
+            assert updated.offsets.tolist() == rebuilt.offsets.tolist()
+            assert updated.warehouse_idx.tolist() == rebuilt.warehouse_idx.tolist()
+            for radius in (25.0, 250.0):
+                patched = list(engine.analyze(radius).coverageAnalysis)
+                cities = updated.cities_affected_by([previous, warehouse], radius)
+                for number, analysis in zip(cities.tolist(), updated.analyze_cities(radius, cities)):
+                    patched[number] = analysis
+                assert len(cities) < len(patched)
+                assert [city.model_dump() for city in patched] == [city.model_dump() for city in rebuilt.analyze(radius).coverageAnalysis]
+
+    def test_scoped_analysis_matches_view_of_full_analysis(self, coverage_sample, coverage_inputs):
+        """Test analyzing only a bbox or state returns what viewing the whole-country analysis does"""
+        inputs = coverage_inputs(*coverage_sample(seed=8))
+        engine = CoverageEngine(inputs, MAX_ENGINE_RADIUS)
+        
+        for view in (CoverageView(bbox=(-100.0, 31.0, -95.0, 35.0)), CoverageView(bbox=(-104.0, 29.0, -98.0, 33.0), state="tx", limit=10)):
+            scope = view.scope()
+            for radius, filters in ((50.0, None), (250.0, CoverageGapFilters(tier=["Gold", "Silver"])), (None, None)):
+                full = select_view(engine.analyze(radius, filters), view, f"full:{radius}:{filters}:{view}")
+                scoped_result = engine.analyze(radius, filters, scope)
+                scoped = select_view(scoped_result, view, f"scoped:{radius}:{filters}:{view}")
+                assert len(scoped_result.coverageAnalysis) < len(inputs.us_cities)
+                assert scoped.model_dump() == full.model_dump()
+            
+            # Radii beyond the table build a one-off table over the scope's cities and reachable warehouses
+            scoped_inputs = scope_inputs(inputs, 600.0, scope)
+            assert len(scoped_inputs.us_cities) < len(inputs.us_cities)
+            full = select_view(CoverageEngine(inputs, 600.0).analyze(600.0), view, f"full:600:{view}")
+            scoped = select_view(build_and_analyze_task(inputs, 600.0, None, scope), view, f"scoped:600:{view}")
+            assert scoped.model_dump() == full.model_dump()
+
+    def test_radius_above_maximum_is_rejected(self):
+        """Test the engine refuses radii its distance table does not cover"""
+        engine = CoverageEngine(CoverageInputs([], {}, {}, 0, 0), 100.0)
+        
+        with pytest.raises(ValueError):
+            engine.analyze(250.0)
+
+    @pytest.mark.asyncio
+    async def test_precache_all_radii_loads_inputs_once(self, coverage_sample, patch_coverage_inputs):
+        """Test pre-caching every radius fetches inputs once and caches each radius"""
+        sources = patch_coverage_inputs(*coverage_sample(seed=2))
+        
+        results = await precache_all_radii()
+        
+        assert results == {radius: "success" for radius in PRECACHED_RADII}
+        assert sources["fetch_warehouses_from_airtable"].await_count == 1
+        for radius in PRECACHED_RADII:
+            assert _cache.get(get_precache_key(radius)).analysisRadius == int(radius)
+
+    @pytest.mark.asyncio
+    async def test_precache_radii_run_concurrently(self, coverage_engine):
+        """Test radii are analyzed in parallel and each is cached as soon as it finishes"""
+        engine = coverage_engine(seed=5)
+        in_flight = []
+        peak = []
+        
+        async def slow_analyze(engine, radius, filters=None):
+            in_flight.append(radius)
+            peak.append(len(in_flight))
+            # Smaller radii take longer, so completion order differs from request order
+            await asyncio.sleep(0.01 * (len(PRECACHED_RADII) - PRECACHED_RADII.index(radius)))
+            in_flight.remove(radius)
+            return engine.analyze(radius)
+        
+        finished = []
+        with patch("coverage_gap.coverage_workers.analyze_in_worker", slow_analyze):
+            async for radius, success in precache_radii_from_engine(engine, PRECACHED_RADII):
+                assert success
+                assert _cache.get(get_precache_key(radius)).analysisRadius == int(radius)
+                finished.append(radius)
+        
+        assert max(peak) == len(PRECACHED_RADII)
+        assert finished == list(reversed(PRECACHED_RADII))
+
+    @pytest.mark.asyncio
+    async def test_any_radius_served_from_cached_table(self, coverage_engine, coverage_sample, patch_coverage_inputs):
+        """Test non-precached radii reuse the cached engine instead of re-fetching data"""
+        _cache.set(COVERAGE_ENGINE_KEY, coverage_engine(seed=3), ttl=60)
+        sources = patch_coverage_inputs(*coverage_sample(seed=3))
+        
+        result = await get_coverage_gap_analysis(radius_miles=75.0)
+        beyond_table = await get_coverage_gap_analysis(radius_miles=600.0)
+        
+        assert sources["fetch_warehouses_from_airtable"].await_count == 0
+        assert result.analysisRadius == 75
+        assert beyond_table.analysisRadius == 600
+        assert sum(city.warehouseCount for city in beyond_table.coverageAnalysis) >= sum(city.warehouseCount for city in result.coverageAnalysis)
@@ -0,0 +1,91 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from coverage_gap.coverage_engine import COVERAGE_ENGINE_KEY, MAX_ENGINE_RADIUS, CoverageEngine
+from coverage_gap.coverage_gap_precache import PRECACHE_ENGINE_KEY, PRECACHED_RADII, get_precache_engine_key, get_precache_key
+from coverage_gap.coverage_gap_updates import apply_queued_warehouse_changes, apply_warehouse_change
+from coverage_gap.coverage_payloads import get_precached_payload_key
+from services.caching import shared_cache
+from warehouse.warehouse_service import _cache
+
+
+def precache_from(engine):
+    """Cache every precached radius as computed from the given engine."""
+    _cache.set(PRECACHE_ENGINE_KEY, engine, ttl=60)
+    for radius in PRECACHED_RADII:
+        _cache.set(get_precache_key(radius), engine.analyze(radius), ttl=60)
+        _cache.set(get_precache_engine_key(radius), engine.version, ttl=60)
+
+
+class TestCoverageGapUpdates:
+    """Test cases for applying warehouse changes to precached coverage results"""
+
+    @pytest.mark.asyncio
+    async def test_change_patches_engine_and_precached_radii(self, coverage_sample, coverage_inputs):
+        """Test a re-tiered, moved warehouse updates the engine and precached results as a full recompute would"""
+        us_cities, warehouse_records, city_request_counts, warehouse_request_counts = coverage_sample(seed=8)
+        engine = CoverageEngine(coverage_inputs(us_cities, warehouse_records, city_request_counts, warehouse_request_counts), MAX_ENGINE_RADIUS)
+        precache_from(engine)
+        _cache.set(COVERAGE_ENGINE_KEY, engine, ttl=60)
+        
+        record = {"id": warehouse_records[3]["id"], "fields": {**warehouse_records[3]["fields"], "Tier": "Gold", "Latitude": 32.5, "Longitude": -96.5}}
+        changed_records = [record if r["id"] == record["id"] else r for r in warehouse_records]
+        expected = CoverageEngine(coverage_inputs(us_cities, changed_records, city_request_counts, warehouse_request_counts), MAX_ENGINE_RADIUS)
+        
+        with patch("coverage_gap.coverage_gap_updates.fetch_warehouse_by_id_from_airtable", AsyncMock(return_value=record)) as fetch, \
+                patch("coverage_gap.coverage_gap_updates.publish_precached_results", AsyncMock()) as publish:
+            summary = await apply_warehouse_change(record["id"])
+        
+        fetch.assert_awaited_once_with(record["id"])
+        assert summary["updated"] and not summary["added"]
+        assert set(summary["citiesUpdated"]) == set(PRECACHED_RADII)
+        updated = _cache.get(PRECACHE_ENGINE_KEY)
+        assert updated.version != engine.version
+        assert _cache.get(COVERAGE_ENGINE_KEY) is None
+        publish.assert_awaited_once()
+        for radius in PRECACHED_RADII:
+            result = _cache.get(get_precache_key(radius))
+            assert result.model_dump(exclude={"lastPrecacheTimestamp"}) == expected.analyze(radius).model_dump(exclude={"lastPrecacheTimestamp"})
+            assert _cache.get(get_precache_engine_key(radius)) == updated.version
+            assert _cache.get(get_precached_payload_key(radius)).source is result
+
+    @pytest.mark.asyncio
+    async def test_change_on_other_worker_is_queued_for_engine_holder(self, tmp_path, coverage_sample, coverage_inputs, coverage_engine):
+        """Test a worker whose engine did not compute the precached results queues the change instead of patching them"""
+        us_cities, warehouse_records, city_request_counts, warehouse_request_counts = coverage_sample(seed=8)
+        engine = CoverageEngine(coverage_inputs(us_cities, warehouse_records, city_request_counts, warehouse_request_counts), MAX_ENGINE_RADIUS)
+        precache_from(engine)
+        published = {radius: _cache.get(get_precache_key(radius)) for radius in PRECACHED_RADII}
+        record = {"id": warehouse_records[3]["id"], "fields": {**warehouse_records[3]["fields"], "Tier": "Gold"}}
+        
+        with patch.object(shared_cache, "SHARED_CACHE_DIR", str(tmp_path)), \
+                patch("coverage_gap.coverage_gap_updates.fetch_warehouse_by_id_from_airtable", AsyncMock(return_value=record)) as fetch, \
+                patch("coverage_gap.coverage_gap_updates.publish_precached_results", AsyncMock()):
+            # A follower holding an older engine, then one holding none
+            _cache.set(PRECACHE_ENGINE_KEY, coverage_engine(seed=8), ttl=60)
+            assert (await apply_warehouse_change(record["id"]))["queued"]
+            _cache.delete(PRECACHE_ENGINE_KEY)
+            assert (await apply_warehouse_change(record["id"]))["queued"]
+            assert await apply_queued_warehouse_changes() == []
+            
+            fetch.assert_not_awaited()
+            assert all(_cache.get(get_precache_key(radius)) is published[radius] for radius in PRECACHED_RADII)
+            
+            # The worker that ran the precache applies the queued change once
+            _cache.set(PRECACHE_ENGINE_KEY, engine, ttl=60)
+            summaries = await apply_queued_warehouse_changes()
+            assert [summary["updated"] for summary in summaries] == [True]
+            assert await apply_queued_warehouse_changes() == []
+        
+        fetch.assert_awaited_once_with(record["id"])
+        assert all(_cache.get(get_precache_engine_key(radius)) == _cache.get(PRECACHE_ENGINE_KEY).version for radius in PRECACHED_RADII)
+
+    def test_webhook_without_record_drops_engine(self, client, coverage_engine):
+        """Test a webhook that cannot be patched in invalidates the engine instead of leaving it stale"""
+        _cache.set(COVERAGE_ENGINE_KEY, coverage_engine(seed=8), ttl=60)
+        
+        response = client.post("/webhook", json={"Warehouse Name": "WH1", "Latitude": 32.5, "Longitude": -96.5})
+        
+        assert response.status_code == 200
+        assert response.json()["data"]["coverage_update_scheduled"] is False
+        assert _cache.get(COVERAGE_ENGINE_KEY) is None
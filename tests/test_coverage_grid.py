@@ -0,0 +1,69 @@
+import math
+import pytest
+from fastapi import HTTPException
+
+from coverage_gap.coverage_engine import COVERAGE_ENGINE_KEY
+from coverage_gap.coverage_grid import GRID_RESOLUTIONS, analyze_grid
+from coverage_gap.coverage_gap_route import coverage_gap_grid_get
+from warehouse.models import CoverageGapFilters
+from warehouse.warehouse_service import _cache
+
+
+def cell_of(lat, lng, resolution):
+    size = GRID_RESOLUTIONS[resolution]
+    return f"{resolution}:{math.floor((lat + 90) / size)}:{math.floor((lng + 180) / size)}"
+
+
+class TestCoverageGrid:
+    """Test cases for grid coverage analysis"""
+
+    def test_cells_match_point_by_point_binning(self, coverage_engine):
+        """Test every cell's supply and demand match binning warehouses and cities one at a time"""
+        engine = coverage_engine(seed=11)
+        inputs = engine.inputs
+        
+        for resolution in ("national", "regional"):
+            expected = {}
+            for wh in inputs.warehouses:
+                if wh.lat != 0 and wh.lng != 0:
+                    cell = expected.setdefault(cell_of(wh.lat, wh.lng, resolution), [0, 0, 0])
+                    cell[0] += 1
+            for city_key, city_info in inputs.us_cities.items():
+                if city_info["latitude"] and city_info["longitude"]:
+                    cell = expected.setdefault(cell_of(city_info["latitude"], city_info["longitude"], resolution), [0, 0, 0])
+                    cell[1] += 1
+                    cell[2] += inputs.city_request_counts.get(city_key, 0)
+            
+            grid = analyze_grid(engine, resolution)
+            assert {cell.id: [cell.warehouseCount, cell.cityCount, cell.reqCount] for cell in grid.cells} == expected
+            for cell in grid.cells:
+                assert cell.goldWarehouseCount + cell.silverWarehouseCount + cell.bronzeWarehouseCount + cell.unTieredWarehouseCount == cell.warehouseCount
+                assert cell.hasCoverageGap == (cell.warehouseCount < 2 or (cell.warehouseCount > 0 and cell.reqCount / cell.warehouseCount > 20))
+
+    def test_refined_cell_splits_its_parent(self, coverage_engine):
+        """Test refining a coarse cell returns finer cells inside it that add up to it"""
+        engine = coverage_engine(seed=12)
+        filters = CoverageGapFilters(tier=["Gold", "Silver"])
+        
+        for parent in analyze_grid(engine, "national", filters).cells:
+            refined = analyze_grid(engine, "local", filters, parent_cell=parent.id)
+            west, south, east, north = parent.bounds
+            assert refined.parentCell == parent.id
+            assert all(west <= cell.longitude <= east and south <= cell.latitude <= north for cell in refined.cells)
+            for field in ("warehouseCount", "goldWarehouseCount", "cityCount", "reqCount"):
+                assert sum(getattr(cell, field) for cell in refined.cells) == getattr(parent, field)
+        
+        with pytest.raises(ValueError):
+            analyze_grid(engine, "national", parent_cell="regional:120:70")
+
+    @pytest.mark.asyncio
+    async def test_invalid_cell_is_rejected(self, coverage_engine):
+        """Test the grid endpoint answers malformed cells with 400"""
+        _cache.set(COVERAGE_ENGINE_KEY, coverage_engine(seed=13), ttl=60)
+        
+        response = await coverage_gap_grid_get(resolution="regional")
+        assert response.data.resolution == "regional"
+        
+        with pytest.raises(HTTPException) as error:
+            await coverage_gap_grid_get(resolution="local", cell="somewhere")
+        assert error.value.status_code == 400
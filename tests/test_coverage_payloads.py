@@ -0,0 +1,139 @@
+import gzip
+import json
+import pytest
+
+from coverage_gap.coverage_gap_precache import get_precache_key, precache_payloads, save_last_precache_timestamp
+from coverage_gap.coverage_gap_service import get_coverage_gap_analysis_stream, get_precached_payload
+from coverage_gap.coverage_payloads import COLUMNAR_FORMAT, ROWS_FORMAT, parse_accept_encoding, to_columnar_response
+from warehouse.warehouse_service import _cache
+
+
+async def final_data_frame(stream):
+    """Payload of the stream's final "data" event"""
+    frames = [json.loads(chunk[len("data: "):]) async for chunk in stream]
+    return next(frame["data"] for frame in frames if frame["type"] == "data")
+
+
+class TestCoveragePayloads:
+    """Test cases for coverage analysis wire formats"""
+
+    def test_columnar_response_rebuilds_rows(self, sample_result):
+        """Test every city can be rebuilt from the columnar arrays and warehouse indexes"""
+        result = sample_result()
+        
+        columnar = to_columnar_response(result).model_dump(mode='json')
+        
+        columns = columnar["coverageAnalysis"]
+        rows = result.model_dump(mode='json')
+        assert columnar["format"] == COLUMNAR_FORMAT
+        assert columnar["warehouses"] == rows["warehouses"]
+        assert len(columns["city"]) == len(rows["coverageAnalysis"])
+        for i, row in enumerate(rows["coverageAnalysis"]):
+            nearby = [
+                {
+                    "id": columnar["warehouses"][index]["id"],
+                    "name": columnar["warehouses"][index]["name"],
+                    "tier": columnar["warehouses"][index]["tier"],
+                    "distance": distance
+                }
+                for index, distance in zip(columns["nearbyWarehouseIndexes"][i], columns["nearbyWarehouseDistances"][i])
+            ]
+            rebuilt = {field: values[i] for field, values in columns.items() if not field.startswith("nearbyWarehouse")}
+            assert {**rebuilt, "nearbyWarehouses": nearby} == row
+        for field in ("average_number_of_requests", "totalWarehouses", "totalRequests", "analysisRadius"):
+            assert columnar[field] == rows[field]
+
+    @pytest.mark.asyncio
+    async def test_stream_sends_requested_format(self, sample_result):
+        """Test the stream sends rows by default and a smaller columnar payload on request"""
+        result = sample_result(radius=25.0)
+        _cache.set(get_precache_key(25.0), result, ttl=60)
+        
+        rows = await final_data_frame(get_coverage_gap_analysis_stream(None, 25.0))
+        columnar = await final_data_frame(get_coverage_gap_analysis_stream(None, 25.0, COLUMNAR_FORMAT))
+        
+        assert isinstance(rows["coverageAnalysis"], list)
+        assert columnar["format"] == COLUMNAR_FORMAT
+        assert columnar["coverageAnalysis"]["city"] == [city["city"] for city in rows["coverageAnalysis"]]
+        assert len(json.dumps(columnar)) < len(json.dumps(rows))
+
+    @pytest.mark.asyncio
+    async def test_precached_payload_matches_stream(self, sample_result):
+        """Test the prebuilt body is byte-identical to what the stream sends for a precached radius"""
+        _cache.set(get_precache_key(50.0), sample_result(radius=50.0), ttl=60)
+        save_last_precache_timestamp()
+        
+        assert await precache_payloads([50.0]) == 2
+        
+        for response_format in (ROWS_FORMAT, COLUMNAR_FORMAT):
+            payload = get_precached_payload(None, 50.0, response_format)
+            streamed = "".join([chunk async for chunk in get_coverage_gap_analysis_stream(None, 50.0, response_format)])
+            assert payload.identity == streamed.encode("utf-8")
+            assert gzip.decompress(payload.gzip) == payload.identity
+
+    @pytest.mark.asyncio
+    async def test_replaced_result_invalidates_payload(self, sample_result):
+        """Test a body is not served once its precached result or precache run is replaced"""
+        _cache.set(get_precache_key(100.0), sample_result(radius=100.0), ttl=60)
+        save_last_precache_timestamp()
+        await precache_payloads([100.0])
+        assert get_precached_payload(None, 100.0) is not None
+        
+        _cache.set(get_precache_key(100.0), sample_result(radius=100.0), ttl=60)
+        
+        assert get_precached_payload(None, 100.0) is None
+        assert get_precached_payload(None, 75.0) is None
+
+    @pytest.mark.asyncio
+    async def test_endpoint_serves_compressed_payload(self, client, sample_result):
+        """Test the endpoint sends the gzip body to clients that accept it"""
+        _cache.set(get_precache_key(250.0), sample_result(radius=250.0), ttl=60)
+        save_last_precache_timestamp()
+        await precache_payloads([250.0])
+        payload = get_precached_payload(None, 250.0)
+        
+        response = client.post("/coverage_gap_warehouses?radius=250", headers={"Accept-Encoding": "gzip"})
+        
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.content == payload.identity
+
+    def test_accept_encoding_quality_values(self):
+        """Test q=0 excludes a coding and a wildcard covers unlisted ones"""
+        assert parse_accept_encoding("gzip;q=0, br") == {"gzip": 0.0, "br": 1.0}
+        assert parse_accept_encoding("*;q=0.5")["gzip"] == 0.5
+        assert parse_accept_encoding("") == {}
+
+    @pytest.mark.asyncio
+    async def test_endpoint_conditional_get(self, client, sample_result):
+        """Test precached radii and views of them revalidate with 304 until the precache changes"""
+        _cache.set(get_precache_key(500.0), sample_result(radius=500.0), ttl=60)
+        save_last_precache_timestamp()
+        await precache_payloads([500.0])
+        
+        first = client.get("/coverage_gap_warehouses?radius=500", headers={"Accept-Encoding": "identity"})
+        repeat = client.get("/coverage_gap_warehouses?radius=500", headers={"Accept-Encoding": "identity", "If-None-Match": first.headers["etag"]})
+        gzipped = client.get("/coverage_gap_warehouses?radius=500", headers={"Accept-Encoding": "gzip"})
+        repeat_gzipped = client.get("/coverage_gap_warehouses?radius=500", headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]})
+        # The identity validator does not revalidate the gzip variant
+        mismatched = client.get("/coverage_gap_warehouses?radius=500", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+        view = client.get("/coverage_gap_warehouses?radius=500&state=TX&limit=5")
+        repeat_view = client.get("/coverage_gap_warehouses?radius=500&state=TX&limit=5", headers={"If-None-Match": view.headers["etag"]})
+        
+        assert first.status_code == 200
+        assert "public" in first.headers["cache-control"]
+        assert repeat.status_code == 304
+        assert repeat.headers["etag"] == first.headers["etag"]
+        assert repeat_gzipped.status_code == 304
+        assert repeat_gzipped.headers["etag"] == gzipped.headers["etag"] != first.headers["etag"]
+        assert mismatched.status_code == 200
+        assert view.status_code == 200
+        assert view.headers["etag"] != first.headers["etag"]
+        assert repeat_view.status_code == 304
+        
+        # A new precache run changes every validator
+        _cache.set(get_precache_key(500.0), sample_result(radius=500.0), ttl=60)
+        save_last_precache_timestamp()
+        await precache_payloads([500.0])
+        refreshed = client.get("/coverage_gap_warehouses?radius=500", headers={"Accept-Encoding": "identity", "If-None-Match": first.headers["etag"]})
+        assert refreshed.status_code == 200
@@ -0,0 +1,76 @@
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+from coverage_gap import coverage_gap_precache
+from coverage_gap.coverage_engine import COVERAGE_ENGINE_KEY
+from coverage_gap.coverage_gap_precache import get_popular_precached_combinations, precache_popular_combinations
+from coverage_gap.coverage_usage import USAGE_KEY, decay_usage, get_analysis_cache_key, popular_combinations, record_usage
+from services.caching import shared_cache
+from services.caching.shared_cache import get_shared_counters
+from warehouse.models import CoverageGapFilters
+from warehouse.warehouse_service import _cache
+
+
+class TestCoverageUsage:
+    """Test cases for usage-driven precaching of filter and radius combinations"""
+
+    @pytest.mark.asyncio
+    async def test_usage_ranks_and_decays(self, tmp_path):
+        """Test combinations are ranked by use count in the shared store and fade once no longer used"""
+        gold = CoverageGapFilters(tier=["Gold"], state="TX")
+        hazmat = CoverageGapFilters(hazmat=["Yes"], foodGrade=["Yes"])
+        
+        with patch.object(shared_cache, "SHARED_CACHE_DIR", str(tmp_path)):
+            for _ in range(3):
+                await record_usage(gold, 100.0)
+            await record_usage(hazmat, 75.0)
+            
+            ranked = await popular_combinations(limit=2)
+            assert [(key, radius) for key, _, radius in ranked] == [
+                (get_analysis_cache_key(gold, 100.0), 100.0),
+                (get_analysis_cache_key(hazmat, 75.0), 75.0)
+            ]
+            assert ranked[0][1] == gold
+            
+            await decay_usage()
+            await decay_usage()
+            assert [key for key, _, _ in await popular_combinations()] == [get_analysis_cache_key(gold, 100.0)]
+            assert (await get_shared_counters(USAGE_KEY))[get_analysis_cache_key(gold, 100.0)][0] == 0.75
+
+    @pytest.mark.asyncio
+    async def test_popular_combinations_precached_within_budget(self, tmp_path, coverage_engine):
+        """Test the most-used combinations are cached under their analysis keys until the budget runs out"""
+        engine = coverage_engine(seed=9)
+        gold = CoverageGapFilters(tier=["Gold"])
+        
+        with patch.dict(_cache._cache, clear=True), patch.object(shared_cache, "SHARED_CACHE_DIR", str(tmp_path)), \
+                patch.object(coverage_gap_precache, "publish_cache_entries", AsyncMock()):
+            _cache.set(COVERAGE_ENGINE_KEY, engine, ttl=60)
+            await record_usage(gold, 100.0)
+            await record_usage(gold, 100.0)
+            await record_usage(None, 75.0)
+            
+            results = await precache_popular_combinations()
+            cached = _cache.get(get_analysis_cache_key(gold, 100.0))
+            assert results == {get_analysis_cache_key(gold, 100.0): "success", get_analysis_cache_key(None, 75.0): "success"}
+            assert cached.model_dump(exclude={"lastPrecacheTimestamp"}) == engine.analyze(100.0, gold).model_dump(exclude={"lastPrecacheTimestamp"})
+            assert len(get_popular_precached_combinations()) == 2
+            
+            with patch.object(coverage_gap_precache, "POPULAR_PRECACHE_BUDGET_SECONDS", -1):
+                results = await precache_popular_combinations()
+            assert set(results.values()) == {"skipped"}
+            assert get_popular_precached_combinations() == []
+
+    @pytest.mark.asyncio
+    async def test_redis_usage_counts_are_shared(self):
+        """Test usage is counted with HINCRBYFLOAT in Redis, so every worker adds to the same counts"""
+        pipe = AsyncMock()
+        pipe.__aenter__.return_value = pipe
+        pipe.hincrbyfloat, pipe.hset, pipe.expire = Mock(), Mock(), Mock()
+        client = Mock(pipeline=Mock(return_value=pipe))
+        
+        with patch.object(shared_cache, "get_redis_client", return_value=client):
+            await record_usage(None, 75.0)
+        
+        pipe.hincrbyfloat.assert_called_once_with(f"shared_cache:{USAGE_KEY}:counts", get_analysis_cache_key(None, 75.0), 1)
+        pipe.execute.assert_awaited_once()
@@ -0,0 +1,90 @@
+import json
+import pytest
+
+from coverage_gap.coverage_gap_precache import get_precache_key
+from coverage_gap.coverage_payloads import COLUMNAR_FORMAT, to_columnar_response
+from coverage_gap.coverage_view import CoverageView, parse_bbox, select_view
+from warehouse.warehouse_service import _cache
+
+
+@pytest.fixture
+def two_state_result(sample_result):
+    """Factory for a sample analysis spread over two states"""
+    def analyze(radius=50.0):
+        result = sample_result(radius, seed=8)
+        for row, city in enumerate(result.coverageAnalysis):
+            if row % 3 == 0:
+                city.state = "OK"
+        return result
+    return analyze
+
+
+def in_bbox(lat, lng, bbox):
+    west, south, east, north = bbox
+    return south <= lat <= north and west <= lng <= east
+
+
+class TestCoverageView:
+    """Test cases for viewport, state and paging queries on coverage analysis"""
+
+    def test_bbox_and_state_match_full_scan(self, two_state_result):
+        """Test the indexed view returns exactly the cities a full scan finds, in order"""
+        result = two_state_result()
+        bbox = (-100.0, 31.0, -95.0, 35.0)
+        
+        view = select_view(result, CoverageView(bbox=bbox, state="ok"), "test:view")
+        
+        expected = [
+            city for city in result.coverageAnalysis
+            if city.state == "OK" and in_bbox(city.latitude, city.longitude, bbox)
+        ]
+        assert view.coverageAnalysis == expected
+        assert view.view.totalCities == len(expected)
+        assert view.view.nextOffset is None
+        referenced = {wh.id for city in expected for wh in city.nearbyWarehouses}
+        assert [wh.id for wh in view.warehouses] == [
+            wh.id for wh in result.warehouses
+            if wh.id in referenced or (wh.state.upper() == "OK" and in_bbox(wh.lat, wh.lng, bbox))
+        ]
+        assert view.totalWarehouses == result.totalWarehouses
+
+    def test_pages_cover_every_city_once(self, two_state_result):
+        """Test following nextOffset walks every city in view exactly once"""
+        result = two_state_result()
+        seen = []
+        offset = 0
+        while offset is not None:
+            page = select_view(result, CoverageView(state="TX", offset=offset, limit=40), "test:pages")
+            assert len(page.coverageAnalysis) <= 40
+            seen.extend(page.coverageAnalysis)
+            offset = page.view.nextOffset
+        
+        assert seen == [city for city in result.coverageAnalysis if city.state == "TX"]
+
+    def test_antimeridian_bbox_and_columnar_view(self, two_state_result):
+        """Test a bbox with west > east wraps around, and columnar views keep their paging info"""
+        result = two_state_result()
+        
+        view = select_view(result, CoverageView(bbox=parse_bbox("179,-90,-97,90"), limit=5), "test:wrap")
+        columnar = to_columnar_response(view).model_dump(mode='json')
+        
+        assert all(city.longitude <= -97 for city in view.coverageAnalysis)
+        assert columnar["view"]["limit"] == 5
+        assert len(columnar["coverageAnalysis"]["city"]) == len(view.coverageAnalysis)
+        with pytest.raises(ValueError):
+            parse_bbox("1,2,3")
+
+    def test_endpoint_returns_view(self, client, two_state_result):
+        """Test the endpoint applies bbox and paging to a precached radius and rejects bad bboxes"""
+        result = two_state_result(radius=25.0)
+        _cache.set(get_precache_key(25.0), result, ttl=60)
+        
+        response = client.post("/coverage_gap_warehouses?radius=25&bbox=-104,29,-92,37&limit=10&format=columnar")
+        invalid = client.post("/coverage_gap_warehouses?radius=25&bbox=-92,37,-104")
+        
+        frames = [json.loads(line[len("data: "):]) for line in response.text.split("\n\n") if line]
+        data = next(frame["data"] for frame in frames if frame["type"] == "data")
+        assert data["format"] == COLUMNAR_FORMAT
+        assert len(data["coverageAnalysis"]["city"]) == 10
+        assert data["view"]["nextOffset"] == 10
+        assert invalid.status_code == 400
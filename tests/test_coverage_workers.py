@@ -0,0 +1,66 @@
+import asyncio
+import pickle
+import pytest
+from unittest.mock import patch
+
+from coverage_gap import coverage_workers
+from coverage_gap.coverage_grid import analyze_grid
+from coverage_gap.coverage_workers import EngineNotLoaded, analyze_grid_in_worker, analyze_in_worker, analyze_task, shutdown_process_pool, write_engine
+from warehouse.models import CoverageGapFilters
+
+
+class TestCoverageWorkers:
+    """Test cases for offloading coverage computations to worker processes"""
+
+    def test_worker_loads_engine_file_once(self, coverage_engine, tmp_path):
+        """Test a worker reads an engine's file the first time it needs it, then analyzes from its loaded copy"""
+        engine = coverage_engine(seed=5)
+        
+        engine_file = str(tmp_path / "engine.pickle")
+        with patch.dict(coverage_workers._worker_engines, clear=True):
+            with pytest.raises(EngineNotLoaded):
+                analyze_task(engine.version, engine_file, 50.0, None)
+            write_engine(engine, str(tmp_path))
+            engine_file = coverage_workers.engine_path(engine.version, str(tmp_path))
+            with patch("coverage_gap.coverage_workers.pickle.load", wraps=pickle.load) as load:
+                first = analyze_task(engine.version, engine_file, 50.0, None)
+                second = analyze_task(engine.version, engine_file, 100.0, None)
+        
+        assert load.call_count == 1
+        assert first.model_dump() == engine.analyze(50.0).model_dump()
+        assert second.model_dump() == engine.analyze(100.0).model_dump()
+
+    def test_engine_pickles_without_demand_indexes(self, coverage_engine):
+        """Test engines sent to workers drop their per-radius demand indexes"""
+        engine = coverage_engine(seed=5)
+        engine.analyze(50.0)
+        
+        restored = pickle.loads(pickle.dumps(engine))
+        
+        assert engine._demand_indexes
+        assert restored._demand_indexes == {}
+        assert restored.version == engine.version
+        assert restored.analyze(50.0).model_dump() == engine.analyze(50.0).model_dump()
+
+    @pytest.mark.asyncio
+    async def test_process_pool_matches_inline_analysis(self, coverage_engine, tmp_path):
+        """Test analyses and grid layers computed in worker processes match the inline computation, with the engine written once"""
+        engine = coverage_engine(seed=6)
+        filters = CoverageGapFilters(tier=["Gold"])
+        
+        with patch.object(coverage_workers, "COVERAGE_WORKERS", 2), patch.object(coverage_workers, "COVERAGE_ENGINE_DIR", str(tmp_path)):
+            with patch("coverage_gap.coverage_workers.write_engine", wraps=write_engine) as write:
+                try:
+                    unfiltered, filtered, grid = await asyncio.gather(
+                        analyze_in_worker(engine, 100.0),
+                        analyze_in_worker(engine, 100.0, filters),
+                        analyze_grid_in_worker(engine, "regional", filters)
+                    )
+                finally:
+                    shutdown_process_pool()
+        
+        assert write.call_count == 1
+        assert list(tmp_path.iterdir()) == []
+        assert unfiltered.model_dump() == engine.analyze(100.0).model_dump()
+        assert filtered.model_dump() == engine.analyze(100.0, filters).model_dump()
+        assert grid.model_dump() == analyze_grid(engine, "regional", filters).model_dump()
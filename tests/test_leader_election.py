@@ -0,0 +1,89 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from services.caching import leader_election, shared_cache
+from services.caching.leader_election import FileLeaderLock, LeaderElection, RedisLeaderLock, leader_only
+from services.caching.shared_cache import load_cache_entries, pop_shared_items, publish_cache_entries, queue_shared_item
+from warehouse.warehouse_service import _cache
+
+
+class TestLeaderElection:
+    """Test cases for electing one worker to run scheduled jobs"""
+
+    @pytest.mark.asyncio
+    async def test_file_lock_has_one_holder(self, tmp_path):
+        """Test only one worker holds the file lock until it releases it"""
+        path = str(tmp_path / "leader.lock")
+        first, second = FileLeaderLock(path), FileLeaderLock(path)
+        
+        assert await first.acquire()
+        assert await first.acquire()
+        assert not await second.acquire()
+        
+        await first.release()
+        assert await second.acquire()
+        await second.release()
+
+    @pytest.mark.asyncio
+    async def test_redis_lock_renews_and_steps_down(self):
+        """Test the Redis lease is taken with SET NX PX, renewed by token, and lost when renewal fails"""
+        client = AsyncMock()
+        client.set.return_value = True
+        client.eval.side_effect = [1, 0]
+        election = LeaderElection(RedisLeaderLock(client, key="leader", lease_seconds=30))
+        
+        assert await election.check()
+        client.set.assert_awaited_once_with("leader", election.lock.token, nx=True, px=30000)
+        assert await election.check()
+        assert not await election.check()
+        assert not election.is_leader
+
+    @pytest.mark.asyncio
+    async def test_jobs_run_only_on_leader(self):
+        """Test wrapped jobs are skipped on followers"""
+        job = AsyncMock(return_value="done")
+        job.__name__ = "job"
+        election = LeaderElection(FileLeaderLock())
+        
+        with patch.object(leader_election, "_leader_election", election):
+            assert await leader_only(job)() is None
+            election.is_leader = True
+            assert await leader_only(job)() == "done"
+        
+        job.assert_awaited_once()
+
+
+class TestSharedCache:
+    """Test cases for publishing cache entries to other workers"""
+
+    @pytest.mark.asyncio
+    async def test_published_entries_load_once(self, tmp_path):
+        """Test a published snapshot restores entries (keeping shared references) and loads once per version"""
+        result = {"radius": 25.0}
+        _cache.set("shared_test:result", result, ttl=60)
+        _cache.set("shared_test:payload", {"source": result}, ttl=60)
+        
+        with patch.object(shared_cache, "SHARED_CACHE_DIR", str(tmp_path)), patch.dict(shared_cache._loaded_versions, clear=True):
+            assert await publish_cache_entries("test", {"shared_test:result": 60, "shared_test:payload": 60, "shared_test:missing": 60})
+            assert not await load_cache_entries("test")
+            
+            # Another worker has not loaded this version yet
+            shared_cache._loaded_versions.clear()
+            _cache.set("shared_test:result", None, ttl=60)
+            assert await load_cache_entries("test")
+            assert not await load_cache_entries("test")
+        
+        loaded = _cache.get("shared_test:result")
+        assert loaded == result
+        assert _cache.get("shared_test:payload")["source"] is loaded
+        assert _cache.get("shared_test:missing") is None
+
+    @pytest.mark.asyncio
+    async def test_queued_items_are_taken_once(self, tmp_path):
+        """Test queued items are returned in order to one caller, then the queue is empty"""
+        with patch.object(shared_cache, "SHARED_CACHE_DIR", str(tmp_path)):
+            await queue_shared_item("test", "recW1")
+            await queue_shared_item("test", "recW2")
+            
+            assert await pop_shared_items("test") == ["recW1", "recW2"]
+            assert await pop_shared_items("test") == []
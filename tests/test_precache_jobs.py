@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from contextlib import ExitStack
+from unittest.mock import AsyncMock, patch
+
+from coverage_gap import coverage_gap_precache
+from coverage_gap.coverage_engine import COVERAGE_ENGINE_KEY, warehouse_set_digest
+from coverage_gap.coverage_gap_precache import PRECACHED_RADII, precache_all_radii, precache_radii_from_engine
+from coverage_gap.coverage_gap_route import precache_status
+from coverage_gap.precache_jobs import _current_job, get_precache_jobs, precache_job
+from warehouse.warehouse_service import _cache
+
+
+class TestPrecacheJobs:
+    """Test cases for the precache job registry and status endpoint"""
+
+    @pytest.mark.asyncio
+    async def test_precache_run_records_stages_radii_and_inputs(self, coverage_sample, patch_coverage_inputs):
+        """Test a precache run reports its stage timings, per-radius timings and input versions"""
+        sample = coverage_sample(seed=4)
+        patch_coverage_inputs(*sample)
+        
+        with patch.object(coverage_gap_precache, "publish_cache_entries", AsyncMock(return_value=True)):
+            await precache_all_radii(trigger="manual")
+        
+        job = get_precache_jobs("coverage_gap")[0]
+        assert job["state"] == "completed"
+        assert job["trigger"] == "manual"
+        assert job["retries"] == 0 and job["lastError"] is None
+        assert {"load_inputs", "build_distance_table", "analyze_radii", "serialize_payloads", "publish"} <= set(job["stages"])
+        assert set(job["radii"]) == {str(radius) for radius in PRECACHED_RADII}
+        assert all(entry["status"] == "success" and entry["attempts"] == 1 for entry in job["radii"].values())
+        assert job["inputs"]["requestsSnapshotVersion"] == "sample-snapshot"
+        assert job["inputs"]["warehousesDigest"] == warehouse_set_digest(_cache.get(COVERAGE_ENGINE_KEY).inputs.warehouses)
+        assert job["inputs"]["warehouses"] == len(sample[1])
+        assert _current_job.get() is None
+
+    @pytest.mark.asyncio
+    async def test_retries_and_errors_reported(self, coverage_sample, patch_coverage_inputs):
+        """Test a radius that fails once is retried, and the retry and its error are reported"""
+        from coverage_gap.coverage_workers import analyze_in_worker
+        failures = []
+        
+        async def flaky_analyze(engine, radius, filters=None):
+            if radius == PRECACHED_RADII[0] and not failures:
+                failures.append(radius)
+                raise RuntimeError("worker crashed")
+            return await analyze_in_worker(engine, radius, filters)
+        
+        patch_coverage_inputs(*coverage_sample(seed=6))
+        with ExitStack() as stack:
+            stack.enter_context(patch.object(coverage_gap_precache, "publish_cache_entries", AsyncMock(return_value=True)))
+            stack.enter_context(patch.object(coverage_gap_precache, "RETRY_BASE_DELAY", 0))
+            stack.enter_context(patch("coverage_gap.coverage_workers.analyze_in_worker", flaky_analyze))
+            results = await precache_all_radii()
+        
+        job = get_precache_jobs("coverage_gap")[0]
+        assert results == {radius: "success" for radius in PRECACHED_RADII}
+        assert job["state"] == "completed" and job["trigger"] == "scheduled"
+        assert job["retries"] == 1
+        assert job["radii"][str(PRECACHED_RADII[0])]["attempts"] == 2
+        assert "worker crashed" in job["lastError"]
+        assert "retry_wait" in job["stages"]
+
+    @pytest.mark.asyncio
+    async def test_analyze_stage_excludes_consumer_time(self, coverage_engine):
+        """Test the analyze_radii stage times the analyses, not the caller's work between results"""
+        engine = coverage_engine(seed=4)
+        
+        with precache_job("coverage_gap", "manual"):
+            async for _ in precache_radii_from_engine(engine, [25.0]):
+                await asyncio.sleep(0.5)
+        
+        job = get_precache_jobs("coverage_gap")[0]
+        assert job["stages"]["analyze_radii"] <= job["durationSeconds"] - 0.5
+
+    @pytest.mark.asyncio
+    async def test_status_lists_recent_runs_first(self):
+        """Test the status endpoint lists runs most recent first, including failed ones"""
+        with pytest.raises(ValueError):
+            with precache_job("ai_analysis", "manual"):
+                raise ValueError("Gemini unavailable")
+        
+        response = await precache_status()
+        assert response.status == "success"
+        latest = response.data["jobs"][0]
+        assert latest["name"] == "ai_analysis"
+        assert latest["state"] == "failed"
+        assert latest["lastError"] == "Gemini unavailable"
+        
+        only_ai = (await precache_status(job="ai_analysis")).data["jobs"]
+        assert all(job["name"] == "ai_analysis" for job in only_ai)
@@ -0,0 +1,94 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from services.airtable.requests_aggregate import (
+    AGGREGATE_FIELDS,
+    RequestsAggregateBuilder,
+    get_requests_aggregate
+)
+from warehouse.warehouse_service import _cache
+
+NOW = datetime(2025, 3, 10, 12, 0, 0, tzinfo=timezone.utc)
+
+SAMPLE_RECORDS = [
+    {"id": "rec1", "createdTime": "2025-03-09T10:00:00.000Z", "fields": {"City": "Dallas", "State": "TX", "Warehouse": ["whA", "whB"]}},
+    {"id": "rec2", "createdTime": "2025-03-01T10:00:00.000Z", "fields": {"City": "Dallas ", "State": "TX", "Warehouse": ["whA"]}},
+    {"id": "rec3", "createdTime": "2025-02-28T10:00:00.000Z", "fields": {"City": "Austin", "State": "TX"}},
+    {"id": "rec4", "createdTime": "2024-11-01T10:00:00.000Z", "fields": {"State": "TX"}},
+    {"id": "rec5", "createdTime": "not a date", "fields": {}},
+]
+
+
+def build_aggregate(records):
+    builder = RequestsAggregateBuilder(now=NOW)
+    for record in records:
+        builder.add_record(record)
+    return builder.build()
+
+
+class TestRequestsAggregate:
+    """Test cases for the single-pass Requests aggregate"""
+
+    def test_aggregate_fields_cover_all_consumers(self):
+        """Test the merged scan projects every field the statistics read"""
+        assert set(AGGREGATE_FIELDS) == {"Request ID", "Warehouse", "City", "State"}
+
+    def test_counts(self):
+        """Test total, per-warehouse and per-city counts"""
+        aggregate = build_aggregate(SAMPLE_RECORDS)
+        
+        assert aggregate.total_count == 5
+        assert aggregate.warehouse_counts == {"whA": 2, "whB": 1}
+        assert aggregate.city_counts == {"Dallas,TX": 2, "Austin,TX": 1}
+
+    def test_monthly_average_rounds_up(self):
+        """Test the daily average for the current month is rounded up"""
+        aggregate = build_aggregate(SAMPLE_RECORDS)
+        
+        # Two requests this month over 10 elapsed days -> 0.2 -> 1
+        assert aggregate.monthly_count == 2
+        assert aggregate.average_monthly_requests == 1
+
+    def test_time_windows_and_trends(self):
+        """Test weekly and 3-month windows feed the request trends"""
+        aggregate = build_aggregate(SAMPLE_RECORDS)
+        
+        assert aggregate.past_week_count == 1
+        assert aggregate.previous_week_count == 2
+        assert aggregate.past_3_months_count == 3
+        assert aggregate.previous_3_months_count == 1
+        
+        trends = aggregate.request_trends()
+        assert trends.pastWeekChange == -1.0
+        assert trends.past3MonthsChange == 2.0
+        assert trends.trendDirection == "stable"
+
+    def test_snapshot_version_tracks_content(self):
+        """Test the snapshot version ignores scan order but changes with data"""
+        version = build_aggregate(SAMPLE_RECORDS).snapshot_version
+        
+        assert version == build_aggregate(list(reversed(SAMPLE_RECORDS))).snapshot_version
+        
+        changed = [dict(record) for record in SAMPLE_RECORDS]
+        changed[0] = {**changed[0], "fields": {"City": "Houston", "State": "TX"}}
+        assert version != build_aggregate(changed).snapshot_version
+
+    @pytest.mark.asyncio
+    async def test_get_requests_aggregate_scans_once(self):
+        """Test the aggregate is cached as one unit"""
+        scans = []
+        
+        async def fake_pages(fields=None):
+            scans.append(fields)
+            yield SAMPLE_RECORDS
+        
+        _cache.clear_warehouse_cache()
+        with patch('services.airtable.requests_aggregate.iter_request_pages', fake_pages):
+            first = await get_requests_aggregate()
+            second = await get_requests_aggregate()
+        _cache.clear_warehouse_cache()
+        
+        assert first is second
+        assert len(scans) == 1
+        assert first.total_count == 5
@@ -0,0 +1,98 @@
+import pytest
+from unittest.mock import AsyncMock, patch, MagicMock
+
+from services.airtable.requests import (
+    AIRTABLE_PAGE_SIZE,
+    CITY_COUNT_FIELDS,
+    REQUEST_ID_FIELDS,
+    WAREHOUSE_COUNT_FIELDS,
+    build_request_scan_params,
+    fetch_request_by_id_from_airtable,
+    fetch_requests_by_ids_from_airtable,
+    fetch_requests_from_airtable,
+    merge_field_projections
+)
+from warehouse.warehouse_service import _cache
+
+
+def _mock_page(records, offset=None):
+    response = MagicMock()
+    payload = {"records": records}
+    if offset:
+        payload["offset"] = offset
+    response.json.return_value = payload
+    response.raise_for_status = MagicMock()
+    return response
+
+
+class TestRequestsService:
+    """Test cases for Requests table scans"""
+
+    def test_merge_field_projections_union(self):
+        """Test that merged scans request the union of consumer fields"""
+        merged = merge_field_projections(REQUEST_ID_FIELDS, WAREHOUSE_COUNT_FIELDS, CITY_COUNT_FIELDS, ["City"])
+        
+        assert merged == ["Request ID", "Warehouse", "City", "State"]
+
+    def test_merge_field_projections_all_fields_wins(self):
+        """Test that a consumer needing every field disables projection"""
+        assert merge_field_projections(CITY_COUNT_FIELDS, None) is None
+
+    def test_build_request_scan_params(self):
+        """Test scan params include page size and optional projection"""
+        assert build_request_scan_params() == {"pageSize": AIRTABLE_PAGE_SIZE}
+        
+        params = build_request_scan_params(CITY_COUNT_FIELDS)
+        assert params["pageSize"] == 100
+        assert params["fields[]"] == ["City", "State"]
+
+    @pytest.mark.asyncio
+    async def test_fetch_requests_passes_projection_and_follows_offset(self):
+        """Test projected scans are sent to Airtable across all pages"""
+        with patch('httpx.AsyncClient') as mock_client:
+            mock_instance = AsyncMock()
+            mock_client.return_value.__aenter__.return_value = mock_instance
+            
+            sent_params = []
+            pages = [_mock_page([{"id": "rec1"}], offset="next"), _mock_page([{"id": "rec2"}])]
+            
+            async def fake_get(url, headers=None, params=None):
+                sent_params.append(dict(params))
+                return pages.pop(0)
+            
+            mock_instance.get = AsyncMock(side_effect=fake_get)
+            
+            result = await fetch_requests_from_airtable(fields=WAREHOUSE_COUNT_FIELDS)
+            
+            assert [record["id"] for record in result] == ["rec1", "rec2"]
+            assert sent_params[0]["fields[]"] == ["Warehouse"]
+            assert sent_params[0]["pageSize"] == 100
+            assert "offset" not in sent_params[0]
+            assert sent_params[1]["offset"] == "next"
+
+    @pytest.mark.asyncio
+    async def test_batch_lookup_uses_local_index(self):
+        """Test batch lookups query Airtable once and then serve from the local index"""
+        records = [
+            {"id": "rec1", "fields": {"Request ID": 101, "Commodity": "Paper", "BOL & Pictures": "bol (https://img.test/a.png)"}},
+            {"id": "rec2", "fields": {"Request ID": 102, "Loading Style": "Floor", "BOL & Pictures": [{"url": "https://img.test/b.png"}]}}
+        ]
+        
+        _cache.clear_warehouse_cache()
+        with patch('httpx.AsyncClient') as mock_client:
+            mock_instance = AsyncMock()
+            mock_client.return_value.__aenter__.return_value = mock_instance
+            mock_instance.get = AsyncMock(return_value=_mock_page(records))
+            
+            found = await fetch_requests_by_ids_from_airtable([101, 102, 103])
+            single = await fetch_request_by_id_from_airtable(101)
+            
+            assert mock_instance.get.call_count == 1
+            formula = mock_instance.get.call_args.kwargs["params"]["filterByFormula"]
+            assert formula == "OR({Request ID} = 101, {Request ID} = 102, {Request ID} = 103)"
+        _cache.clear_warehouse_cache()
+        
+        assert sorted(found) == [101, 102]
+        assert found[101].request_images == ["https://img.test/a.png"]
+        assert found[102].request_images == ["https://img.test/b.png"]
+        assert single is found[101]
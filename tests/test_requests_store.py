@@ -0,0 +1,58 @@
+import numpy as np
+
+from services.airtable.requests_store import (
+    MISSING_TIME,
+    RequestsStoreBuilder,
+    parse_created_times
+)
+
+
+def build_store(records):
+    builder = RequestsStoreBuilder()
+    for record in records:
+        builder.add_record(record)
+    return builder.build()
+
+
+class TestRequestsStore:
+    """Test cases for the columnar Requests store"""
+
+    def test_parse_created_times(self):
+        """Test ISO timestamps become epoch seconds and bad values are marked missing"""
+        seconds = parse_created_times(["2024-01-15T10:30:00.000Z", None, "garbage", "1970-01-01T00:01:00.000Z"])
+        
+        assert seconds.dtype == np.int64
+        assert seconds.tolist() == [1705314600, MISSING_TIME, MISSING_TIME, 60]
+
+    def test_columns_and_histograms(self):
+        """Test records are interned into index columns"""
+        store = build_store([
+            {"createdTime": "2024-01-01T00:00:00.000Z", "fields": {"City": "Dallas", "State": "TX", "Warehouse": ["whA", "whB"]}},
+            {"createdTime": "2024-02-01T00:00:00.000Z", "fields": {"City": "Austin", "State": "TX", "Warehouse": ["whB"]}},
+            {"createdTime": "2024-03-01T00:00:00.000Z", "fields": {"State": "OK"}},
+        ])
+        
+        assert len(store) == 3
+        assert store.city_idx.dtype == np.int32
+        assert store.city_idx.tolist() == [0, 1, -1]
+        assert store.state_histogram().tolist() == [2, 1]
+        assert store.city_counts() == {"Dallas,TX": 1, "Austin,TX": 1}
+        assert store.warehouse_counts() == {"whA": 1, "whB": 2}
+
+    def test_time_window_queries(self):
+        """Test time-window masks narrow every histogram"""
+        store = build_store([
+            {"createdTime": "2024-01-01T00:00:00.000Z", "fields": {"City": "Dallas", "State": "TX", "Warehouse": ["whA"]}},
+            {"createdTime": "2024-02-01T00:00:00.000Z", "fields": {"City": "Dallas", "State": "TX", "Warehouse": ["whA", "whB"]}},
+            {"fields": {"City": "Dallas", "State": "TX"}},
+        ])
+        february = int(np.datetime64("2024-02-01T00:00:00", "s").astype(np.int64))
+        
+        assert store.count_created_between() == 2
+        assert store.count_created_between(february) == 1
+        assert store.count_created_between(end=february) == 1
+        assert store.count_created_between(end=february, include_end=True) == 2
+        
+        mask = store.time_mask(start=february)
+        assert store.city_counts(mask) == {"Dallas,TX": 1}
+        assert store.warehouse_counts(mask) == {"whA": 1, "whB": 1}
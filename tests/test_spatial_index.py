@@ -0,0 +1,94 @@
+import random
+
+from coverage_gap.spatial_index import GridIndex, WeightedGridIndex, bounding_box, build_demand_index, find_cities_near
+from services.gemini_services.coverage_gap_analysis import calculate_aggregated_request_count
+from services.geolocation.geolocation_service import haversine
+
+
+def brute_force(points, lat, lng, radius):
+    return [
+        (index, haversine(lat, lng, point_lat, point_lng))
+        for index, (point_lat, point_lng) in enumerate(points)
+        if haversine(lat, lng, point_lat, point_lng) <= radius
+    ]
+
+
+class TestSpatialIndex:
+    """Test cases for the grid spatial index"""
+
+    def test_within_radius_matches_full_scan(self):
+        """Test grid queries return exactly the full-scan result, in index order"""
+        rng = random.Random(7)
+        points = [(rng.uniform(18, 71), rng.uniform(-179.9, -66)) for _ in range(800)]
+        
+        for radius in (25, 50, 100, 250, 500):
+            grid = GridIndex(points, radius)
+            for _ in range(40):
+                lat, lng = rng.uniform(18, 71), rng.uniform(-179.9, -66)
+                assert grid.within_radius(lat, lng, radius) == brute_force(points, lat, lng, radius)
+
+    def test_within_radius_across_antimeridian(self):
+        """Test circles that cross ±180 longitude find points on both sides"""
+        points = [(52.0, 179.8), (52.0, -179.8), (52.0, 170.0)]
+        grid = GridIndex(points, 50)
+        
+        assert [index for index, _ in grid.within_radius(52.0, -179.95, 50)] == [0, 1]
+
+    def test_bounding_box_contains_circle(self):
+        """Test the bounding box covers points at the radius in every direction"""
+        min_lat, max_lat, min_lng, max_lng = bounding_box(40.0, -100.0, 100)
+        
+        assert haversine(40.0, -100.0, max_lat, -100.0) <= 100.0001
+        assert min_lat < 40.0 < max_lat
+        assert min_lng < -100.0 < max_lng
+        assert bounding_box(89.5, 0.0, 100)[2:] == (-180.0, 180.0)
+
+    def test_radius_sum_matches_full_scan(self):
+        """Test weighted radius sums (whole-cell prefix sums plus edge cells) match a full scan"""
+        rng = random.Random(11)
+        points = [(rng.uniform(18, 71), rng.uniform(-179.9, -66)) for _ in range(1500)]
+        weights = [rng.randint(1, 9) for _ in points]
+        
+        for radius in (25, 50, 100, 250, 500):
+            index = WeightedGridIndex(points, weights, radius / 4)
+            for _ in range(40):
+                lat, lng = rng.uniform(18, 71), rng.uniform(-179.9, -66)
+                expected = sum(weights[i] for i, _ in brute_force(points, lat, lng, radius))
+                assert index.radius_sum(lat, lng, radius) == expected
+
+    def test_demand_index_matches_aggregated_request_count(self):
+        """Test the demand index gives the same aggregated counts as the per-city scan"""
+        rng = random.Random(3)
+        us_cities = {
+            f"City{i},TX": {"city": f"City{i}", "state": "TX", "latitude": rng.uniform(26, 36), "longitude": rng.uniform(-106, -94)}
+            for i in range(300)
+        }
+        us_cities["Nowhere,TX"] = {"city": "Nowhere", "state": "TX", "latitude": 0.0, "longitude": 0.0}
+        city_request_counts = {key: rng.randint(0, 5) for key in list(us_cities)[::2]}
+        city_request_counts["Unknown,TX"] = 4
+        
+        demand_index = build_demand_index(us_cities, city_request_counts, 50)
+        for city_info in list(us_cities.values())[:100]:
+            args = (city_info["latitude"], city_info["longitude"], 50, us_cities, city_request_counts)
+            assert calculate_aggregated_request_count(*args, demand_index) == calculate_aggregated_request_count(*args)
+
+    def test_find_cities_near_matches_per_seed_scan(self):
+        """Test the seed-grid expansion returns the same cities as scanning all cities per seed"""
+        rng = random.Random(5)
+        us_cities = {
+            f"City{i},CA": {"city": f"City{i}", "state": "CA", "latitude": rng.uniform(32, 42), "longitude": rng.uniform(-124, -114)}
+            for i in range(600)
+        }
+        us_cities["Nowhere,CA"] = {"city": "Nowhere", "state": "CA", "latitude": 0.0, "longitude": 0.0}
+        seed_keys = set(rng.sample(sorted(us_cities), 25)) | {"Nowhere,CA", "Missing,CA"}
+        
+        for radius in (25, 100):
+            expected = set()
+            for seed_key in seed_keys:
+                seed = us_cities.get(seed_key)
+                if not seed or not seed["latitude"]:
+                    continue
+                for city_key, city_info in us_cities.items():
+                    if city_info["latitude"] and haversine(seed["latitude"], seed["longitude"], city_info["latitude"], city_info["longitude"]) <= radius:
+                        expected.add(city_key)
+            assert find_cities_near(us_cities, seed_keys, radius) == expected
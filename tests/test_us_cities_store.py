@@ -0,0 +1,93 @@
+import json
+import os
+import pickle
+import pytest
+from unittest.mock import patch
+
+from coverage_gap import us_cities_store
+from coverage_gap.us_cities_store import load_us_cities, read_us_cities_store, write_us_cities_store
+
+
+SAMPLE_CITIES = [
+    {"city": "Dallas", "state": "TX", "latitude": 32.776664, "longitude": -96.796988, "zipcodes": ["75201", "75202"]},
+    {"city": "Agua Dulce", "state": "CA", "latitude": 34.496389, "longitude": -118.325556, "zipcodes": ["91390"]},
+    {"city": "Nowhere", "state": "TX", "latitude": 0.0, "longitude": 0.0, "zipcodes": []},
+    {"city": "Dallas", "state": "GA", "latitude": 33.923711, "longitude": -84.840766, "zipcodes": ["30132", "30157"]},
+    {"city": "Dallas", "state": "TX", "latitude": 32.776664, "longitude": -96.796988, "zipcodes": ["75201", "75202", "75203"]}
+]
+
+
+def expected_cities():
+    """us_cities.json parsed the way the services always keyed it"""
+    return {f"{city['city']},{city['state']}": city for city in SAMPLE_CITIES}
+
+
+@pytest.fixture
+def data_paths(tmp_path):
+    json_path = tmp_path / "us_cities.json"
+    json_path.write_text(json.dumps({"total_cities": len(SAMPLE_CITIES), "cities": SAMPLE_CITIES}), encoding="utf-8")
+    store_dir = str(tmp_path / "us_cities_store")
+    with patch.object(us_cities_store, "US_CITIES_JSON_PATH", str(json_path)), \
+         patch.object(us_cities_store, "US_CITIES_STORE_DIR", store_dir), \
+         patch.object(us_cities_store, "_us_cities", None):
+        yield str(json_path), store_dir
+
+
+class TestUSCitiesStore:
+    """Test cases for the binary US cities dataset"""
+
+    def test_compiled_store_reads_back_like_json(self, data_paths):
+        """Test the memory-mapped store yields the same cities, in order, as parsing the JSON"""
+        _, store_dir = data_paths
+        write_us_cities_store(SAMPLE_CITIES, store_dir)
+        
+        cities = read_us_cities_store(store_dir)
+        
+        assert list(cities.items()) == list(expected_cities().items())
+        assert cities["Dallas,GA"] == expected_cities()["Dallas,GA"]
+        assert cities.get("Atlantis,XX", {}) == {}
+        assert len(cities) == 4
+        
+        # Location columns match the city dicts the engine would otherwise walk
+        lats, lngs, states = cities.location_columns()
+        assert lats.tolist() == [city["latitude"] for city in expected_cities().values()]
+        assert lngs.tolist() == [city["longitude"] for city in expected_cities().values()]
+        assert states.tolist() == [city["state"].upper() for city in expected_cities().values()]
+
+    def test_loaded_once_per_process(self, data_paths):
+        """Test the compiled store is read on first use and reused afterwards"""
+        _, store_dir = data_paths
+        write_us_cities_store(SAMPLE_CITIES, store_dir)
+        
+        with patch.object(us_cities_store, "read_us_cities_store", wraps=read_us_cities_store) as read_store:
+            first = load_us_cities()
+            second = load_us_cities()
+        
+        assert first is second
+        assert read_store.call_count == 1
+        assert dict(first.items()) == expected_cities()
+
+    def test_stale_or_missing_store_falls_back_to_json(self, data_paths):
+        """Test a missing store, or one older than the JSON, is not used"""
+        json_path, store_dir = data_paths
+        write_us_cities_store(SAMPLE_CITIES[:2], store_dir)
+        os.utime(json_path, (os.path.getmtime(store_dir) + 10, os.path.getmtime(store_dir) + 10))
+        
+        with patch.object(us_cities_store, "read_us_cities_store") as read_store:
+            cities = load_us_cities()
+        
+        read_store.assert_not_called()
+        assert dict(cities.items()) == expected_cities()
+
+    def test_pickled_store_reopens_its_files(self, data_paths):
+        """Test a memory-mapped store pickles as a reference to its directory, not its columns"""
+        _, store_dir = data_paths
+        write_us_cities_store(SAMPLE_CITIES, store_dir)
+        cities = read_us_cities_store(store_dir)
+        in_memory = us_cities_store.USCitiesStore.from_cities(SAMPLE_CITIES)
+        
+        payload = pickle.dumps(cities)
+        
+        assert len(payload) < len(pickle.dumps(in_memory))
+        assert dict(pickle.loads(payload).items()) == expected_cities()
+        assert dict(pickle.loads(pickle.dumps(in_memory)).items()) == expected_cities()
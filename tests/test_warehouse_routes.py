@@ -1,3 +1,4 @@
+import json
 import pytest
 from unittest.mock import AsyncMock, patch
 from fastapi import HTTPException
@@ -19,6 +20,25 @@ class TestWarehouseRoutes:
             assert len(data["data"]) == 1
             assert data["data"][0]["id"] == "rec123"
 
+    @pytest.mark.asyncio
+    async def test_warehouses_endpoint_conditional_get(self, client, mock_env_vars, sample_warehouse_data):
+        """Test warehouses endpoint answers a matching If-None-Match with 304"""
+        with patch('warehouse.warehouse_route.fetch_warehouses_from_airtable', new_callable=AsyncMock) as mock_fetch:
+            mock_fetch.return_value = [sample_warehouse_data]
+            
+            first = client.get("/warehouses")
+            repeat = client.get("/warehouses", headers={"If-None-Match": first.headers["etag"]})
+            mock_fetch.return_value = [sample_warehouse_data, {**sample_warehouse_data, "id": "rec456"}]
+            changed = client.get("/warehouses", headers={"If-None-Match": first.headers["etag"]})
+            
+            assert first.status_code == 200
+            assert "max-age" in first.headers["cache-control"]
+            assert repeat.status_code == 304
+            assert repeat.headers["etag"] == first.headers["etag"]
+            assert repeat.content == b""
+            assert changed.status_code == 200
+            assert changed.headers["etag"] != first.headers["etag"]
+
     @pytest.mark.asyncio
     async def test_warehouses_endpoint_error(self, client, mock_env_vars):
         """Test warehouses endpoint with error"""
@@ -31,6 +51,58 @@ class TestWarehouseRoutes:
             data = response.json()
             assert "Unexpected error" in data["detail"]
 
+    @pytest.mark.asyncio
+    async def test_requests_endpoint_batch_ids(self, client, mock_env_vars):
+        """Test batch request lookup reports found and missing IDs"""
+        from warehouse.models import RequestData
+        
+        with patch('warehouse.warehouse_route.fetch_requests_by_ids_from_airtable', new_callable=AsyncMock) as mock_fetch:
+            mock_fetch.return_value = {101: RequestData(commodity="Paper", request_images=[])}
+            
+            response = client.get("/requests?ids=101,102")
+            
+            assert response.status_code == 200
+            data = response.json()
+            assert data["data"]["requests"]["101"]["commodity"] == "Paper"
+            assert data["data"]["missing"] == [102]
+            mock_fetch.assert_called_once_with([101, 102])
+
+    @pytest.mark.asyncio
+    async def test_requests_endpoint_requires_id(self, client, mock_env_vars):
+        """Test request lookup without an ID is rejected"""
+        response = client.get("/requests")
+        
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_all_requests_endpoint_page(self, client, mock_env_vars):
+        """Test cursor-based pagination with a field projection"""
+        with patch('warehouse.warehouse_route.fetch_requests_page', new_callable=AsyncMock) as mock_page:
+            mock_page.return_value = ([{"id": "rec1", "fields": {"City": "Dallas"}}], "itrNext")
+            
+            response = client.get("/all-requests?page_size=50&fields=City")
+            
+            assert response.status_code == 200
+            data = response.json()
+            assert data["data"]["records"][0]["id"] == "rec1"
+            assert data["data"]["next_cursor"] == "itrNext"
+            mock_page.assert_called_once_with(cursor=None, page_size=50, fields=["City"])
+
+    @pytest.mark.asyncio
+    async def test_all_requests_endpoint_stream(self, client, mock_env_vars):
+        """Test NDJSON streaming forwards records page by page"""
+        async def fake_pages(fields=None):
+            yield [{"id": "rec1"}, {"id": "rec2"}]
+            yield [{"id": "rec3"}]
+        
+        with patch('warehouse.warehouse_route.iter_request_pages', fake_pages):
+            response = client.get("/all-requests?stream=true")
+            
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            lines = [json.loads(line) for line in response.text.splitlines()]
+            assert [line["id"] for line in lines] == ["rec1", "rec2", "rec3"]
+
     @pytest.mark.asyncio
     async def test_nearby_warehouses_endpoint_success(self, client, mock_env_vars, sample_location_request, sample_warehouse_data):
         """Test successful nearby warehouses endpoint"""
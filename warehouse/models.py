@@ -207,6 +207,75 @@ class CoverageAnalysisResponse(BaseModel):
     analysisRadius: int 
     lastPrecacheTimestamp: Optional[str] = None  # ISO format timestamp of last precache completion 
 
+class CoverageViewInfo(BaseModel):
+    bbox: Optional[List[float]] = None  # [west, south, east, north] in degrees
+    state: Optional[str] = None
+    offset: int = 0
+    limit: Optional[int] = None
+    totalCities: int  # Cities in view before paging
+    nextOffset: Optional[int] = None  # Offset of the next page, None on the last page
+
+class CoverageAnalysisViewResponse(CoverageAnalysisResponse):
+    view: CoverageViewInfo
+
+class ColumnarCoverageAnalysis(BaseModel):
+    # Parallel arrays: element i of every list describes the same city
+    city: List[str]
+    state: List[str]
+    latitude: List[float]
+    longitude: List[float]
+    zipcodes: List[List[str]]
+    nearbyWarehouseIndexes: List[List[int]]  # Indexes into the response's warehouses list
+    nearbyWarehouseDistances: List[List[float]]  # Distances matching nearbyWarehouseIndexes
+    warehouseCount: List[int]
+    hasCoverageGap: List[bool]
+    expansionOpportunity: List[str]
+    goldWarehouseCount: List[int]
+    silverWarehouseCount: List[int]
+    bronzeWarehouseCount: List[int]
+    unTieredWarehouseCount: List[int]
+    warehousesPer100SqMiles: List[float]
+    reqCount: List[int]
+
+class ColumnarCoverageAnalysisResponse(BaseModel):
+    format: str = "columnar"
+    warehouses: List[StaticWarehouseData]
+    coverageAnalysis: ColumnarCoverageAnalysis
+    average_number_of_requests: int
+    totalWarehouses: int
+    totalRequests: int
+    analysisRadius: int
+    lastPrecacheTimestamp: Optional[str] = None
+
+class ColumnarCoverageAnalysisViewResponse(ColumnarCoverageAnalysisResponse):
+    view: CoverageViewInfo
+
+class CoverageGridCell(BaseModel):
+    id: str  # "resolution:row:col"; pass as `cell` to refine it at a finer resolution
+    bounds: List[float]  # [west, south, east, north] in degrees
+    latitude: float  # Cell centre
+    longitude: float
+    warehouseCount: int  # (Matching) warehouses located in the cell
+    goldWarehouseCount: int
+    silverWarehouseCount: int
+    bronzeWarehouseCount: int
+    unTieredWarehouseCount: int
+    cityCount: int  # US cities located in the cell
+    reqCount: int  # Requests from those cities
+    requestsPerWarehouse: float  # reqCount per warehouse (reqCount when there are none)
+    hasCoverageGap: bool
+    expansionOpportunity: str  # 'None' | 'Moderate' | 'High'
+    warehousesPer100SqMiles: float  # Over the cell's actual area
+
+class CoverageGridResponse(BaseModel):
+    resolution: str
+    cellSizeDegrees: float
+    parentCell: Optional[str] = None  # The coarser cell this layer refines, if any
+    cells: List[CoverageGridCell]  # Cells with warehouses or cities only
+    totalWarehouses: int
+    totalRequests: int
+    lastPrecacheTimestamp: Optional[str] = None
+
 class CoverageGapFilters(BaseModel):
     tier: Optional[List[str]] = None
     state: Optional[str] = None
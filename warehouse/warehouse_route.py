@@ -1,14 +1,26 @@
-from typing import List
-from fastapi import APIRouter, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+import json
 import time
 
-from services.airtable.requests import fetch_requests_from_airtable, fetch_request_by_id_from_airtable
+from services.airtable.requests import (
+    AIRTABLE_PAGE_SIZE,
+    fetch_requests_from_airtable,
+    fetch_requests_page,
+    fetch_request_by_id_from_airtable,
+    fetch_requests_by_ids_from_airtable,
+    iter_request_pages
+)
 from services.messaging.email_service import send_bulk_email
 from services.geolocation.geolocation_service import get_coordinates_google, update_airtable_coordinates
 from services.slack_services.slack_service import export_warehouse_results_to_slack
+from services.caching.conditional_requests import WAREHOUSES_CACHE_MAX_AGE, cache_control, etag_matches, make_etag, not_modified
 from warehouse.models import ExportWarehouseData, LocationRequest, ResponseModel, SendBulkEmailData
 from warehouse.warehouse_service import fetch_warehouses_from_airtable, find_nearby_warehouses, invalidate_warehouse_cache
+from coverage_gap.coverage_engine import invalidate_coverage_engine
+from coverage_gap.coverage_gap_updates import apply_warehouse_change
 
 
 warehouse_router = APIRouter(
@@ -17,23 +29,48 @@ warehouse_router = APIRouter(
 
 
 @warehouse_router.get("/warehouses")
-async def warehouses():
+async def warehouses(http_request: Request):
+    """All warehouses. Responses carry a strong ETag of the body; a matching If-None-Match gets a 304."""
     try:
         data = await fetch_warehouses_from_airtable()
         total_records = len(data)
-        return ResponseModel(
+        response = JSONResponse(content=jsonable_encoder(ResponseModel(
             status="success", 
             data={
                 "warehouses": data,
                 "total_records": total_records
             }
-        )
+        )))
+        etag = make_etag(response.body)
+        if etag_matches(http_request.headers.get("if-none-match"), [etag]):
+            return not_modified(etag, WAREHOUSES_CACHE_MAX_AGE)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = cache_control(WAREHOUSES_CACHE_MAX_AGE)
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
 @warehouse_router.get("/requests")
-async def requests(request_id: int):
+async def requests(request_id: Optional[int] = None, ids: Optional[str] = None):
+    """Get a request by `request_id`, or many at once with a comma-separated `ids` list."""
     try:
+        if ids:
+            try:
+                request_ids = [int(value) for value in ids.split(",") if value.strip()]
+            except ValueError:
+                raise HTTPException(status_code=400, detail="ids must be a comma-separated list of Request IDs")
+            found = await fetch_requests_by_ids_from_airtable(request_ids)
+            return ResponseModel(
+                status="success",
+                data={
+                    "requests": found,
+                    "missing": [missing_id for missing_id in dict.fromkeys(request_ids) if missing_id not in found]
+                }
+            )
+        
+        if request_id is None:
+            raise HTTPException(status_code=400, detail="request_id or ids is required")
+        
         data = await fetch_request_by_id_from_airtable(request_id=request_id)
         return ResponseModel(status="success", data=data)   
     
@@ -43,14 +80,52 @@ async def requests(request_id: int):
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
     
 @warehouse_router.get("/all-requests")
-async def requests():
+async def all_requests(
+    cursor: Optional[str] = None,
+    page_size: Optional[int] = Query(None, ge=1, le=AIRTABLE_PAGE_SIZE),
+    fields: Optional[List[str]] = Query(None),
+    stream: bool = False
+):
+    """
+    Get Requests records.
+    
+    Query parameters:
+    - fields: Repeatable field projection (e.g. `?fields=City&fields=State`); defaults to all fields
+    - cursor / page_size: Return a single page plus `next_cursor` for the following page
+    - stream: Stream every record as NDJSON, forwarding each Airtable page as it arrives
+    
+    Without cursor, page_size or stream, returns the whole table in one response.
+    """
     try:
-        data = await fetch_requests_from_airtable()
+        if stream:
+            return StreamingResponse(
+                stream_requests_ndjson(fields),
+                media_type="application/x-ndjson",
+                headers={"X-Accel-Buffering": "no"}
+            )
+        
+        if cursor or page_size:
+            records, next_cursor = await fetch_requests_page(cursor=cursor, page_size=page_size or AIRTABLE_PAGE_SIZE, fields=fields)
+            return ResponseModel(status="success", data={"records": records, "next_cursor": next_cursor})
+        
+        data = await fetch_requests_from_airtable(fields=fields)
         if not data:
             raise HTTPException(status_code=404, detail=f"Orders not found")
         return ResponseModel(status="success", data=data)   
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+
+async def stream_requests_ndjson(fields: Optional[List[str]] = None):
+    """Yield Requests records as NDJSON lines, one Airtable page at a time."""
+    try:
+        async for page in iter_request_pages(fields):
+            yield "".join(json.dumps(record) + "\n" for record in page)
+    except Exception as e:
+        print(f"Error streaming requests: {str(e)}")
+        yield json.dumps({"error": f"Unexpected error: {str(e)}"}) + "\n"
     
 @warehouse_router.post("/nearby_warehouses")
 async def find_nearby_warehouses_endpoint(request: LocationRequest):
@@ -88,8 +163,8 @@ async def send_bulk_email_endpoint(send_bulk_emails: SendBulkEmailData):
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
 @warehouse_router.post("/webhook")
-async def airtable_webhook(request: dict):
-    """Handle Airtable webhook notifications for real-time cache invalidation and coordinate calculation."""
+async def airtable_webhook(request: dict, background_tasks: BackgroundTasks):
+    """Handle Airtable webhook notifications for real-time cache invalidation, coordinate calculation and coverage updates."""
     try:        
         warehouse_data = request
         
@@ -127,6 +202,14 @@ async def airtable_webhook(request: dict):
                     "error": str(coord_error)
                 }
         
+        # Patch coverage results for this warehouse after responding (re-read from Airtable, with any coordinates set above)
+        coverage_update_scheduled = bool(record_id)
+        if coverage_update_scheduled:
+            background_tasks.add_task(apply_warehouse_change, record_id)
+        else:
+            # Without a record to patch in, the next analysis rebuilds the engine from Airtable
+            invalidate_coverage_engine()
+        
         return ResponseModel(
             status="success", 
             data={
@@ -134,6 +217,7 @@ async def airtable_webhook(request: dict):
                 "warehouse_name": warehouse_data.get("Warehouse Name"),
                 "cache_invalidated": True,
                 "coordinate_update": coordinate_update_result,
+                "coverage_update_scheduled": coverage_update_scheduled,
                 "timestamp": time.time()
             }
         )